@@ -0,0 +1,393 @@
+"""Headless export of diagrams to SVG and PNG.
+
+Contains class Scene: displayed vertices and edges of a GraphModel in image
+coordinates, shapes come from shapes.py like in GraphView. Writers stream
+their output: SVG elements are written one by one, PNG is rasterised in
+horizontal bands compressed as soon as they are done. The items of a band
+are looked up in the spatial indexes of the model, so apart from these
+memory does not grow with the image size.
+
+Usage (e.g. from a batch job):
+    python export.py SOURCE OUTPUT [--scale S] [--no-trees] [--history N]
+SOURCE is a diagram file (.ggd or text) or a git repository folder,
+OUTPUT ends with .svg or .png.
+"""
+import os
+import sys
+import math
+import itertools
+import zlib
+import struct
+import argparse
+from xml.sax.saxutils import escape
+
+from model import GraphModel
+import shapes
+
+# label metrics approximating TkDefaultFont used by the view
+CHAR_WIDTH = 7
+LINE_HEIGHT = 15
+FONT_SIZE = 12
+# border around the diagram
+PADDING = 100
+# labels are not drawn below this scale, like below detail zoom of the view
+TEXT_MIN_SCALE = 0.5
+# rows rasterised at once
+BAND_HEIGHT = 64
+# edges computed at once
+EDGE_CHUNK = 4096
+
+COLORS = {'black': (0, 0, 0), 'white': (255, 255, 255),
+          'lightgray': (211, 211, 211), 'pink': (255, 192, 203)}
+
+# 5x7 glyphs of characters 32..126, 7 rows of 5 bits each (hex)
+GLYPHS = (
+    '00000000000000040404040400040a0a0a000000000a0a1f0a1f0a0a040f140e051e04'
+    '181902040813030c12140815120d040408000000000204080808040208040202020408'
+    '0004150e1504000004041f040400000000000c04080000001f00000000000000000c0c'
+    '000102040810000e11131519110e040c040404040e0e11010204081f1f02040201110e'
+    '02060a121f02021f101e0101110e0608101e11110e1f0102040808080e11110e11110e'
+    '0e11110f01020c000c0c000c0c00000c0c000c04080204081008040200001f001f0000'
+    '080402010204080e1101020400040e11010d15150e0e11111f1111111e11111e11111e'
+    '0e11101010110e1c12111111121c1f10101e10101f1f10101e1010100e11101711110f'
+    '1111111f1111110e04040404040e0702020202120c111214181412111010101010101f'
+    '111b1515111111111119151311110e11111111110e1e11111e1010100e11111115120d'
+    '1e11111e1412110f10100e01011e1f0404040404041111111111110e11111111110a04'
+    '1111111515150a11110a040a11111111110a0404041f01020408101f0e08080808080e'
+    '001008040201000e02020202020e040a11000000000000000000001f08040200000000'
+    '00000e010f110f1010161911111e00000e1010110e01010d1311110f00000e111f100e'
+    '0609081c080808000f11110f010e1010161911111104000c0404040e0200060202120c'
+    '101012141814120c04040404040e00001a151511110000161911111100000e1111110e'
+    '00001e111e101000000d130f01010000161910101000000e100e011e08081c08080906'
+    '0000111111130d00001111110a040000111115150a0000110a040a11000011110f010e'
+    '00001f0204081f02040408040402040404040404040804040204040800000815020000'
+)
+
+
+def _color(name):
+    """Return (r, g, b) of Tk color name or #RRGGBB, None for no color."""
+    if not name:
+        return None
+    if name.startswith('#') and len(name) == 7:
+        return tuple(int(name[i:i + 2], 16) for i in (1, 3, 5))
+    return COLORS.get(name, (0, 0, 0))
+
+
+class Scene:
+    """Displayed vertices and edges of model scaled to image coordinates.
+
+    Vertex items: (points, smooth, fill, outline, width, label, text position)
+    Edge items: (x1, y1, x2, y2, oriented, label, label position)
+    """
+
+    def __init__(self, model, scale=1.0, show_trees=True):
+        self.model = model
+        self.scale = scale
+        self.show_trees = show_trees
+        self.text = scale >= TEXT_MIN_SCALE
+        bounds = model.vertices.bounds() or (0, 0, 0, 0)
+        self.x0 = bounds[0] - PADDING
+        self.y0 = bounds[1] - PADDING
+        self.width = max(1, int(math.ceil((bounds[2] - bounds[0] + 2 * PADDING) * scale)))
+        self.height = max(1, int(math.ceil((bounds[3] - bounds[1] + 2 * PADDING) * scale)))
+
+    def _displayed(self, v):
+        return v['visible'] and (self.show_trees or v['type'] not in ['tree', 'blob'])
+
+    def _size(self, label, vtype):
+        return shapes.shape_size(CHAR_WIDTH * len(label), LINE_HEIGHT, vtype)
+
+    def vertex_ids(self):
+        """Iterate ids of displayed vertices."""
+        vertices = self.model.vertices
+        return (vid for vid in vertices.ids() if self._displayed(vertices.by_id(vid)))
+
+    def edges(self):
+        """Iterate views of edges between displayed vertices."""
+        vertices = self.model.vertices
+        return (e for e in self.model.edges
+                if self._displayed(vertices[e['src']]) and self._displayed(vertices[e['dst']]))
+
+    def vertex_item(self, vid):
+        vertices = self.model.vertices
+        v = vertices.by_id(vid)
+        label, vtype = vertices.label_of(vid), v['type']
+        rx, ry = self._size(label, vtype)
+        x, y = v['x'], v['y']
+        points, smooth, (tx, ty) = shapes.vertex_shape(vtype, x - rx, y - ry, x + rx, y + ry)
+        params = shapes.RENDER_PARAMS.get(vtype, shapes.RENDER_PARAMS['blob'])
+        fill = params['fill']
+        if vtype == 'commit' and label == self.model.init_commit:
+            fill = shapes.INIT_COMMIT_COLOR
+        s, x0, y0 = self.scale, self.x0, self.y0
+        points = [(c - (x0 if i % 2 == 0 else y0)) * s for i, c in enumerate(points)]
+        return (points, smooth, fill, params['color'], params['width'] * s, label,
+                ((tx - x0) * s, (ty - y0) * s))
+
+    def edge_items(self, edges):
+        """Return edge items of edges, endpoints are computed at once."""
+        vertices = self.model.vertices
+        geometry = {}
+        segments = []
+        for e in edges:
+            g = []
+            for label in (e['src'], e['dst']):
+                if label not in geometry:
+                    v = vertices[label]
+                    vtype = v['type']
+                    rx, ry = self._size(label, vtype)
+                    geometry[label] = (v['x'], v['y'], rx, ry + shapes.EXTRA_HEIGHT.get(vtype, 0))
+                g.extend(geometry[label])
+            segments.append(g)
+        result = []
+        for e, (x1, y1, x2, y2, lx, ly) in zip(edges, shapes.edge_geometry(segments, self.scale, self.x0, self.y0)):
+            label = e['label'] if self.text else None
+            result.append((x1, y1, x2, y2, e['oriented'], label, (lx, ly) if label else None))
+        return result
+
+    def edge_chunks(self):
+        """Yield lists of edge items, EDGE_CHUNK edges each."""
+        edges = self.edges()
+        while True:
+            chunk = list(itertools.islice(edges, EDGE_CHUNK))
+            if not chunk:
+                return
+            yield self.edge_items(chunk)
+
+    def items_in_rows(self, top, bottom):
+        """Return (edge items, vertex ids) possibly drawn in image rows
+        top..bottom, found by the spatial indexes of the model."""
+        model, s = self.model, self.scale
+        x1, x2 = self.x0, self.x0 + self.width / s
+        # vertex shapes and edge labels reach beyond their positions
+        y1, y2 = self.y0 + top / s, self.y0 + bottom / s
+        pad = 12 / s + 20
+        vertices = model.vertices
+        edges = []
+        for eid in model.edges.ids_in_rect(x1, y1 - pad, x2, y2 + pad):
+            e = model.edges.by_id(eid)
+            if self._displayed(vertices[e['src']]) and self._displayed(vertices[e['dst']]):
+                edges.append(e)
+        vids = [vid for vid in vertices.ids_in_rect(x1, y1 - 40, x2, y2 + 40)
+                if self._displayed(vertices.by_id(vid))]
+        vids.sort(key=lambda vid: vertices.by_id(vid)['y'])
+        return self.edge_items(edges), vids
+
+
+def _svg_points(points):
+    return ' '.join('%.1f,%.1f' % p for p in zip(points[0::2], points[1::2]))
+
+
+def _svg_path(points):
+    """SVG path of smoothed polygon, see shapes.smooth_segments."""
+    parts = []
+    for (ax, ay), (bx, by), (cx, cy) in shapes.smooth_segments(points):
+        if not parts:
+            parts.append('M%.1f,%.1f' % (ax, ay))
+        parts.append('Q%.1f,%.1f %.1f,%.1f' % (bx, by, cx, cy))
+    parts.append('Z')
+    return ' '.join(parts)
+
+
+def write_svg(scene, out):
+    """Write scene as SVG to text stream `out`."""
+    font = FONT_SIZE * scene.scale
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    out.write('<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d" viewBox="0 0 %d %d">\n'
+              % (scene.width, scene.height, scene.width, scene.height))
+    out.write('<rect width="100%" height="100%" fill="white"/>\n')
+    out.write('<g font-family="sans-serif" font-size="%.1f" text-anchor="middle" dominant-baseline="central">\n' % font)
+    for chunk in scene.edge_chunks():
+        for x1, y1, x2, y2, oriented, label, label_pos in chunk:
+            out.write('<line x1="%.1f" y1="%.1f" x2="%.1f" y2="%.1f" stroke="black"/>\n' % (x1, y1, x2, y2))
+            if oriented:
+                arrow = shapes.arrow_points(x1, y1, x2, y2)
+                if arrow:
+                    out.write('<polygon points="%s" fill="black"/>\n' % _svg_points(arrow))
+            if label:
+                out.write('<text x="%.1f" y="%.1f">%s</text>\n' % (label_pos[0], label_pos[1], escape(label)))
+    for vid in scene.vertex_ids():
+        points, smooth, fill, outline, width, label, (tx, ty) = scene.vertex_item(vid)
+        stroke = ' stroke="%s" stroke-width="%.1f"' % (outline, width) if outline and width else ''
+        if smooth:
+            out.write('<path d="%s" fill="%s"%s/>\n' % (_svg_path(points), fill, stroke))
+        else:
+            out.write('<polygon points="%s" fill="%s"%s/>\n' % (_svg_points(points), fill, stroke))
+        if scene.text:
+            out.write('<text x="%.1f" y="%.1f">%s</text>\n' % (tx, ty, escape(label)))
+    out.write('</g>\n</svg>\n')
+
+
+class _Band:
+    """Rows [top, top + height) of RGB image being rasterised."""
+
+    def __init__(self, width, top, height):
+        self.width = width
+        self.top = top
+        self.height = height
+        self.buf = bytearray(b'\xff' * (width * height * 3))
+
+    def _span(self, row, xa, xb, color):
+        # pixels with centers in [xa, xb]
+        a = max(0, int(math.ceil(xa - 0.5)))
+        b = min(self.width - 1, int(math.floor(xb - 0.5)))
+        if a <= b:
+            i = (row * self.width + a) * 3
+            self.buf[i:i + (b - a + 1) * 3] = color * (b - a + 1)
+
+    def fill_polygon(self, pts, color):
+        """Fill polygon given as list of (x, y), even-odd rule."""
+        if len(pts) < 3:
+            return
+        ys = [p[1] for p in pts]
+        r1 = max(0, int(math.floor(min(ys) - 0.5)) - self.top)
+        r2 = min(self.height - 1, int(math.ceil(max(ys) - 0.5)) - self.top)
+        n = len(pts)
+        for row in range(r1, r2 + 1):
+            yc = self.top + row + 0.5
+            xs = []
+            for i in range(n):
+                (x1, y1), (x2, y2) = pts[i - 1], pts[i]
+                if (y1 <= yc < y2) or (y2 <= yc < y1):
+                    xs.append(x1 + (yc - y1) * (x2 - x1) / (y2 - y1))
+            xs.sort()
+            for k in range(0, len(xs) - 1, 2):
+                self._span(row, xs[k], xs[k + 1], color)
+
+    def line(self, x1, y1, x2, y2, width, color):
+        """Draw line as filled quad of given width (at least one pixel)."""
+        dist = math.hypot(x2 - x1, y2 - y1)
+        if dist < 1e-6:
+            return
+        h = max(width, 1) / 2
+        px, py = -(y2 - y1) / dist * h, (x2 - x1) / dist * h
+        self.fill_polygon([(x1 + px, y1 + py), (x2 + px, y2 + py), (x2 - px, y2 - py), (x1 - px, y1 - py)], color)
+
+    def outline(self, pts, width, color):
+        for i in range(len(pts)):
+            (x1, y1), (x2, y2) = pts[i - 1], pts[i]
+            self.line(x1, y1, x2, y2, width, color)
+
+    def text(self, x, y, s, size, color):
+        """Draw text centered at (x, y) with 5x7 glyphs enlarged `size` times."""
+        advance = 6 * size
+        left = int(round(x - (len(s) * advance - size) / 2))
+        top = int(round(y - 7 * size / 2)) - self.top
+        if top + 7 * size < 0 or top >= self.height:
+            return
+        for k, ch in enumerate(s):
+            code = ord(ch) - 32
+            if not 0 <= code < 95:
+                code = ord('?') - 32
+            glyph = GLYPHS[code * 14:code * 14 + 14]
+            gx = left + k * advance
+            for r in range(7):
+                bits = int(glyph[r * 2:r * 2 + 2], 16)
+                if not bits:
+                    continue
+                for c in range(5):
+                    if bits & (0x10 >> c):
+                        for dy in range(size):
+                            row = top + r * size + dy
+                            if 0 <= row < self.height:
+                                self._span(row, gx + c * size, gx + (c + 1) * size, color)
+
+    def rows(self):
+        """Return band as PNG scanlines (filter type 0)."""
+        stride = self.width * 3
+        return b''.join(b'\x00' + self.buf[i:i + stride] for i in range(0, len(self.buf), stride))
+
+
+def _png_chunk(out, kind, data):
+    out.write(struct.pack('>I', len(data)))
+    out.write(kind)
+    out.write(data)
+    out.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind)) & 0xffffffff))
+
+
+def write_png(scene, out):
+    """Write scene as RGB PNG to binary stream `out`, band by band."""
+    width, height, s = scene.width, scene.height, scene.scale
+    text_size = max(1, int(round(s)))
+    out.write(b'\x89PNG\r\n\x1a\n')
+    _png_chunk(out, b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+    compressor = zlib.compressobj(6)
+    black = bytes(COLORS['black'])
+    for top in range(0, height, BAND_HEIGHT):
+        band = _Band(width, top, min(BAND_HEIGHT, height - top))
+        # items are looked up per band, edges first, vertices over them
+        edge_items, vids = scene.items_in_rows(top, top + band.height)
+        active = [(0, item) for item in edge_items] + [(1, vid) for vid in vids]
+        labels = []
+        for order, item in active:
+            if order == 0:
+                x1, y1, x2, y2, oriented, label, label_pos = item
+                band.line(x1, y1, x2, y2, 1, black)
+                if oriented:
+                    arrow = shapes.arrow_points(x1, y1, x2, y2)
+                    if arrow:
+                        band.fill_polygon(list(zip(arrow[0::2], arrow[1::2])), black)
+                if label:
+                    labels.append((label_pos, label))
+            else:
+                points, smooth, fill, outline, width_, label, text_pos = scene.vertex_item(item)
+                pts = shapes.flatten(points, smooth)
+                band.fill_polygon(pts, bytes(_color(fill)))
+                if _color(outline) and width_:
+                    band.outline(pts, width_, bytes(_color(outline)))
+                if scene.text:
+                    band.text(text_pos[0], text_pos[1], label, text_size, black)
+        for (lx, ly), label in labels:
+            band.text(lx, ly, label, text_size, black)
+        data = compressor.compress(band.rows())
+        if data:
+            _png_chunk(out, b'IDAT', data)
+    _png_chunk(out, b'IDAT', compressor.flush())
+    _png_chunk(out, b'IEND', b'')
+
+
+def export(model, filepath, scale=1.0, show_trees=True):
+    """Write model to `filepath`, format by extension (.svg or .png)."""
+    scene = Scene(model, scale, show_trees)
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext == '.svg':
+        with open(filepath, 'w', encoding='utf-8') as f:
+            write_svg(scene, f)
+    elif ext == '.png':
+        with open(filepath, 'wb') as f:
+            write_png(scene, f)
+    else:
+        raise ValueError(f"Unknown export format '{ext}', use .svg or .png")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export git graph diagram to SVG or PNG.')
+    parser.add_argument('source', help='diagram file (.ggd or text) or git repository folder')
+    parser.add_argument('output', help='output file, .svg or .png')
+    parser.add_argument('--scale', type=float, default=1.0, help='image scale (default 1.0)')
+    parser.add_argument('--no-trees', action='store_true', help='do not draw trees and blobs')
+    parser.add_argument('--history', type=int, default=0,
+                        help='repository only: load last N commits of all refs and lay them out')
+    args = parser.parse_args(argv)
+    model = GraphModel()
+    try:
+        if os.path.isdir(args.source):
+            if not model.load_refs(args.source):
+                print(f"'{args.source}' is not a git repository", file=sys.stderr)
+                return 1
+            if args.history:
+                model.load_history(args.history)
+                model.auto_layout()
+        else:
+            model.load_from_file(args.source)
+        export(model, args.output, args.scale, not args.no_trees)
+    except (OSError, ValueError) as e:
+        print(f'Export failed: {e}', file=sys.stderr)
+        return 1
+    finally:
+        model.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
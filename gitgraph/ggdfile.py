@@ -0,0 +1,98 @@
+"""Binary .ggd diagram file.
+
+File layout (integers little endian):
+    magic b'GGD\\x00', version uint16, byte order of columns b'<' or b'>'
+    header: uint32 length, utf-8 JSON object (repo_dir, init_commit, filter)
+    uint32 number of columns, each column:
+        uint16 name length, utf-8 name
+        typecode char, uint8 item size, uint64 data length, raw data
+
+Columns are dumps of the arrays of storage.VertexTable and storage.EdgeList,
+loading is a copy of each column out of the memory mapped file, no parsing
+per vertex or edge. Labels are written without those of deleted vertices,
+hash tables of labels are written as they are so that they are not built
+again, and path nodes of tree/blob vertices are written with the path trie
+so that paths are not computed again. Files without path columns are read
+too, their paths are computed on first use.
+"""
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+MAGIC = b'GGD\x00'
+VERSION = 1
+
+def is_ggd_file(filepath):
+    """True if file starts with the binary format magic."""
+    with open(filepath, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+def write(filepath, header, columns):
+    """Write header dict and dict name -> array/bytearray/bytes to file."""
+    order = b'<' if sys.byteorder == 'little' else b'>'
+    with open(filepath, 'wb') as f:
+        f.write(MAGIC + struct.pack('<H', VERSION) + order)
+        data = json.dumps(header).encode('utf-8')
+        f.write(struct.pack('<I', len(data)) + data)
+        f.write(struct.pack('<I', len(columns)))
+        for name, column in columns.items():
+            if isinstance(column, array):
+                typecode, itemsize = column.typecode, column.itemsize
+            else:
+                typecode, itemsize = 'B', 1
+            encoded = name.encode('utf-8')
+            f.write(struct.pack('<H', len(encoded)) + encoded)
+            f.write(struct.pack('<cBQ', typecode.encode('ascii'), itemsize, len(column) * itemsize))
+            f.write(column)
+
+def read(filepath):
+    """Return (header dict, dict name -> column) from file.
+
+    Columns with typecode 'B' are returned as bytearray, others as array.
+    Raises ValueError if file is not a supported .ggd file.
+    """
+    with open(filepath, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as mv:
+                return _read_columns(mv)
+
+def _read_columns(mv):
+    if bytes(mv[:len(MAGIC)]) != MAGIC:
+        raise ValueError('not a .ggd file')
+    pos = len(MAGIC)
+    version, order = struct.unpack_from('<Hc', mv, pos)
+    if version != VERSION:
+        raise ValueError(f'unsupported .ggd version {version}')
+    swap = order != (b'<' if sys.byteorder == 'little' else b'>')
+    pos += 3
+    size, = struct.unpack_from('<I', mv, pos)
+    pos += 4
+    header = json.loads(bytes(mv[pos:pos + size]).decode('utf-8'))
+    pos += size
+    count, = struct.unpack_from('<I', mv, pos)
+    pos += 4
+    columns = {}
+    for _ in range(count):
+        size, = struct.unpack_from('<H', mv, pos)
+        pos += 2
+        name = bytes(mv[pos:pos + size]).decode('utf-8')
+        pos += size
+        typecode, itemsize, size = struct.unpack_from('<cBQ', mv, pos)
+        pos += struct.calcsize('<cBQ')
+        typecode = typecode.decode('ascii')
+        if pos + size > len(mv):
+            raise ValueError('truncated .ggd file')
+        if typecode == 'B':
+            column = bytearray(mv[pos:pos + size])
+        else:
+            column = array(typecode)
+            if column.itemsize != itemsize:
+                raise ValueError(f'column {name}: item size {itemsize} not supported')
+            column.frombytes(mv[pos:pos + size])
+            if swap:
+                column.byteswap()
+        columns[name] = column
+        pos += size
+    return header, columns
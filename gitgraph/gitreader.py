@@ -0,0 +1,186 @@
+"""Git object access separated from graph model.
+
+Contains class GitObjectReader: long-lived `git cat-file --batch` process
+which returns parsed commit, tree and tag records. One reader is shared
+per repository, see open_reader().
+"""
+import os
+import subprocess
+import threading
+import atexit
+
+# number of requests written to cat-file before reading answers back,
+# kept small enough that requests always fit into the pipe buffer
+BATCH_SIZE = 256
+
+def parse_object(oid, objtype, data):
+    """Parse raw object content into a record.
+
+    Records are dicts:
+    commit: {'oid', 'type':'commit', 'tree':hash, 'parents':[hash]}
+    tag: {'oid', 'type':'tag', 'object':hash, 'objtype':str}
+    tree: {'oid', 'type':'tree', 'entries':[(mode, type, hash, name)]}
+    blob: {'oid', 'type':'blob'}
+    """
+    record = {'oid': oid, 'type': objtype}
+    if objtype == 'commit':
+        record['tree'] = None
+        record['parents'] = []
+        for line in data.split(b'\n'):
+            if line == b'':
+                break  # end of headers
+            if line.startswith(b'tree '):
+                record['tree'] = line[5:].decode('ascii')
+            elif line.startswith(b'parent '):
+                record['parents'].append(line[7:].decode('ascii'))
+    elif objtype == 'tag':
+        record['object'] = None
+        record['objtype'] = None
+        for line in data.split(b'\n'):
+            if line == b'':
+                break
+            if line.startswith(b'object '):
+                record['object'] = line[7:].decode('ascii')
+            elif line.startswith(b'type '):
+                record['objtype'] = line[5:].decode('ascii')
+    elif objtype == 'tree':
+        entries = []
+        pos = 0
+        size = len(data)
+        while pos < size:
+            sp = data.index(b' ', pos)
+            nul = data.index(b'\0', sp)
+            mode = data[pos:sp].decode('ascii')
+            name = data[sp + 1:nul].decode('utf-8', 'replace')
+            obj_hash = data[nul + 1:nul + 21].hex()
+            if mode == '40000':
+                type_ = 'tree'
+            elif mode == '160000':
+                type_ = 'commit'
+            else:
+                type_ = 'blob'
+            entries.append((mode.zfill(6), type_, obj_hash, name))
+            pos = nul + 21
+        record['entries'] = entries
+    return record
+
+
+class GitObjectReader:
+    """Read git objects through one persistent `git cat-file --batch` process.
+
+    Requests are pipelined, many object names are written before answers are
+    read back. Methods are safe to call from multiple threads.
+    """
+
+    def __init__(self, repo_dir):
+        self.repo_dir = repo_dir
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        if self._proc is not None and self._proc.poll() is None:
+            return self._proc
+        self._proc = subprocess.Popen(['git', '-C', self.repo_dir, 'cat-file', '--batch'],
+                                      stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                      stderr=subprocess.DEVNULL)
+        return self._proc
+
+    def _read_answer(self, proc):
+        header = proc.stdout.readline()
+        if not header:
+            raise EOFError('git cat-file terminated')
+        parts = header.split()
+        # '<name> missing' or '<name> ambiguous'
+        if len(parts) != 3:
+            return None
+        oid, objtype, size = parts[0].decode('ascii'), parts[1].decode('ascii'), int(parts[2])
+        data = proc.stdout.read(size + 1)[:size]
+        return parse_object(oid, objtype, data)
+
+    def read(self, name):
+        """Return parsed record for object `name` (full or abbreviated hash).
+
+        Returns None if object does not exist or git is not available.
+        """
+        return self.read_many([name]).get(name)
+
+    def read_many(self, names, cache=None):
+        """Read objects for a list of names in as few round trips as possible.
+
+        Full hashes found in `cache` (objcache.ObjectCache) are not read,
+        records read are added to it.
+        Returns a dict mapping name -> record (None for missing objects).
+        """
+        result = {}
+        wanted = []
+        for n in names:
+            # names are written line by line, whitespace would break the protocol
+            if not n or any(c.isspace() for c in n):
+                result[n] = None
+            elif n not in result:
+                result[n] = None
+                wanted.append(n)
+        if cache is not None:
+            # abbreviated names can't be looked up without the repository
+            cached = cache.get_many(n.lower() for n in wanted if len(n) == 40)
+            for n in wanted:
+                result[n] = cached.get(n.lower())
+            wanted = [n for n in wanted if result[n] is None]
+        if not wanted:
+            return result
+        with self._lock:
+            try:
+                proc = self._start()
+                for i in range(0, len(wanted), BATCH_SIZE):
+                    chunk = wanted[i:i + BATCH_SIZE]
+                    proc.stdin.write(''.join(n + '\n' for n in chunk).encode('ascii', 'replace'))
+                    proc.stdin.flush()
+                    for n in chunk:
+                        result[n] = self._read_answer(proc)
+            except Exception:
+                # broken process, next request starts new one
+                self._stop()
+        if cache is not None:
+            cache.put_many(result[n] for n in wanted if result[n] is not None)
+        return result
+
+    def _stop(self):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except Exception:
+            pass
+        try:
+            proc.kill()
+            proc.wait()
+        except Exception:
+            pass
+
+    def close(self):
+        with self._lock:
+            self._stop()
+
+
+_readers = {}
+_readers_lock = threading.Lock()
+
+def open_reader(repo_dir):
+    """Return reader shared by all models working with `repo_dir`."""
+    key = os.path.normcase(os.path.abspath(repo_dir))
+    with _readers_lock:
+        reader = _readers.get(key)
+        if reader is None:
+            reader = GitObjectReader(repo_dir)
+            _readers[key] = reader
+        return reader
+
+def close_readers():
+    with _readers_lock:
+        readers = list(_readers.values())
+        _readers.clear()
+    for r in readers:
+        r.close()
+
+atexit.register(close_readers)
@@ -0,0 +1,601 @@
+"""Native git object store reader.
+
+Contains class GitObjectStore: reads loose and packed objects straight from
+the .git directory without running git. Loose objects are zlib
+decompressed, packed objects are found by binary search in the .idx
+fan-out tables and read from memory mapped pack files. Records have the
+same format as records of gitreader.GitObjectReader.
+"""
+import os
+import mmap
+import zlib
+import atexit
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import gitreader
+
+OBJ_TYPES = {1: 'commit', 2: 'tree', 3: 'blob', 4: 'tag'}
+OFS_DELTA = 6
+REF_DELTA = 7
+
+# limits of delta base cache
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+CACHE_MAX_ITEMS = 2048
+# longest delta chain resolved before giving up (git default depth is 50)
+MAX_DELTA_CHAIN = 10000
+# requests of more objects are read by a pool of threads, only waits for
+# disk and zlib run without the GIL, so the gain is small
+PARALLEL_MIN_OBJECTS = 64
+READ_THREADS = min(8, (os.cpu_count() or 1) + 4)
+
+def _is_hex(name):
+    return len(name) >= 4 and all(c in '0123456789abcdef' for c in name)
+
+def apply_delta(base, delta):
+    """Build object content from delta base and git delta instructions."""
+    pos = 0
+    # source and target sizes, little endian base-128
+    sizes = []
+    for _ in range(2):
+        value = shift = 0
+        while True:
+            b = delta[pos]
+            pos += 1
+            value |= (b & 0x7f) << shift
+            shift += 7
+            if not b & 0x80:
+                break
+        sizes.append(value)
+    if sizes[0] != len(base):
+        raise ValueError('delta base size mismatch')
+    out = bytearray()
+    end = len(delta)
+    while pos < end:
+        op = delta[pos]
+        pos += 1
+        if op & 0x80:
+            # copy from base
+            offset = size = 0
+            for i in range(4):
+                if op & (1 << i):
+                    offset |= delta[pos] << (8 * i)
+                    pos += 1
+            for i in range(3):
+                if op & (0x10 << i):
+                    size |= delta[pos] << (8 * i)
+                    pos += 1
+            if size == 0:
+                size = 0x10000
+            out += base[offset:offset + size]
+        elif op:
+            # insert new data
+            out += delta[pos:pos + op]
+            pos += op
+        else:
+            raise ValueError('invalid delta opcode')
+    if len(out) != sizes[1]:
+        raise ValueError('delta result size mismatch')
+    return bytes(out)
+
+
+class PackFile:
+    """One pack with its version 2 index.
+
+    Both files are memory mapped on first access and stay mapped until
+    close(), the store closes them when no read is active, so that git can
+    delete or replace them meanwhile (mapped files can't be deleted on
+    Windows).
+    """
+
+    def __init__(self, idx_path):
+        self.idx_path = idx_path
+        self.pack_path = idx_path[:-4] + '.pack'
+        self._idx = self._pack = None
+        self._map_lock = threading.Lock()
+        self.map()
+        self._fanout = struct.unpack_from('>256I', self._idx, 8)
+        self.close()
+        self.count = self._fanout[255]
+        self._names_at = 8 + 256 * 4
+        self._offsets_at = self._names_at + self.count * 24
+        self._large_at = self._offsets_at + self.count * 4
+
+    def map(self):
+        """Memory map index and pack file unless they are mapped.
+
+        Raises OSError if the files are gone, ValueError if they are invalid.
+        """
+        with self._map_lock:
+            if self._pack is not None:
+                return
+            with open(self.idx_path, 'rb') as f:
+                idx = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                if idx[:8] != b'\377tOc\0\0\0\2':
+                    raise ValueError('unsupported pack index version')
+                with open(self.pack_path, 'rb') as f:
+                    pack = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except Exception:
+                idx.close()
+                raise
+            if pack[:4] != b'PACK':
+                idx.close()
+                pack.close()
+                raise ValueError('invalid pack file')
+            self._idx = idx
+            self._pack = pack
+
+    def close(self):
+        """Unmap files, they are mapped again on next access."""
+        with self._map_lock:
+            for m in (self._idx, self._pack):
+                if m is not None:
+                    try:
+                        m.close()
+                    except Exception:
+                        pass
+            self._idx = self._pack = None
+
+    def exists(self):
+        return os.path.isfile(self.idx_path) and os.path.isfile(self.pack_path)
+
+    def _name(self, i):
+        at = self._names_at + i * 20
+        return self._idx[at:at + 20]
+
+    def _lower_bound(self, key):
+        """Index of first entry >= key within key's fan-out bucket."""
+        first = key[0]
+        lo = self._fanout[first - 1] if first > 0 else 0
+        hi = self._fanout[first]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._name(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, hexname):
+        """Return list of full hex names starting with `hexname` (at most 2)."""
+        if self._pack is None:
+            self.map()
+        key = bytes.fromhex(hexname if len(hexname) % 2 == 0 else hexname + '0')
+        i = self._lower_bound(key)
+        found = []
+        while i < self.count and len(found) < 2:
+            h = self._name(i).hex()
+            if not h.startswith(hexname):
+                break
+            found.append(h)
+            i += 1
+        return found
+
+    def offset_of(self, hexname):
+        """Return pack offset of object with full hex name or None."""
+        if self._pack is None:
+            self.map()
+        key = bytes.fromhex(hexname)
+        i = self._lower_bound(key)
+        if i >= self.count or self._name(i) != key:
+            return None
+        off = struct.unpack_from('>I', self._idx, self._offsets_at + i * 4)[0]
+        if off & 0x80000000:
+            off = struct.unpack_from('>Q', self._idx, self._large_at + (off & 0x7fffffff) * 8)[0]
+        return off
+
+    def entry_header(self, offset):
+        """Parse object header at offset.
+
+        Returns (type, size, data_offset, base) where base is pack offset for
+        OFS_DELTA, hex name for REF_DELTA and None otherwise.
+        """
+        if self._pack is None:
+            self.map()
+        pack = self._pack
+        pos = offset
+        b = pack[pos]
+        pos += 1
+        objtype = (b >> 4) & 7
+        size = b & 0x0f
+        shift = 4
+        while b & 0x80:
+            b = pack[pos]
+            pos += 1
+            size |= (b & 0x7f) << shift
+            shift += 7
+        base = None
+        if objtype == OFS_DELTA:
+            b = pack[pos]
+            pos += 1
+            rel = b & 0x7f
+            while b & 0x80:
+                b = pack[pos]
+                pos += 1
+                rel = ((rel + 1) << 7) | (b & 0x7f)
+            base = offset - rel
+        elif objtype == REF_DELTA:
+            base = pack[pos:pos + 20].hex()
+            pos += 20
+        return objtype, size, pos, base
+
+    def inflate(self, pos, size):
+        """Decompress zlib stream starting at pos, reading the mmap in chunks."""
+        if self._pack is None:
+            self.map()
+        d = zlib.decompressobj()
+        view = memoryview(self._pack)
+        out = []
+        chunk = max(4096, size + 64)
+        try:
+            while not d.eof and pos < len(view):
+                out.append(d.decompress(view[pos:pos + chunk]))
+                pos += chunk
+                chunk *= 2
+        finally:
+            view.release()
+        data = b''.join(out)
+        if len(data) != size:
+            raise ValueError('corrupt packed object')
+        return data
+
+
+class GitObjectStore:
+    """Read objects from loose object files and packs of a git directory.
+
+    Objects which can't be read natively (unknown index versions, missing
+    objects) are passed to an optional `fallback` reader.
+    Methods are safe to call from multiple threads.
+    """
+
+    def __init__(self, gitdir, fallback=None):
+        self.gitdir = gitdir
+        self.fallback = fallback
+        self._object_dirs = self._find_object_dirs(gitdir)
+        self._packs = []
+        self._pack_names = set()
+        self._lock = threading.Lock()
+        # packs are scanned by one thread at a time
+        self._scan_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        # number of reads in progress, packs are unmapped when it drops to 0,
+        # packs deleted from disk are kept until then
+        self._reads = 0
+        self._retired = []
+        # threads reading many objects, started on first use
+        self._pool = None
+        self._scan_packs()
+
+    def _find_object_dirs(self, gitdir):
+        common = gitdir
+        # linked worktrees keep objects in common dir
+        commondir = os.path.join(gitdir, 'commondir')
+        if os.path.isfile(commondir):
+            try:
+                with open(commondir, 'r', encoding='utf-8') as f:
+                    path = f.read().strip()
+                common = path if os.path.isabs(path) else os.path.normpath(os.path.join(gitdir, path))
+            except Exception:
+                pass
+        dirs = [os.path.join(common, 'objects')]
+        alternates = os.path.join(dirs[0], 'info', 'alternates')
+        if os.path.isfile(alternates):
+            try:
+                with open(alternates, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if line and not line.startswith('#'):
+                            dirs.append(line if os.path.isabs(line) else os.path.normpath(os.path.join(dirs[0], line)))
+            except Exception:
+                pass
+        return dirs
+
+    def _scan_packs(self):
+        """Open packs not opened yet. Returns True if any new pack was found."""
+        with self._scan_lock:
+            return self._scan_new_packs()
+
+    def refresh(self):
+        """Drop packs deleted since they were opened and open new ones,
+        e.g. after git gc or git repack."""
+        self._scan_packs()
+
+    def _begin_read(self):
+        with self._lock:
+            self._reads += 1
+
+    def _end_read(self):
+        with self._lock:
+            self._reads -= 1
+            if self._reads == 0:
+                for p in self._packs + self._retired:
+                    p.close()
+                self._retired = []
+
+    def _scan_new_packs(self):
+        gone = [p for p in self._packs if not p.exists()]
+        if gone:
+            with self._lock:
+                self._packs = [p for p in self._packs if p not in gone]
+                for p in gone:
+                    self._pack_names.discard(p.idx_path)
+                    if self._reads:
+                        self._retired.append(p)
+                    else:
+                        p.close()
+        found = False
+        for objdir in self._object_dirs:
+            packdir = os.path.join(objdir, 'pack')
+            try:
+                names = sorted(os.listdir(packdir))
+            except OSError:
+                continue
+            for fn in names:
+                if not fn.endswith('.idx'):
+                    continue
+                path = os.path.join(packdir, fn)
+                if path in self._pack_names:
+                    continue
+                self._pack_names.add(path)
+                try:
+                    self._packs.append(PackFile(path))
+                    found = True
+                except Exception:
+                    continue
+        return found
+
+    def close(self):
+        with self._lock:
+            for p in self._packs + self._retired:
+                p.close()
+            self._packs = []
+            self._retired = []
+            self._pack_names.clear()
+            self._cache.clear()
+            self._cache_bytes = 0
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+    # -- lookup --
+
+    def _loose_path(self, objdir, hexname):
+        return os.path.join(objdir, hexname[:2], hexname[2:])
+
+    def _expand(self, name):
+        """Return full hex name for full or abbreviated `name` or None."""
+        found = set()
+        for objdir in self._object_dirs:
+            if len(name) == 40:
+                if os.path.isfile(self._loose_path(objdir, name)):
+                    return name
+                continue
+            try:
+                for fn in os.listdir(os.path.join(objdir, name[:2])):
+                    if fn.startswith(name[2:]) and len(fn) == 38:
+                        found.add(name[:2] + fn)
+            except OSError:
+                pass
+        for p in list(self._packs):
+            try:
+                found.update(p.find(name))
+            except (OSError, ValueError):
+                # deleted meanwhile, dropped by next scan
+                continue
+            if len(found) > 1:
+                return None  # ambiguous
+        if len(found) == 1:
+            return found.pop()
+        return name if len(name) == 40 else None
+
+    def _locate(self, hexname):
+        for p in list(self._packs):
+            try:
+                off = p.offset_of(hexname)
+            except (OSError, ValueError):
+                continue
+            if off is not None:
+                return p, off
+        return None, None
+
+    # -- object content --
+
+    def _read_loose(self, hexname):
+        for objdir in self._object_dirs:
+            try:
+                with open(self._loose_path(objdir, hexname), 'rb') as f:
+                    raw = zlib.decompress(f.read())
+            except OSError:
+                continue
+            nul = raw.index(b'\0')
+            objtype, size = raw[:nul].split()
+            return objtype.decode('ascii'), raw[nul + 1:nul + 1 + int(size)]
+        return None
+
+    def _cache_get(self, key):
+        with self._lock:
+            item = self._cache.get(key)
+            if item is not None:
+                self._cache.move_to_end(key)
+            return item
+
+    def _cache_put(self, key, item):
+        size = len(item[1])
+        if size > CACHE_MAX_BYTES // 4:
+            return
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = item
+            self._cache_bytes += size
+            while self._cache_bytes > CACHE_MAX_BYTES or len(self._cache) > CACHE_MAX_ITEMS:
+                _, old = self._cache.popitem(last=False)
+                self._cache_bytes -= len(old[1])
+
+    def _read_packed(self, pack, offset):
+        """Return (type, data) of object at offset, resolving delta chains."""
+        chain = []
+        base = None
+        base_key = None
+        while base is None:
+            key = (pack.pack_path, offset)
+            base = self._cache_get(key)
+            if base is not None:
+                break
+            objtype, size, pos, base_ref = pack.entry_header(offset)
+            if objtype in OBJ_TYPES:
+                base = (OBJ_TYPES[objtype], pack.inflate(pos, size))
+                base_key = key
+                break
+            if len(chain) > MAX_DELTA_CHAIN:
+                raise ValueError('delta chain too long')
+            chain.append((key, pack.inflate(pos, size)))
+            if objtype == OFS_DELTA:
+                offset = base_ref
+            elif objtype == REF_DELTA:
+                pack, offset = self._locate(base_ref)
+                if pack is None:
+                    base = self._read_raw(base_ref)
+                    if base is None:
+                        raise KeyError(base_ref)
+            else:
+                raise ValueError('unknown packed object type')
+        if not chain:
+            return base
+        # objects of delta chain are cached, chains usually share bases
+        objtype, data = base
+        if base_key is not None:
+            self._cache_put(base_key, base)
+        for key, delta in reversed(chain):
+            data = apply_delta(data, delta)
+            self._cache_put(key, (objtype, data))
+        return objtype, data
+
+    def _read_raw(self, hexname):
+        pack, offset = self._locate(hexname)
+        if pack is not None:
+            return self._read_packed(pack, offset)
+        return self._read_loose(hexname)
+
+    def resolve(self, name):
+        """Return full hex name for full or abbreviated `name` or None."""
+        self._begin_read()
+        try:
+            return self._resolve(name)
+        finally:
+            self._end_read()
+
+    def _resolve(self, name):
+        name = name.lower()
+        if not _is_hex(name) or len(name) > 40:
+            return None
+        hexname = self._expand(name)
+        if hexname is None and self._scan_packs():
+            hexname = self._expand(name)
+        return hexname
+
+    def read_raw(self, name):
+        """Return (full hex name, type, content) for object `name` or None."""
+        self._begin_read()
+        try:
+            hexname = self._resolve(name)
+            if hexname is None:
+                return None
+            return self._read_resolved(hexname)
+        finally:
+            self._end_read()
+
+    def _read_resolved(self, hexname):
+        try:
+            raw = self._read_raw(hexname)
+        except Exception:
+            raw = None
+        if raw is None and self._scan_packs():
+            try:
+                raw = self._read_raw(hexname)
+            except Exception:
+                raw = None
+        if raw is None:
+            return None
+        return hexname, raw[0], raw[1]
+
+    def read(self, name):
+        """Return parsed record for object `name` (full or abbreviated hash)."""
+        return self.read_many([name]).get(name)
+
+    def read_many(self, names, cache=None):
+        """Read objects for a list of names.
+
+        Names are resolved to full hashes first, records found in `cache`
+        (objcache.ObjectCache) are not read, records read are added to it.
+        Returns a dict mapping name -> record (None for missing objects).
+        """
+        result = dict.fromkeys(names)
+        todo = [n for n in result if n]
+        self._begin_read()
+        try:
+            resolved = {n: hexname for n, hexname in zip(todo, self._map(self._resolve, todo)) if hexname is not None}
+            cached = cache.get_many(resolved.values()) if cache is not None else {}
+            result.update((n, cached.get(hexname)) for n, hexname in resolved.items())
+            todo = [n for n in resolved if result[n] is None]
+            # records are merged in order of names, whatever thread read them
+            read = []
+            for n, record in zip(todo, self._map(self._read_record, [resolved[n] for n in todo])):
+                if record is not None:
+                    result[n] = record
+                    read.append(record)
+        finally:
+            self._end_read()
+        if read and cache is not None:
+            cache.put_many(read)
+        missing = [n for n, record in result.items() if record is None]
+        if missing and self.fallback is not None:
+            result.update(self.fallback.read_many(missing, cache))
+        return result
+
+    def _read_record(self, hexname):
+        raw = self._read_resolved(hexname)
+        return gitreader.parse_object(*raw) if raw is not None else None
+
+    def _map(self, func, items):
+        """Return list of func(item), many items are split among threads."""
+        if len(items) < PARALLEL_MIN_OBJECTS:
+            return [func(item) for item in items]
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(READ_THREADS)
+            pool = self._pool
+        size = -(-len(items) // (READ_THREADS * 4))
+        chunks = [items[i:i + size] for i in range(0, len(items), size)]
+        parts = pool.map(lambda chunk: [func(item) for item in chunk], chunks)
+        return [r for part in parts for r in part]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def open_store(repo_dir, gitdir):
+    """Return object store shared by all models working with `repo_dir`.
+
+    Objects not readable from `gitdir` are read by `git cat-file`.
+    """
+    key = os.path.normcase(os.path.abspath(repo_dir))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = GitObjectStore(gitdir, fallback=gitreader.open_reader(repo_dir))
+            _stores[key] = store
+        return store
+
+def close_stores():
+    with _stores_lock:
+        stores = list(_stores.values())
+        _stores.clear()
+    for s in stores:
+        s.close()
+
+atexit.register(close_stores)
@@ -1,11 +1,15 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox
-import sys, os, queue, threading
+from tkinter import ttk, filedialog, messagebox, simpledialog
+import sys, os, queue, threading, time
 
 from gui_settings import UserSettings
 from model import GraphModel
+import export
+import layout
+import objcache
 import symboldialog
 import view
+import watcher
 
 threadresult = False
 class GraphApp(tk.Tk):
@@ -15,6 +19,14 @@ class GraphApp(tk.Tk):
         # link model
         self.model = pModel if pModel else GraphModel()
         self._load_model = None
+        # set to stop loading of git folder
+        self._load_cancel = threading.Event()
+        # True while refs are read by refresh in background, pending if
+        # refs changed meanwhile or while the model was busy
+        self._refreshing = False
+        self._refresh_pending = False
+        # watches refs of repository for auto refresh, None if not watching
+        self._watcher = None
 
         self.geometry("900x600")
         self.minsize(400, 500)
@@ -23,15 +35,26 @@ class GraphApp(tk.Tk):
         self.view = view.GraphView(self, self.model)
         self.view.build_bindings()
 
-        # thread sync queue
+        # thread sync queue, background threads post messages by post(),
+        # they wake GUI thread up by one virtual event
         self._queue = queue.Queue()
+        self._wakeup_pending = False
+        self.bind('<<QueueMessage>>', self.process_queue)
+        # with Tcl not built for threads queue is polled instead
+        self._threaded_tcl = bool(int(self.tk.call('info', 'exists', 'tcl_platform(threaded)')))
+        if not self._threaded_tcl:
+            self.after(100, self._poll_queue)
 
         ## Load settings
         # whether to show tree/blob vertices and edges
         self._settings = UserSettings()
         self._settings.load()
+        # parsed git objects are kept across sessions, None if cache can't be opened
+        self._object_cache = objcache.open_cache(self._settings.get_cache_path())
+        self.model.object_cache = self._object_cache
         self._show_trees = tk.BooleanVar(value=self._settings.get_show_tree())
         self.view.show_trees = self._show_trees.get()
+        self._auto_refresh = tk.BooleanVar(value=self._settings.get_auto_refresh())
 
         self._current_file = None
         # list of user actions for debugging entry = ('action', 'object_label')
@@ -49,6 +72,12 @@ class GraphApp(tk.Tk):
         
         self.status = tk.Label(self, text=self.DEFAULT_MESSAGE, anchor='w', justify='left')
         self.status.pack(side="bottom", fill=tk.X)
+        # loading progress, shown while git folder is loaded
+        self._progress_frame = ttk.Frame(self)
+        self._progress = ttk.Progressbar(self._progress_frame, mode='determinate')
+        self._progress.pack(side='left', fill=tk.X, expand=True, padx=2, pady=2)
+        ttk.Button(self._progress_frame, text='Cancel', command=self.cancel_loading).pack(side='right')
+        self.bind('<Escape>', lambda e: self.cancel_loading())
 
         # trigger function execution on exit
         self.protocol("WM_DELETE_WINDOW", self.on_exit) 
@@ -62,6 +91,7 @@ class GraphApp(tk.Tk):
         file_menu.add_command(label='Open diagram file', command=self._menu_open_file)
         file_menu.add_command(label='Save diagram file', command=self._menu_save_file)
         file_menu.add_command(label='Save as', command=self._menu_saveas_file)
+        file_menu.add_command(label='Export image', command=self._menu_export_image)
         file_menu.add_separator()
         file_menu.add_separator()
         file_menu.add_command(label='Exit', command=self._menu_exit_app)
@@ -70,11 +100,21 @@ class GraphApp(tk.Tk):
         view_menu = tk.Menu(menubar, tearoff=0)
         view_menu.add_command(label='Reset filter', command=self._menu_view_reset)
         view_menu.add_command(label='Refresh from Repo', command=self._menu_view_refresh)
+        view_menu.add_command(label='Load history', command=self._menu_view_history)
+        view_menu.add_command(label='Auto layout', command=self._menu_view_layout)
+        view_menu.add_separator()
+        view_menu.add_command(label='Zoom in', command=lambda: self.view.zoom_in())
+        view_menu.add_command(label='Zoom out', command=lambda: self.view.zoom_out())
+        view_menu.add_command(label='Reset zoom', command=lambda: self.view.reset_zoom())
         view_menu.add_separator()    
         view_menu.add_checkbutton(label='Show containers', 
                                   onvalue=True, offvalue=False,
                                   variable=self._show_trees,
                                   command=self._toggle_show_trees)
+        view_menu.add_checkbutton(label='Auto refresh',
+                                  onvalue=True, offvalue=False,
+                                  variable=self._auto_refresh,
+                                  command=self._toggle_auto_refresh)
         menubar.add_cascade(label='View', menu=view_menu)
         model_menu = tk.Menu(menubar, tearoff=0)
         model_menu.add_command(label='Model', command=self._menu_print_model)
@@ -140,6 +180,23 @@ class GraphApp(tk.Tk):
             except Exception:
                 pass
 
+    def _menu_export_image(self):
+        """Export the current graph to SVG or PNG image."""
+        try:
+            filepath = filedialog.asksaveasfilename(title="Export image", defaultextension=".svg",
+                                                    filetypes=[("SVG image", "*.svg"), ("PNG image", "*.png")])
+        except Exception:
+            filepath = None
+        if not filepath:
+            return
+        try:
+            export.export(self.model, filepath, show_trees=self._show_trees.get())
+        except Exception as e:
+            try:
+                messagebox.showerror("Export image", f"Error exporting image to '{filepath}': {e}", parent=self)
+            except Exception:
+                pass
+
     def _menu_exit_app(self):
         self._settings.save()
         self.quit()
@@ -151,14 +208,58 @@ class GraphApp(tk.Tk):
         self.update_status_bar()
 
     def _menu_view_refresh(self):
+        self.update_status_bar(f'Refreshing ...', 'red')
+        self.refresh_repo()
+
+    def refresh_repo(self):
+        """Read changed refs in background, model is updated when they are read.
+
+        Menus stay enabled. If refs are being read already or a background
+        job changes the model (View menu is disabled then), refresh is done
+        after it.
+        """
+        if self._refreshing or self.menubar.entrycget('View', 'state') == 'disabled':
+            self._refresh_pending = True
+            return
+        self._refresh_pending = False
+        self._refreshing = True
+        # trigger reading of refs from git folder
+        loader = threading.Thread(target=self.refresh_from_folder, args=(self.model,), daemon=True)
+        loader.start()
+
+    def _menu_view_history(self):
         global threadresult
 
+        if not self.model.repo_dir:
+            return
+        try:
+            answer = simpledialog.askstring("Load history",
+                                            "Number of last commits or date (e.g. 500 or 2024-01-01):", parent=self)
+        except Exception:
+            answer = None
+        if not answer or not answer.strip():
+            return
+        answer = answer.strip()
+        max_count, since = (int(answer), None) if answer.isdigit() else (None, answer)
         self.menubar.entryconfig('View', state='disabled')
-        self.update_status_bar(f'Refreshing ...', 'red')
+        self.update_status_bar(f'Loading history ...', 'red')
         threadresult = False
-        self.after(100, self.process_queue)
-        # trigger model refresh from git folder
-        loader = threading.Thread(target=self.refresh_from_folder, daemon=True)
+        # trigger history loading from git folder, below commits of model
+        y = self.model.history_y()
+        loader = threading.Thread(target=self.history_from_folder, args=(self.model, max_count, since, y), daemon=True)
+        loader.start()
+
+    def _menu_view_layout(self):
+        global threadresult
+
+        snapshot = self.model.layout_snapshot()
+        if snapshot is None:
+            return
+        self.menubar.entryconfig('View', state='disabled')
+        self.update_status_bar(f'Laying out ...', 'red')
+        threadresult = False
+        # trigger layout of commits and edges copied from the model
+        loader = threading.Thread(target=self.layout_model, args=(self.model, snapshot), daemon=True)
         loader.start()
 
     def _menu_print_model(self):
@@ -229,7 +330,27 @@ class GraphApp(tk.Tk):
         self._user_actions.append( ('toggle_show_trees', '->' + str(self._show_trees.get())) )
         self.view.render_model()
 
+    def _toggle_auto_refresh(self):
+        self._settings.set_auto_refresh(self._auto_refresh.get())
+        self._watch_repo()
+
+    def _watch_repo(self):
+        """Watch refs of repository of the model while auto refresh is on."""
+        gitdir = None
+        if self._auto_refresh.get() and self.model.repo_dir:
+            gitdir = self.model._resolve_git_dir(self.model.repo_dir)
+        if self._watcher is not None:
+            if self._watcher.gitdir == gitdir:
+                return
+            self._watcher.stop()
+            self._watcher = None
+        if gitdir:
+            # changes are refreshed like by View -> Refresh from Repo
+            self._watcher = watcher.RefWatcher(gitdir, lambda: self.post('REFSCHANGED'))
+
     def on_exit(self):
+        if self._watcher is not None:
+            self._watcher.stop()
         self._settings.save()
         self.destroy()
 
@@ -242,60 +363,206 @@ class GraphApp(tk.Tk):
         self.view.on_new_model(self.model)
         self.update_status_bar()
         self.update_title()
+        self._watch_repo()
 
     def on_update_model(self):
         self.view.on_update_model()
         self.update_status_bar()
         self.update_title()      
+        self._watch_repo()
 
-    def refresh_from_folder(self):
+    def refresh_from_folder(self, model):
         '''
-        Background job to refresh model from git folder
-        '''    
-        global threadresult
+        Background job to read changed refs from git folder
 
-        res = self.model.reload_refs()
-        threadresult = res
-        self._queue.put("REFRESHEDFOLDER")
+        Model is not changed here, change set is applied by GUI thread.
+        '''
+        self.post(('REFRESHEDFOLDER', (model, model.read_ref_changes())))
+
+    def history_from_folder(self, model, max_count=None, since=None, y=60):
+        '''
+        Background job to load commit history from git folder
+
+        Commits are read in batches which are posted to GUI thread, it adds
+        them to the model while next ones are read.
+        '''
+        for batch in model.read_history_batches(max_count, since, y=y):
+            self.post(('HISTORYPROGRESS', (model, batch)))
+        self.post("LOADEDHISTORY")
+
+    def layout_model(self, model, snapshot):
+        '''
+        Background job to lay out commits of the model
+
+        Positions are computed from snapshot of the model and posted to
+        GUI thread, it moves the vertices.
+        '''
+        try:
+            positions = layout.layered_layout(*snapshot)
+        except Exception:
+            positions = None
+        self.post(('LAIDOUT', (model, positions)))
 
     def load_from_folder(self, gitfolder:str):
         '''
         Background job to load model from git folder
+
+        Refs are read in batches which are posted to GUI thread, it adds
+        them to the model and renders them while next ones are read.
         '''
         global threadresult
 
-        self._load_model = GraphModel()
-        self._load_model.load_refs(gitfolder)
-        self._queue.put("LOADEDFOLDER")
+        threadresult = False
+        for batch in self._load_model.read_refs_batches(gitfolder, self._load_cancel):
+            self.post(('LOADPROGRESS', batch))
+            threadresult = True
+        self.post("LOADEDFOLDER")
+
+    def cancel_loading(self):
+        """Stop loading of git folder, refs loaded so far are kept."""
+        if self._load_model is not None:
+            self._load_cancel.set()
+            self.update_status_bar('Cancelling ...', 'red')
+
+    def _add_loaded_batch(self, batch):
+        """Add batch of refs read by load_from_folder to loaded model."""
+        if self._load_cancel.is_set():
+            # batches read before cancel are dropped
+            return
+        if self.model is not self._load_model:
+            # first batch, loaded model replaces current one
+            self.model.close()
+            self.model = self._load_model
+            self._current_file = None
+            self.model.add_refs_batch(batch)
+            self.on_new_model()
+        else:
+            self.model.add_refs_batch(batch)
+        self._progress.config(maximum=max(batch['total'], 1), value=batch['done'])
+        self.update_status_bar(f"Loading {self.model.repo_dir} ... {batch['done']} of {batch['total']} refs", 'red')
+
+    def post(self, message):
+        """Send message from background thread to GUI thread.
+
+        Message is queued and GUI thread is woken up by a virtual event,
+        one event for all messages posted until it processes them.
+        """
+        self._queue.put(message)
+        if self._wakeup_pending or not self._threaded_tcl:
+            return
+        self._wakeup_pending = True
+        try:
+            # tkinter passes calls from other threads to the GUI thread
+            self.event_generate('<<QueueMessage>>', when='tail')
+        except Exception:
+            # event can't be generated, e.g. main loop does not run yet:
+            # try to drain queue later, next post tries the event again
+            self._wakeup_pending = False
+            try:
+                self.after(100, self.process_queue)
+            except Exception:
+                # GUI is closed or not running, messages stay queued
+                pass
 
-    def process_queue(self):
-        """Process messages from the background thread."""
+    def process_queue(self, event=None):
+        """Process messages from the background threads.
+
+        All waiting messages are processed at once, model changes of all of
+        them are rendered together.
+        """
+        self._wakeup_pending = False
+        render = False
+        deadline = time.monotonic() + 0.05
+        while True:
+            if time.monotonic() > deadline:
+                # keep GUI responsive, continue after pending events
+                self.after(1, self.process_queue)
+                break
+            try:
+                message = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            render = self._handle_message(message) or render
+        if render:
+            self.view.render_model()
+
+    def _poll_queue(self):
+        # used only when Tcl is not threaded and messages can't wake GUI up
+        self.process_queue()
+        self.after(100, self._poll_queue)
+
+    def _handle_message(self, message):
+        """Handle one message, return True if changes of model should be rendered."""
         global threadresult
 
-        try:
-            message = self._queue.get_nowait()
-            if message == 'LOADEDFOLDER':
-                # model loaded from git folder
-                self.model = self._load_model
-                self._load_model = None
-                self._current_file = None
-                self.on_new_model()
-            elif message == 'REFRESHEDFOLDER':
-                #model refreshed
-                if threadresult:
-                    self.on_update_model()
-                else:
-                    try:
-                        messagebox.showerror("Refresh from repo",
-                                            f"Error while loading from '{self.model.repo_dir}'. Please, check the path", 
-                                            parent=self)
-                    except Exception:
-                        pass
-            self.menubar.entryconfig('File', state='normal')
-            self.menubar.entryconfig('View', state='normal')
-        except queue.Empty:
-            # Continue polling if no message in queue
-            self.after(100, self.process_queue)
+        name, data = message if isinstance(message, tuple) else (message, None)
+        if name == 'LOADPROGRESS':
+            self._add_loaded_batch(data)
+            return True
+        if name == 'HISTORYPROGRESS':
+            # batch of commits read, dropped if model was replaced since
+            model, batch = data
+            if model is not self.model:
+                return False
+            result = self.model.add_history_batch(batch)
+            if result is not None:
+                threadresult = result is not False
+            return True
+        if name == 'REFSCHANGED':
+            # reported by watcher of refs
+            self.refresh_repo()
+            return False
+        if name == 'REFRESHEDFOLDER':
+            # refs read, model is changed now unless it was replaced
+            self._refreshing = False
+            model, changes = data
+            self.update_status_bar()
+            if changes is False:
+                try:
+                    messagebox.showerror("Refresh from repo",
+                                        f"Error while loading from '{model.repo_dir}'. Please, check the path",
+                                        parent=self)
+                except Exception:
+                    pass
+                return False
+            render = bool(changes and model is self.model and self.model.apply_ref_changes(changes))
+            if self._refresh_pending:
+                self.refresh_repo()
+            return render
+        if name == 'LOADEDFOLDER':
+            # model loaded from git folder, completely or until cancelled
+            partial = self._load_cancel.is_set() and self.model is self._load_model
+            if not threadresult and not self._load_cancel.is_set():
+                try:
+                    messagebox.showerror("Open folder", "Error while loading git folder.", parent=self)
+                except Exception:
+                    pass
+            self._load_model = None
+            self._progress_frame.pack_forget()
+            self.update_status_bar('Loading cancelled, Refresh from Repo loads the rest.' if partial else None, 'red' if partial else 'black')
+            self.update_title()
+        elif name == 'LAIDOUT':
+            # move vertices unless model was replaced, render model again
+            model, positions = data
+            if positions is not None and model is self.model:
+                threadresult = self.model.apply_layout(positions)
+                self.on_update_model()
+        elif name == 'LOADEDHISTORY':
+            #history loaded
+            if threadresult:
+                self.on_update_model()
+            else:
+                try:
+                    messagebox.showerror("Load history",
+                                        f"Error while loading from '{self.model.repo_dir}'. Please, check the path", 
+                                        parent=self)
+                except Exception:
+                    pass
+        self.menubar.entryconfig('File', state='normal')
+        self.menubar.entryconfig('View', state='normal')
+        if self._refresh_pending:
+            self.refresh_repo()
+        return False
 
     def open_file(self, filepath):
         try:
@@ -327,8 +594,12 @@ class GraphApp(tk.Tk):
                 pass
             return
         self.menubar.entryconfig('File', state='disabled')
+        self.menubar.entryconfig('View', state='disabled')
         self.update_status_bar(f'Loading {gitfolder} ...', 'red')
-        self.after(100, self.process_queue)
+        self._load_model = GraphModel(object_cache=self._object_cache)
+        self._load_cancel.clear()
+        self._progress.config(value=0)
+        self._progress_frame.pack(side='bottom', fill=tk.X, before=self.status)
         # trigger model loading from git folder
         loader = threading.Thread(target=self.load_from_folder, args=(gitfolder,), daemon=True)
         loader.start()
@@ -347,10 +618,11 @@ if __name__ == '__main__':
     # render empty model
     app.on_update_model()
     
-    # load only branch vertices and tip commits for fast startup
+    # load only branch vertices and tip commits for fast startup,
+    # started within main loop so that loader can wake GUI thread up
     try:
         if startup == 'GITDIR':
-            app.open_folder(param)
+            app.after_idle(app.open_folder, param)
         if startup == 'DIAGRAMFILE':
             app.open_file(param)
     except Exception:
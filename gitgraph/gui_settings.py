@@ -14,6 +14,7 @@ class UserSettings:
         self.file_path = os.path.join(self.file_path, "settings.json")
         self.max_items = max_items
         self._show_tree = True
+        self._auto_refresh = False
         #self.mru = self.load()
         self.mru = []
 
@@ -23,13 +24,15 @@ class UserSettings:
                 data = json.load(f)
                 self.mru = data.get("mru", [])
                 self._show_tree = data.get("show_tree", True)
+                self._auto_refresh = data.get("auto_refresh", False)
         except:
             self.mru = []
             self._show_tree = True
+            self._auto_refresh = False
 
     def save(self):
         with open(self.file_path, "w") as f:
-            json.dump({"mru": self.mru, "show_tree": self._show_tree}, f, indent=4)
+            json.dump({"mru": self.mru, "show_tree": self._show_tree, "auto_refresh": self._auto_refresh}, f, indent=4)
 
     def add_file(self, filepath):
         filepath = os.path.abspath(filepath)
@@ -50,6 +53,10 @@ class UserSettings:
         if filepath in self.mru:
             self.mru.remove(filepath)
 
+    def get_cache_path(self):
+        """Return path of the persistent git object cache."""
+        return os.path.join(os.path.dirname(self.file_path), "objects.sqlite")
+
     def get_mru_list(self):
         return self.mru
 
@@ -58,4 +65,10 @@ class UserSettings:
 
     def set_show_tree(self, value):
         self._show_tree = value
+
+    def get_auto_refresh(self):
+        return self._auto_refresh
+
+    def set_auto_refresh(self, value):
+        self._auto_refresh = value
     
@@ -0,0 +1,187 @@
+"""Layered layout of commit graphs.
+
+layered_layout() places a DAG in the Sugiyama style: layers by generation
+number, crossing reduction by barycenter sweeps and coordinate assignment
+keeping vertex order within layers. place_new() places vertices added to an
+already laid out graph without moving the others.
+
+Sweeps and coordinates use NumPy when it is installed, otherwise the same
+steps run in plain Python.
+"""
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SWEEPS = 8
+ALIGN_ROUNDS = 4
+
+
+def layered_layout(nodes, edges, x0=100, y0=100, spacing=150, row_height=40):
+    """Return dict node -> (x, y) for all `nodes`.
+
+    edges: (parent, child) pairs of nodes, child gets the higher layer so
+    it is drawn above its parents. Columns are `spacing` apart, layers
+    `row_height` apart starting with the newest at y0.
+    """
+    nodes = list(nodes)
+    n = len(nodes)
+    if n == 0:
+        return {}
+    index = {label: i for i, label in enumerate(nodes)}
+    src, dst = [], []
+    for p, c in edges:
+        ip, ic = index.get(p), index.get(c)
+        if ip is not None and ic is not None and ip != ic:
+            src.append(ip)
+            dst.append(ic)
+    layer = _generations(n, src, dst)
+    if np is not None:
+        x = _coordinates_np(layer, src, dst)
+    else:
+        x = _coordinates_py(layer, src, dst)
+    top = max(layer)
+    return {label: (x0 + x[i] * spacing, y0 + (top - layer[i]) * row_height)
+            for i, label in enumerate(nodes)}
+
+
+def _generations(n, src, dst):
+    """Generation number: 0 for nodes without parents, else 1 + max of parents.
+
+    Nodes on cycles (not possible in git history) get the generation of
+    their processed parents.
+    """
+    children = [[] for _ in range(n)]
+    pending = [0] * n
+    for p, c in zip(src, dst):
+        children[p].append(c)
+        pending[c] += 1
+    layer = [0] * n
+    queue = deque(i for i in range(n) if pending[i] == 0)
+    while queue:
+        v = queue.popleft()
+        lv = layer[v] + 1
+        for c in children[v]:
+            if layer[c] < lv:
+                layer[c] = lv
+            pending[c] -= 1
+            if pending[c] == 0:
+                queue.append(c)
+    return layer
+
+
+def _coordinates_np(layer, src, dst):
+    """Column of each node, all layers are processed at once in every step."""
+    n = len(layer)
+    layer = np.asarray(layer, dtype=np.int64)
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    # first index in layer-sorted order of each layer
+    start = np.concatenate(([0], np.cumsum(np.bincount(layer))))[:-1]
+    pos = np.zeros(n)
+    order = np.argsort(layer, kind='stable')
+    pos[order] = np.arange(n) - start[layer[order]]
+
+    def mean_of(nbr_pos, at, default):
+        sums = np.bincount(at, weights=nbr_pos, minlength=n)
+        counts = np.bincount(at, minlength=n)
+        return np.where(counts > 0, sums / np.maximum(counts, 1), default)
+
+    # crossing reduction: order by barycenter of parents, then of children
+    for sweep in range(SWEEPS):
+        if sweep % 2 == 0:
+            bary = mean_of(pos[src], dst, pos)
+        else:
+            bary = mean_of(pos[dst], src, pos)
+        order = np.lexsort((pos, bary, layer))
+        pos[order] = np.arange(n) - start[layer[order]]
+
+    # coordinates: move nodes towards their neighbours keeping order and
+    # distance at least one column, the layer offset separates layers
+    # in the running maximum
+    rank = pos[order]
+    big = float((ALIGN_ROUNDS + 3) * n + 4)
+    offset = layer[order] * big
+    x = pos.copy()
+    for _ in range(ALIGN_ROUNDS):
+        both = np.concatenate((src, dst))
+        wanted = mean_of(x[np.concatenate((dst, src))], both, x)
+        shifted = np.maximum.accumulate(wanted[order] - rank + offset)
+        x[order] = shifted - offset + rank
+    return np.floor(x - x.min() + 0.5).astype(np.int64).tolist()
+
+
+def _coordinates_py(layer, src, dst):
+    """Plain Python version of _coordinates_np."""
+    n = len(layer)
+    parents = [[] for _ in range(n)]
+    children = [[] for _ in range(n)]
+    for p, c in zip(src, dst):
+        parents[c].append(p)
+        children[p].append(c)
+    pos = [0.0] * n
+    seen = {}
+    for i in range(n):
+        pos[i] = float(seen.get(layer[i], 0))
+        seen[layer[i]] = pos[i] + 1
+
+    def mean_of(nbrs, values, v):
+        if not nbrs:
+            return values[v]
+        return sum(values[u] for u in nbrs) / len(nbrs)
+
+    order = sorted(range(n), key=lambda v: (layer[v], pos[v]))
+    for sweep in range(SWEEPS):
+        adj = parents if sweep % 2 == 0 else children
+        bary = [mean_of(adj[v], pos, v) for v in range(n)]
+        order = sorted(range(n), key=lambda v: (layer[v], bary[v], pos[v]))
+        _renumber(order, layer, pos)
+
+    x = pos[:]
+    for _ in range(ALIGN_ROUNDS):
+        wanted = [mean_of(parents[v] + children[v], x, v) for v in range(n)]
+        prev_layer, prev_x = None, 0.0
+        for v in order:
+            xv = wanted[v]
+            if layer[v] == prev_layer and xv < prev_x + 1:
+                xv = prev_x + 1
+            x[v] = xv
+            prev_layer, prev_x = layer[v], xv
+    low = min(x)
+    return [int(xv - low + 0.5) for xv in x]
+
+
+def _renumber(order, layer, pos):
+    """Set pos to index within layer following `order`."""
+    prev_layer, i = None, 0
+    for v in order:
+        if layer[v] != prev_layer:
+            prev_layer, i = layer[v], 0
+        pos[v] = float(i)
+        i += 1
+
+
+def place_new(nodes, wanted, occupied, spacing=150, max_shift=50):
+    """Return dict node -> (x, y) of free positions for newly added nodes.
+
+    wanted: node -> (x, y) preferred position, the layer (y) is kept and
+    the nearest column not `occupied(x, y)` is taken, alternating right
+    and left. Nodes placed earlier in `nodes` occupy their positions too.
+    """
+    placed = {}
+    taken = set()
+    for node in nodes:
+        x, y = wanted[node]
+        for step in range(2 * max_shift + 1):
+            # 0, +1, -1, +2, -2, ... columns
+            shift = (step + 1) // 2 * (1 if step % 2 else -1)
+            cx = x + shift * spacing
+            if (cx, y) not in taken and not occupied(cx, y):
+                break
+        else:
+            cx = x
+        placed[node] = (cx, y)
+        taken.add((cx, y))
+    return placed
@@ -0,0 +1,127 @@
+"""Level of detail for zoomed out rendering.
+
+Contains class Overview: aggregated graph of a GraphModel where linear
+commit chains and clusters of tree/blob vertices are replaced by group
+nodes, used by GraphView at low zoom.
+"""
+import spatial
+
+class Overview:
+    """Aggregated graph of displayed model vertices.
+
+    nodes: key -> {'x', 'y', 'rx', 'ry', 'type', 'count'}, key is vertex
+    label for vertices not in a group. Groups have type 'chain' or 'cluster',
+    their key starts with '#'. Position and half sizes are model coordinates.
+    edges: (src key, dst key) -> oriented
+    rep: vertex label -> key of its group
+    """
+
+    def __init__(self, model, displayed, size_of, min_chain=3):
+        """`displayed(view)` tells if vertex is shown, `size_of(label)` gives
+        its (half-width, half-height)."""
+        self.model = model
+        self.nodes = {}
+        self.edges = {}
+        self.rep = {}
+        shown = {label for label, v in model.vertices.items() if displayed(v)}
+        self._collapse_chains(shown, min_chain)
+        self._collapse_clusters(shown)
+        for label in shown:
+            if label not in self.rep:
+                v = model.vertices[label]
+                rx, ry = size_of(label)
+                self.nodes[label] = {'x': v['x'], 'y': v['y'], 'rx': rx, 'ry': ry, 'type': v['type'], 'count': 1}
+        for e in model.edges:
+            s, d = e['src'], e['dst']
+            if s not in shown or d not in shown:
+                continue
+            key = (self.rep.get(s, s), self.rep.get(d, d))
+            if key[0] != key[1] and key not in self.edges:
+                self.edges[key] = e['oriented']
+        # grids of node boxes and edge segments, nodes are far apart at low zoom
+        self._node_grid = spatial.GridIndex(1024)
+        for key, n in self.nodes.items():
+            self._node_grid.insert(key, n['x'] - n['rx'], n['y'] - n['ry'], n['x'] + n['rx'], n['y'] + n['ry'])
+        self._edge_grid = spatial.GridIndex(1024)
+        for key in self.edges:
+            s_n, d_n = self.nodes[key[0]], self.nodes[key[1]]
+            self._edge_grid.insert_segment(key, s_n['x'], s_n['y'], d_n['x'], d_n['y'])
+
+    def _is_chain_link(self, label, shown):
+        """True if commit has one shown parent commit, one shown child commit and no refs."""
+        vertices, edges = self.model.vertices, self.model.edges
+        if vertices[label]['type'] != 'commit':
+            return False
+        # edges go from parent to child, refs point to commits like parents
+        parents = [e['src'] for e in edges.in_edges(label) if e['src'] in shown]
+        if len(parents) != 1 or vertices[parents[0]]['type'] != 'commit':
+            return False
+        children = [e['dst'] for e in edges.out_edges(label)
+                    if e['dst'] in shown and vertices[e['dst']]['type'] == 'commit']
+        return len(children) == 1
+
+    def _collapse_chains(self, shown, min_chain):
+        edges = self.model.edges
+        links = {label for label in shown if self._is_chain_link(label, shown)}
+        done = set()
+        for label in links:
+            if label in done:
+                continue
+            # walk to the oldest link of the chain, then collect to the newest
+            head = label
+            while True:
+                parent = [e['src'] for e in edges.in_edges(head) if e['src'] in shown][0]
+                if parent not in links or parent in done or parent == label:
+                    break
+                head = parent
+            chain = []
+            v = head
+            while v in links and v not in done:
+                done.add(v)
+                chain.append(v)
+                v = [e['dst'] for e in edges.out_edges(v)
+                     if e['dst'] in shown and self.model.vertices[e['dst']]['type'] == 'commit'][0]
+            if len(chain) >= min_chain:
+                self._add_group('#chain:' + chain[0], 'chain', chain)
+
+    def _collapse_clusters(self, shown):
+        vertices, edges = self.model.vertices, self.model.edges
+        container = ('tree', 'blob')
+        done = set()
+        for label in shown:
+            if label in done or vertices[label]['type'] not in container:
+                continue
+            # connected tree/blob vertices form a cluster
+            cluster = []
+            stack = [label]
+            done.add(label)
+            while stack:
+                v = stack.pop()
+                cluster.append(v)
+                for e in edges.out_edges(v) + edges.in_edges(v):
+                    other = e['dst'] if e['src'] == v else e['src']
+                    if other in shown and other not in done and vertices[other]['type'] in container:
+                        done.add(other)
+                        stack.append(other)
+            if len(cluster) > 1:
+                self._add_group('#cluster:' + min(cluster), 'cluster', cluster)
+
+    def _add_group(self, key, kind, members):
+        vertices = self.model.vertices
+        xs = [vertices[m]['x'] for m in members]
+        ys = [vertices[m]['y'] for m in members]
+        x1, y1, x2, y2 = min(xs), min(ys), max(xs), max(ys)
+        # at least the size of a vertex
+        self.nodes[key] = {'x': (x1 + x2) / 2, 'y': (y1 + y2) / 2,
+                           'rx': max((x2 - x1) / 2, 30), 'ry': max((y2 - y1) / 2, 20),
+                           'type': kind, 'count': len(members)}
+        for m in members:
+            self.rep[m] = key
+
+    def keys_in_rect(self, x1, y1, x2, y2):
+        """Return keys of nodes whose box intersects rectangle."""
+        return self._node_grid.query(x1, y1, x2, y2)
+
+    def edges_in_rect(self, x1, y1, x2, y2):
+        """Return keys of edges whose line between node centers touches rectangle."""
+        return self._edge_grid.query(x1, y1, x2, y2)
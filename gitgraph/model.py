@@ -4,23 +4,111 @@ Contains class GraphModel: simple in-memory directed graph with vertex
 attributes (x,y,label) and edge list.
 """
 import os
+import ast
+import heapq
+from collections import deque
 import subprocess
 
+import gitreader
+import gitstore
+import prefetch
+import ggdfile
+import layout
+from storage import VertexTable, EdgeList
+
 class GraphModel:
     """Data-only graph model: vertices and directed edges.
 
-    vertices: dict label -> {'x','y','type', 'visible'}, type in {'commit','branch','tree', 'blob', 'tag', 'tagobject'}, visible is bool
-    edges: list of {'src':src_label, 'dst':dst_label, 'oriented':True|False, 'label':str|None, 'path':str|None}
+    vertices: VertexTable label -> {'x','y','type', 'visible'}, type in {'commit','branch','tree', 'blob', 'tag', 'tagobject'}, visible is bool
+    edges: EdgeList of {'src':src_label, 'dst':dst_label, 'oriented':True|False, 'label':str|None, 'path':str|None}
+    Vertices and edges are stored in compact arrays, see storage.py. Edge path
+    is derived from tree structure, it is not stored.
     """
 
-    def __init__(self):
+    def __init__(self, object_cache=None):
         self.repo_dir = None  
-        self.vertices = {}
-        self.edges = []
+        self.vertices = VertexTable()
+        self.edges = EdgeList(self.vertices)
         self.init_commit = None
         self._filter = []
+        # path trie nodes on filter path as (filter, set of nodes)
+        self._filter_nodes = None
+        # ids of vertices hidden by applied filter, None if not known
+        self._filter_hidden = set()
         self._next_vid = 1
         # keep numeric counter for fallback/default labels if needed
+        self._prefetcher = None
+        # persistent cache of parsed objects shared across sessions (objcache.ObjectCache)
+        self.object_cache = object_cache
+        # ref storage state: loose ref path -> ((mtime, size), value),
+        # packed-refs ((mtime, size), {ref: hash}) and fingerprint of last load
+        self._ref_files = {}
+        self._packed_refs = None
+        self._refs_fingerprint = None
+        # ref type -> {name: tip hash} of refs in model, replaced, never
+        # changed in place, so that workers can read it, see read_ref_changes
+        self._ref_tips = {}
+
+    def _get_reader(self):
+        """Return object reader shared by all models of the current repository."""
+        if not self.repo_dir:
+            return None
+        gitdir = self._resolve_git_dir(self.repo_dir)
+        if gitdir:
+            # objects are read natively, git is used only as fallback
+            return gitstore.open_store(self.repo_dir, gitdir)
+        return gitreader.open_reader(self.repo_dir)
+
+    def _read_uncached(self, names):
+        """Read objects not kept in memory, persistent object cache is used first."""
+        reader = self._get_reader()
+        return reader.read_many(names, self.object_cache) if reader else {}
+
+    def _read_object(self, name):
+        return self._read_objects([name]).get(name)
+
+    def _read_objects(self, names):
+        """Read objects, records prefetched in background are used first."""
+        records = {}
+        if self._prefetcher is not None:
+            for n in names:
+                records[n] = self._prefetcher.get(n)
+        missing = [n for n in names if records.get(n) is None]
+        if missing:
+            records.update(self._read_uncached(missing))
+        return records
+
+    def prefetch(self, labels):
+        """Read objects for `labels` in background so expanding them is instant."""
+        if not self.repo_dir or not labels:
+            return
+        if self._prefetcher is None:
+            self._prefetcher = prefetch.Prefetcher(self._read_uncached)
+        self._prefetcher.request(labels)
+
+    def unexpanded(self, labels=None):
+        """Return labels of visible commits, tag objects and trees not expanded yet.
+
+        These are likely to be expanded next by the user.
+        """
+        result = []
+        for label in (labels if labels is not None else self.vertices):
+            v = self.vertices.get(label)
+            if v is None or not v['visible']:
+                continue
+            if v['type'] == 'commit':
+                if not any(self.vertices[e['dst']]['type'] == 'tree' for e in self.edges.out_edges(label)):
+                    result.append(label)
+            elif v['type'] in ('tree', 'tagobject'):
+                if not self.edges.out_edges(label):
+                    result.append(label)
+        return result
+
+    def close(self):
+        """Stop background work of the model."""
+        if self._prefetcher is not None:
+            self._prefetcher.stop()
+            self._prefetcher = None
 
     def add_vertex(self, x, y, label, vtype='commit'):
         """Add a vertex keyed by `label`.
@@ -41,7 +129,7 @@ class GraphModel:
         if vtype not in {'commit', 'branch', 'tree', 'blob', 'tag', 'tagobject'}:
             return False
         # add vertex keyed by label
-        self.vertices[label] = {'x': x, 'y': y, 'type': vtype, 'visible': True}
+        self.vertices.add(label, x, y, vtype, True)
         # increment the numeric counter for any fallback naming
         self._next_vid += 1
         return label
@@ -49,9 +137,24 @@ class GraphModel:
     def delete_vertex(self, label):
         if label not in self.vertices:
             return
-        del self.vertices[label]
         # remove edges referencing this vertex (labels)
-        self.edges = [e for e in self.edges if e['src'] != label and e['dst'] != label]
+        self.edges.remove_vertex(label)
+        if self._filter_hidden:
+            self._filter_hidden.discard(self.vertices.id_of(label))
+        del self.vertices[label]
+
+    def take_changes(self):
+        """Return changes of vertices and edges since last call.
+
+        Returns (added or changed vertex labels, removed vertex labels,
+        (src, dst) of added, changed or removed edges), or None if the
+        whole model may have changed (e.g. loaded from file).
+        """
+        changed, removed = self.vertices.take_changes()
+        edges = self.edges.take_changes()
+        if changed is None or edges is None:
+            return None
+        return changed, removed, edges
 
     def move_vertex(self, label, x, y):
         if label in self.vertices:
@@ -67,24 +170,137 @@ class GraphModel:
             return False
         if src_label not in self.vertices or dst_label not in self.vertices:
             return False
-        # check if edge already exists
-        existing_edges = [e for e in self.edges if e['src'] == src_label and e['dst'] == dst_label]
-        if len(existing_edges) == 0:
-            self.edges.append({'src': src_label, 'dst': dst_label, 'oriented': with_arrow, 'label': label, 'path':None})
-        current_edge = self.edges[-1] if len(existing_edges) == 0 else existing_edges[0]
-        path = self.get_path(dst_label)
-        current_edge['path'] = '/' + '/'.join(path[1:]) if len(path) > 0 else None
+        # existing edge is kept, count tells if edge was added
+        count = len(self.edges)
+        self.edges.add({'src': src_label, 'dst': dst_label, 'oriented': with_arrow, 'label': label})
+        exists = len(self.edges) == count
         # hide destination vertex if not on filter path
-        if len(self._filter) > 0 and current_edge['path'] is not None:
-            self.vertices[dst_label]['visible'] = self.get_filter_as_string().startswith(current_edge['path'])
-        return len(existing_edges) == 0
+        if len(self._filter) > 0:
+            node = self.edges.path_node(dst_label)
+            if node >= 0:
+                self._set_filtered(self.vertices.id_of(dst_label), node in self._get_filter_nodes())
+        return not exists
 
     def reload_refs(self, x0=100, y=60, spacing=150):
-        # remove edges linked from branches/tags to commit
-        refs = [v for v in self.vertices if self.vertices[v]['type'] in ['branch', 'tag' ]]
-        self.edges = [e for e in self.edges if e['src'] not in refs]
-        # load current branches/tags     
-        return self.load_refs(self.repo_dir, x0, y, spacing)
+        """Update branches/tags from repository.
+
+        Ref files are fingerprinted by modification time and size, if nothing
+        changed since last load, model is left as it is. Otherwise only refs
+        whose target changed are added, moved or deleted and only commits
+        not loaded yet are read.
+        """
+        changes = self.read_ref_changes()
+        if not changes:
+            return changes is None
+        return self.apply_ref_changes(changes, x0, y, spacing)
+
+    def read_ref_changes(self):
+        """Read refs of repository for reload_refs in background.
+
+        Only the repository is read and the model is not changed, updated
+        caches of ref files are returned in the change set, so it can run in
+        a worker thread while the GUI renders and edits the model. Tips are read for refs whose target differs from the refs last
+        applied. Returns change set for apply_ref_changes(), None if ref
+        files did not change since last load and False if repo is not
+        available.
+        """
+        # taken first, refs replaced since are detected by apply_ref_changes
+        base = self._ref_tips
+        gitdir = self._resolve_git_dir(self.repo_dir) if self.repo_dir else None
+        if not gitdir:
+            return False
+        fingerprint = self._scan_ref_files(gitdir)
+        if fingerprint == self._refs_fingerprint:
+            return None
+        reader = self._get_reader()
+        if isinstance(reader, gitstore.GitObjectStore):
+            # git gc packs refs and replaces packs at once
+            reader.refresh()
+        # caches of ref files are copied, model keeps them until the change
+        # set is applied
+        cache = {'ref_files': dict(self._ref_files), 'packed_refs': self._packed_refs}
+        refs = {'branch': self._read_refs_from_gitdir(gitdir, 'heads', fingerprint, cache),
+                'tag': self._read_refs_from_gitdir(gitdir, 'tags', fingerprint, cache)}
+        tips = [tip for ref_type, refs_to_tips in refs.items() for name, tip in refs_to_tips.items()
+                if base.get(ref_type, {}).get(name) != tip]
+        return {'base': base, 'refs': refs, 'records': self._read_objects(tips), 'fingerprint': fingerprint,
+                'cache': cache}
+
+    def apply_ref_changes(self, changes, x0=100, y=60, spacing=150):
+        """Update branches/tags by change set of read_ref_changes().
+
+        Only refs whose target changed since the refs last applied are
+        added, moved or deleted. Returns None without change if refs of
+        model were replaced since the change set was read, e.g. by loading
+        a file, True otherwise.
+        """
+        base = changes['base']
+        if base is not self._ref_tips:
+            return None
+        branches_to_commit, tags_to_commit = (
+            {name: tip for name, tip in changes['refs'][ref_type].items() if base.get(ref_type, {}).get(name) != tip}
+            for ref_type in ('branch', 'tag'))
+        # refs are loaded again, moved ones lose link to old tip
+        for refs_to_tips in (branches_to_commit, tags_to_commit):
+            for name, tip in refs_to_tips.items():
+                for e in self.edges.out_edges(name):
+                    if e['dst'] != tip[:8]:
+                        self.edges.remove(name, e['dst'])
+        # new refs are placed right of existing ones
+        x = x0
+        if any(name not in self.vertices for refs_to_tips in (branches_to_commit, tags_to_commit) for name in refs_to_tips):
+            ref_xs = [self.vertices[v]['x'] for v in self.vertices if self.vertices[v]['type'] in ['branch', 'tag']]
+            x = max(ref_xs) + spacing if ref_xs else x0
+        # commits expanded meanwhile are not added again
+        records = {tip: r for tip, r in changes['records'].items() if not self._is_expanded(tip[:8])}
+        x = self._add_refs_records(branches_to_commit, records, 'branch', x, y, spacing)
+        self._add_refs_records(tags_to_commit, records, 'tag', x, y, spacing)
+        if base:
+            # refs deleted in repo
+            names = set(changes['refs']['branch']) | set(changes['refs']['tag'])
+            for name in {name for refs_to_tips in base.values() for name in refs_to_tips} - names:
+                v = self.vertices.get(name)
+                if v is not None and v['type'] in ['branch', 'tag']:
+                    self.delete_vertex(name)
+        else:
+            # refs in model are not known, e.g. loaded from file
+            self._remove_extra_refs(changes['refs']['branch'], changes['refs']['tag'])
+        self._refs_fingerprint = changes['fingerprint']
+        self._ref_files = changes['cache']['ref_files']
+        self._packed_refs = changes['cache']['packed_refs']
+        self._ref_tips = changes['refs']
+        return True
+
+    def _scan_ref_files(self, gitdir):
+        """Return fingerprint of ref storage.
+
+        Dict mapping path of each loose branch/tag ref file and packed-refs
+        to (modification time, size).
+        """
+        stats = {}
+        def walk(path):
+            try:
+                entries = list(os.scandir(path))
+            except OSError:
+                return
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        walk(entry.path)
+                    elif entry.is_file():
+                        st = entry.stat()
+                        stats[entry.path] = (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    continue
+        for type in ('heads', 'tags'):
+            walk(os.path.join(gitdir, 'refs', type))
+        packed = os.path.join(gitdir, 'packed-refs')
+        try:
+            st = os.stat(packed)
+            stats[packed] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            pass
+        return stats
 
     def _resolve_git_dir(self, repo_dir):
         """Return the path to the .git directory for a working tree.
@@ -110,84 +326,136 @@ class GraphModel:
                 return None
         return None
 
-    def _read_refs_from_gitdir(self, gitdir, type):
+    def _read_refs_from_gitdir(self, gitdir, type, fingerprint=None, cache=None):
         """Read refs from the gitdir (refs/type and packed-refs).
         type can be heads or tags
+        Files with the same modification time and size as in the last read
+        are not read again.
+        cache: dict with ref_files and packed_refs used and updated instead
+        of those of the model, see read_ref_changes.
         Returns a dict mapping ref short name -> commit hash.
         """
+        if fingerprint is None:
+            fingerprint = self._scan_ref_files(gitdir)
+        if cache is None:
+            cache = {'ref_files': self._ref_files, 'packed_refs': self._packed_refs}
+            refs = self._read_refs_from_gitdir(gitdir, type, fingerprint, cache)
+            self._packed_refs = cache['packed_refs']
+            return refs
+        ref_files = cache['ref_files']
         refs = {}
         heads_dir = os.path.join(gitdir, 'refs', type)
-        # walk refs/<type>
-        if os.path.isdir(heads_dir):
-            for root, _, files in os.walk(heads_dir):
-                for fn in files:
-                    refpath = os.path.join(root, fn)
-                    try:
-                        with open(refpath, 'r', encoding='utf-8') as f:
-                            h = f.read().strip()
-                        # ref name is path relative to heads_dir
-                        rel = os.path.relpath(refpath, heads_dir)
-                        ref_name = rel.replace(os.sep, '/')
-                        if h:
-                            refs[ref_name] = h
-                    except Exception:
-                        continue
-        # also read packed-refs
         packed = os.path.join(gitdir, 'packed-refs')
-        if os.path.isfile(packed):
-            try:
-                with open(packed, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line or line.startswith('#') or line.startswith('^'):
-                            continue
-                        parts = line.split()
-                        if len(parts) >= 2:
-                            h, ref = parts[0], parts[1]
-                            if ref.startswith('refs/' + type + '/'):
-                                ref_name = ref[len('refs/' + type + '/'):]
-                                # prefer refs files over packed-refs (do not override)
-                                if ref_name not in refs:
-                                    refs[ref_name] = h
-            except Exception:
-                pass
+        # loose refs in refs/<type>
+        for refpath, stat in fingerprint.items():
+            if not refpath.startswith(heads_dir + os.sep):
+                continue
+            cached = ref_files.get(refpath)
+            if cached is not None and cached[0] == stat:
+                h = cached[1]
+            else:
+                try:
+                    with open(refpath, 'r', encoding='utf-8') as f:
+                        h = f.read().strip()
+                except Exception:
+                    continue
+                ref_files[refpath] = (stat, h)
+            # ref name is path relative to heads_dir
+            rel = os.path.relpath(refpath, heads_dir)
+            ref_name = rel.replace(os.sep, '/')
+            if h:
+                refs[ref_name] = h
+        # also read packed-refs
+        stat = fingerprint.get(packed)
+        if stat is not None:
+            if cache['packed_refs'] is None or cache['packed_refs'][0] != stat:
+                cache['packed_refs'] = (stat, self._read_packed_refs(packed))
+            prefix = 'refs/' + type + '/'
+            for ref, h in cache['packed_refs'][1].items():
+                if ref.startswith(prefix):
+                    ref_name = ref[len(prefix):]
+                    # prefer refs files over packed-refs (do not override)
+                    if ref_name not in refs:
+                        refs[ref_name] = h
+
+        return refs
 
+    def _read_packed_refs(self, packed):
+        """Return dict full ref name -> hash from packed-refs file."""
+        refs = {}
+        try:
+            with open(packed, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith('#') or line.startswith('^'):
+                        continue
+                    parts = line.split()
+                    if len(parts) >= 2:
+                        refs[parts[1]] = parts[0]
+        except Exception:
+            pass
         return refs
 
+    def _is_expanded(self, label):
+        """True if parents/tree of commit (or target of tag object) are loaded."""
+        if label not in self.vertices:
+            return False
+        targets = self.edges.out_edges(label)
+        if self.vertices[label]['type'] == 'commit':
+            return any(self.vertices[e['dst']]['type'] == 'tree' for e in targets)
+        return len(targets) > 0
+
     def _add_refs_with_tips(self, refs_to_tips, ref_type, x0=100, y=60, spacing=150):
         '''
         Add refs (branches/tags) with tips to model
         '''
-        refs = list(refs_to_tips.keys())
+        # read all tip objects not loaded yet in one pipelined request
+        tips = [tip for tip in refs_to_tips.values() if not self._is_expanded(tip[:8])]
+        return self._add_refs_records(refs_to_tips, self._read_objects(tips), ref_type, x0, y, spacing)
+
+    def _add_refs_records(self, refs_to_tips, records, ref_type, x0=100, y=60, spacing=150):
+        '''
+        Add refs with tips, records are parsed tip objects read before.
+        Returns x of the next new ref.
+        '''
         x = x0
-        
-        for b in refs:
+        for b in refs_to_tips:
             tip = refs_to_tips.get(b)
-            # add branch/tag vertex
-            added = self.add_vertex(x, y, b, vtype=ref_type)
-                
+            # add branch/tag vertex, existing one keeps its position
+            if b not in self.vertices:
+                self.add_vertex(x, y, b, vtype=ref_type)
+                x += spacing
+            bx, by = self.vertices[b]['x'], self.vertices[b]['y']
+
             # add tip commit vertex directly below branch/tag (y + 40)
             short_hash = tip[:8]
             commit_label = f'{short_hash}'
             if commit_label not in self.vertices:
                 # position commit below branch/tag
-                self.add_vertex(x, y + 40, commit_label, vtype='commit')
+                self.add_vertex(bx, by + 40, commit_label, vtype='commit')
 
             # connect branch to tip commit (undirected edge)
             try:
                 self.add_edge(b, commit_label, with_arrow=False, label=None)
             except Exception:
                 pass
-            self.load_commit_related(tip, x , y + 40*2)
-            x += spacing
+            if tip in records:
+                self._add_commit_record(tip, records.get(tip), bx , by + 40*2)
         return x       
 
     def clean_model(self):
+        self.close()
         self.vertices.clear()
         self.edges.clear()
         self._filter.clear()
+        self._filter_nodes = None
+        self._filter_hidden = set()
         self.repo_dir = None
         self.init_commit = None        
+        self._ref_files = {}
+        self._packed_refs = None
+        self._refs_fingerprint = None
+        self._ref_tips = {}
 
     def load_refs(self, repo_dir, x0=100, y=60, spacing=150):
         """Load branch/tag names from a local git repository and add them as vertices.
@@ -207,63 +475,248 @@ class GraphModel:
             return False
 
         self.repo_dir = repo_dir
+        fingerprint = self._scan_ref_files(gitdir)
         #load branches
         try:
-            branches_to_commit = self._read_refs_from_gitdir(gitdir, 'heads')
+            branches_to_commit = self._read_refs_from_gitdir(gitdir, 'heads', fingerprint)
         except Exception:
             branches_to_commit = {}
-        x = self._add_refs_with_tips(branches_to_commit, 'branch', x0, y, spacing)
-
         #load tags
         try:        
-            tags_to_commit = self._read_refs_from_gitdir(gitdir, 'tags')
+            tags_to_commit = self._read_refs_from_gitdir(gitdir, 'tags', fingerprint)
         except Exception:
             tags_to_commit = {}
+        return self._load_refs_from_gitdir(gitdir, branches_to_commit, tags_to_commit, fingerprint, x0, y, spacing)
+
+    def read_refs_batches(self, repo_dir, cancel=None, first=100, size=2000, x0=100, spacing=150):
+        """Read refs of a local git repository in batches for progressive loading.
+
+        Generator of batches for add_refs_batch(). Only reading is done here,
+        so it can run in a background thread while the GUI thread adds the
+        batches to the model. The first batch is small to be shown quickly,
+        next ones grow up to `size` refs. Reading stops when `cancel`
+        (threading.Event) is set. Nothing is yielded if the repo is invalid.
+        Batch is dict with keys type, refs (name -> tip hash), records
+        (parsed tip objects), x (position of its first ref), done and total
+        (refs read so far and in repo) and fingerprint, set in the last one.
+        """
+        if not repo_dir or not os.path.isdir(repo_dir):
+            return
+        gitdir = self._resolve_git_dir(repo_dir)
+        if not gitdir:
+            return
+        self.repo_dir = repo_dir
+        fingerprint = self._scan_ref_files(gitdir)
+        typed = []
+        for ref_type, type in (('branch', 'heads'), ('tag', 'tags')):
+            try:
+                refs = self._read_refs_from_gitdir(gitdir, type, fingerprint)
+            except Exception:
+                refs = {}
+            typed.extend((ref_type, name, tip) for name, tip in refs.items())
+        total = len(typed)
+        start, count = 0, first
+        while True:
+            if cancel is not None and cancel.is_set():
+                return
+            # batch has refs of one type only
+            chunk = typed[start:start + count]
+            chunk = [r for r in chunk if r[0] == chunk[0][0]] if chunk else []
+            refs = {name: tip for _, name, tip in chunk}
+            records = self._read_objects(list(refs.values())) if refs else {}
+            done = start + len(chunk)
+            yield {'type': chunk[0][0] if chunk else 'branch', 'refs': refs, 'records': records,
+                   'x': x0 + start * spacing, 'done': done, 'total': total,
+                   'fingerprint': fingerprint if done >= total else None}
+            if done >= total:
+                return
+            start, count = done, min(count * 2, size)
+
+    def add_refs_batch(self, batch, y=60, spacing=150):
+        """Add batch of refs read by read_refs_batches() to model.
+
+        Returns True after the last batch, the model is then up to date
+        with the repository.
+        """
+        self._add_refs_records(batch['refs'], batch['records'], batch['type'], batch['x'], y, spacing)
+        tips = dict(self._ref_tips.get(batch['type'], {}))
+        tips.update(batch['refs'])
+        self._ref_tips = dict(self._ref_tips, **{batch['type']: tips})
+        if batch['fingerprint'] is None:
+            return False
+        self._refs_fingerprint = batch['fingerprint']
+        return True
+
+    def _load_refs_from_gitdir(self, gitdir, branches_to_commit, tags_to_commit, fingerprint, x0=100, y=60, spacing=150):
+        x = self._add_refs_with_tips(branches_to_commit, 'branch', x0, y, spacing)
         self._add_refs_with_tips(tags_to_commit, 'tag', x, y, spacing)
-        
+        self._remove_extra_refs(branches_to_commit, tags_to_commit)
+        self._refs_fingerprint = fingerprint
+        self._ref_tips = {'branch': dict(branches_to_commit), 'tag': dict(tags_to_commit)}
+        return True
+
+    def _remove_extra_refs(self, branches_to_commit, tags_to_commit):
         # remove branches/tags from model if they are not in repo. Usefull for refresh
-        refs = list(branches_to_commit.keys()) + list(tags_to_commit.keys())
+        refs = set(branches_to_commit.keys()) | set(tags_to_commit.keys())
         extra_refs = [item for item in self.vertices if item not in refs and self.vertices[item]['type'] in ['branch', 'tag']]
         for b in extra_refs:
-            self.delete_vertex(b)            
-        return True
+            self.delete_vertex(b)
+
+    def load_history(self, max_count=None, since=None, x0=100, y=None, spacing=150, row_height=40):
+        """Load commit history of all refs with one streamed `git log` call.
+
+        Loads the last `max_count` commits and/or commits newer than `since`
+        (any date accepted by git, e.g. '2024-01-01' or '2 weeks ago').
+        Vertices are laid out while output is read: one row per commit,
+        each line of development keeps its own column.
+        Commits already in model keep their position.
+        Returns number of loaded commits, False on failure.
+        """
+        if not self.repo_dir:
+            return False
+        if y is None:
+            y = self.history_y(row_height)
+        result = False
+        for batch in self.read_history_batches(max_count, since, x0, y, spacing, row_height):
+            result = self.add_history_batch(batch)
+        return result
+
+    def history_y(self, row_height=40):
+        """Return y of first row of history loaded below commits of model."""
+        return max((v['y'] for v in self.vertices.values() if v['type'] == 'commit'), default=20) + 2 * row_height
+
+    def read_history_batches(self, max_count=None, since=None, x0=100, y=60, spacing=150, row_height=40,
+                             first=100, size=2000):
+        """Read commit history for load_history() in batches.
+
+        Generator of batches for add_history_batch(). Only reading and
+        layout are done here, so it can run in a background thread while
+        the GUI thread adds the batches to the model. Batches grow from
+        `first` up to `size` commits like those of read_refs_batches().
+        Batch is dict with keys commits (label, x, y), edges (parent label,
+        child label), init_commit (label or None), count (commits read so
+        far), parents (commits beyond loaded range, placed below their
+        first child) and done (True or False if git failed), the last two
+        are set in the last batch only.
+        """
+        if not self.repo_dir:
+            return
+        args = ['git', '-C', self.repo_dir, 'log', '--all', '--topo-order', '--format=%H %P']
+        if max_count:
+            args.append(f'--max-count={int(max_count)}')
+        if since:
+            args.append(f'--since={since}')
+        try:
+            proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                    text=True, encoding='ascii', errors='replace')
+        except Exception:
+            yield {'commits': [], 'edges': [], 'init_commit': None, 'count': 0, 'parents': [], 'done': False}
+            return
+
+        expected = {}       # commit hash -> column reserved for it
+        free_columns = []   # heap of released columns
+        next_column = 0
+        pending = {}        # parent hash -> labels of loaded children
+        positions = {}      # label -> (x, y) of loaded commits
+        count = 0
+        batch = {'commits': [], 'edges': [], 'init_commit': None, 'count': 0, 'parents': [], 'done': None}
+        limit = first
+        with proc:
+            for line in proc.stdout:
+                parts = line.split()
+                if not parts:
+                    continue
+                commit, parents = parts[0], parts[1:]
+                # column is reserved by child, otherwise take free one
+                column = expected.pop(commit, None)
+                if column is None:
+                    if free_columns:
+                        column = heapq.heappop(free_columns)
+                    else:
+                        column = next_column
+                        next_column += 1
+                label = commit[:8]
+                pos = (x0 + column * spacing, y + count * row_height)
+                batch['commits'].append((label, pos[0], pos[1]))
+                positions[label] = pos
+                count += 1
+                # connect children loaded before
+                for child in pending.pop(commit, []):
+                    batch['edges'].append((label, child))
+                if len(parents) == 0:
+                    batch['init_commit'] = label
+                    heapq.heappush(free_columns, column)
+                for i, p in enumerate(parents):
+                    pending.setdefault(p, []).append(label)
+                    if p in expected:
+                        if i == 0:
+                            heapq.heappush(free_columns, column)
+                    elif i == 0:
+                        expected[p] = column
+                    elif free_columns:
+                        expected[p] = heapq.heappop(free_columns)
+                    else:
+                        expected[p] = next_column
+                        next_column += 1
+                if len(batch['commits']) >= limit:
+                    batch['count'] = count
+                    yield batch
+                    batch = {'commits': [], 'edges': [], 'init_commit': None, 'count': count, 'parents': [], 'done': None}
+                    limit = min(limit * 2, size)
+        batch['count'] = count
+        batch['done'] = proc.returncode == 0
+        if batch['done']:
+            for p, children in pending.items():
+                cx, cy = positions[children[0]]
+                batch['parents'].append((p[:8], cx, cy + row_height))
+                batch['edges'].extend((p[:8], child) for child in children)
+        yield batch
+
+    def add_history_batch(self, batch):
+        """Add batch of commits read by read_history_batches() to model.
+
+        Returns None before the last batch, then number of loaded commits
+        or False on failure.
+        """
+        for label, x, y in batch['commits']:
+            self.add_vertex(x, y, label, vtype='commit')
+        # parents beyond loaded range
+        for label, x, y in batch['parents']:
+            self.add_vertex(x, y, label, vtype='commit')
+        for parent, child in batch['edges']:
+            self.add_edge(parent, child, with_arrow=True)
+        if batch['init_commit']:
+            self.init_commit = batch['init_commit']
+        if batch['done'] is None:
+            return None
+        return batch['count'] if batch['done'] else False
 
     def load_commit_related(self, commit_hash, x=100, y=60, spacing=150):
         """Load parent commit and tree hashes for a given commit hash.
         Positions are laid out horizontally starting at (x, y).
         Returns True on success, False on failure.
         """
-        try:
-            proc = subprocess.run(['git', '-C', self.repo_dir, 'cat-file', '-p', commit_hash],
-                                  capture_output=True, text=True, check=True)
-            out = proc.stdout
-        except Exception:
+        return self._add_commit_record(commit_hash, self._read_object(commit_hash), x, y, spacing)
+
+    def _add_commit_record(self, commit_hash, record, x=100, y=60, spacing=150):
+        """Add parents and tree (or tagged object) of parsed commit/tag record."""
+        if record is None:
             return False
 
         current_label = f'{commit_hash[:8]}'
-        parents = []
-        tree = None
-        commitobject = None
-        for line in out.splitlines():
-            line = line.strip()
-            if line.startswith('parent '):
-                parts = line.split()
-                if len(parts) == 2:
-                    parents.append(parts[1])
-            elif line.startswith('tree '):
-                tree = line.split()[1]
-            elif line.startswith('object '):
-                commitobject = line.split()[1]
-            elif line == '':
-                break  # end of headers
-   
+        parents = record.get('parents', [])
+        tree = record.get('tree')
+        commitobject = record.get('object')
+
         # add parent commits as vertices
+        added = []
         xp = x
         for p in parents:
             short_hash = f'{p[:8]}'
             parent_label = f'{short_hash}'
             if parent_label not in self.vertices:
                 self.add_vertex(xp, y + 40, parent_label, vtype='commit')
+                added.append(parent_label)
             # connect commit to parent
             try:
                 self.add_edge(parent_label, current_label, with_arrow=True)
@@ -291,6 +744,7 @@ class GraphModel:
             tree_label = f'{tree[:8]}'
             if tree_label not in self.vertices:
                 self.add_vertex(x + 20, y + 20, tree_label, vtype='tree')
+                added.append(tree_label)
             else:
                 # if found make sure it's visible
                 self.vertices[tree_label]['visible'] = True
@@ -299,6 +753,7 @@ class GraphModel:
                 self.add_edge(current_label, tree_label, with_arrow=False, label='<ROOT>')
             except Exception:
                 pass
+        self._place_new(added, spacing)
         return True
 
     def load_tree_contents(self, tree_hash, x=100, y=60, spacing=150):
@@ -307,27 +762,21 @@ class GraphModel:
         Adds vertices for files and subtrees, positioned starting at (x, y).
         Returns True on success, False on failure.
         """
-        try:
-            proc = subprocess.run(['git', '-C', self.repo_dir, 'cat-file', '-p',tree_hash],
-                                  capture_output=True, text=True, check=True)
-            out = proc.stdout
-        except Exception:
+        record = self._read_object(tree_hash)
+        if record is None:
             return False
 
-        lines = out.splitlines()
+        added = []
         xt = x
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            parts = line.split()
-            if len(parts) == 4:
-                mode, type_, obj_hash, name = parts[0], parts[1], parts[2], parts[3]
+        for mode, type_, obj_hash, name in record.get('entries', []):
+            # names with whitespace can't be stored in diagram file
+            if len(name.split()) == 1:
                 short_hash = obj_hash[:8]
                 obj_label = f'{short_hash}'
                 vtype = type_ if type_ in ['blob', 'tree'] else 'unkown'
                 if obj_label not in self.vertices:
                     self.add_vertex(xt, y + 40, obj_label, vtype=vtype)
+                    added.append(obj_label)
                 else:
                     # if found make sure it's visible
                     self.vertices[obj_label]['visible'] = True
@@ -337,22 +786,93 @@ class GraphModel:
                 except Exception:
                     pass
                 xt += spacing
+        self._place_new(added, spacing)
         return True
-    
+
+    def _place_new(self, labels, spacing=150, row_height=40):
+        """Move just added vertices off positions of other vertices.
+
+        Each vertex stays in its row and takes the nearest free column.
+        """
+        if not labels:
+            return
+        new = set(labels)
+        vertices = self.vertices
+        dx, dy = spacing / 2, row_height / 2
+
+        def occupied(x, y):
+            # other vertices near position, new ones are placed by layout.place_new
+            for vid in vertices.ids_in_rect(x - dx, y - dy, x + dx, y + dy):
+                v = vertices.by_id(vid)
+                if abs(v['x'] - x) < dx and abs(v['y'] - y) < dy and vertices.label_of(vid) not in new:
+                    return True
+            return False
+
+        wanted = {l: (self.vertices[l]['x'], self.vertices[l]['y']) for l in labels}
+        for label, (x, y) in layout.place_new(labels, wanted, occupied, spacing).items():
+            self.move_vertex(label, x, y)
+
+    def auto_layout(self, x0=100, y0=100, spacing=150, row_height=40):
+        """Lay out all commits with layout.layered_layout, newest at y0.
+
+        Other vertices (refs, tags, trees, blobs) move along with the
+        nearest commit they are connected to.
+        """
+        snapshot = self.layout_snapshot()
+        if snapshot is None:
+            return False
+        return self.apply_layout(layout.layered_layout(*snapshot, x0, y0, spacing, row_height))
+
+    def layout_snapshot(self):
+        """Return (commits, (parent, child) edges between them) for
+        layout.layered_layout, None without commits.
+
+        The lists are copies, layout can run on them in a background thread.
+        """
+        commits = [l for l, v in self.vertices.items() if v['type'] == 'commit']
+        if not commits:
+            return None
+        is_commit = set(commits)
+        parent_edges = [(e['src'], e['dst']) for e in self.edges
+                        if e['src'] in is_commit and e['dst'] in is_commit]
+        return commits, parent_edges
+
+    def apply_layout(self, positions):
+        """Move commits to `positions` computed by layout.layered_layout,
+        other vertices along with them. Commits removed meanwhile are skipped."""
+        commits = [label for label in positions if label in self.vertices]
+        # shift of each vertex, spread from commits breadth first
+        shift = {}
+        for label in commits:
+            v = self.vertices[label]
+            shift[label] = (positions[label][0] - v['x'], positions[label][1] - v['y'])
+        queue = deque(commits)
+        while queue:
+            label = queue.popleft()
+            for e in self.edges.out_edges(label) + self.edges.in_edges(label):
+                other = e['dst'] if e['src'] == label else e['src']
+                if other not in shift:
+                    shift[other] = shift[label]
+                    queue.append(other)
+        for label, (dx, dy) in shift.items():
+            v = self.vertices[label]
+            self.move_vertex(label, v['x'] + dx, v['y'] + dy)
+        return True
+
     def hide_tree(self, tree_hash):
         """Hide the tree vertex and its connected blobs and subtrees."""
         tree_label = f'{tree_hash[:8]}'
         if tree_label in self.vertices:
             self.vertices[tree_label]['visible'] = False
             # hide connected blobs and subtrees
-            for e in [item for item in self.edges if item['src'] == tree_label]:
+            for e in self.edges.out_edges(tree_label):
                 dst = e['dst']
                 if self.vertices[dst]['type'] == 'tree':
                     # recursively hide subtrees
                     self.hide_tree(dst)
                 if self.vertices[dst]['type'] == 'blob':
                     # if any blob's parent is visible, keep it visible
-                    parents = [item for item in self.edges if item['dst'] == dst]
+                    parents = self.edges.in_edges(dst)
                     if not any(self.vertices[p['src']]['visible'] for p in parents):
                         self.vertices[dst]['visible'] = False
 
@@ -362,9 +882,10 @@ class GraphModel:
         path = []
         current_vertex = blob_hash
         while (self.vertices[current_vertex]['type'] in ['tree','blob']):
-            edges = [item for item in self.edges if item['dst'] == current_vertex]
-            path.insert(0, edges[0]['label'])
-            current_vertex = edges[0]['src']
+            edge = self.edges.first_in_edge(current_vertex)
+            path.append(edge['label'])
+            current_vertex = edge['src']
+        path.reverse()
         return path
 
     def build_filter(self, vlabel):
@@ -376,17 +897,55 @@ class GraphModel:
     def get_filter_as_string(self):
         return '/' + '/'.join(self._filter[1:]) if len(self._filter) > 0 else ''
 
+    def _get_filter_nodes(self):
+        """Return set of path trie nodes of the filter path and its parents."""
+        if self._filter_nodes is None or self._filter_nodes[0] != self._filter:
+            node = self.edges.find_path(self._filter)
+            self._filter_nodes = (list(self._filter), self.edges.path_ancestors(node))
+        return self._filter_nodes[1]
+
+    def _set_filtered(self, vid, visible):
+        """Set visibility of vertex id by filter, remember vertices it hides."""
+        view = self.vertices.by_id(vid)
+        if visible:
+            view['visible'] = True
+        elif view['visible']:
+            view['visible'] = False
+            if self._filter_hidden is not None:
+                self._filter_hidden.add(vid)
+
     def apply_filter(self):
         """Logic
-        1. loop all edges with path defined
-        2. path of edge is part of filter path, make destination vertex visible, else hide it
+        1. every tree/blob vertex has a path trie node (path of its first in-edge)
+        2. node is on filter path (filter node or its parent), make vertex visible, else hide it
+        Reset filter shows only vertices hidden by the filter.
         """
-        for e in [elem for elem in self.edges if elem['path'] is not None]:
-            self.vertices[e['dst']]['visible'] = self.get_filter_as_string().startswith(e['path']) if len(self._filter) > 0 else True
+        nodes = self.edges.path_nodes()
+        if len(self._filter) == 0:
+            if self._filter_hidden is None:
+                # filter state not known, e.g. loaded from file: show all
+                hidden = [vid for vid in self.vertices.ids() if nodes[vid] >= 0]
+            else:
+                hidden = [vid for vid in self._filter_hidden if nodes[vid] >= 0]
+            for vid in hidden:
+                self._set_filtered(vid, True)
+            self._filter_hidden = set()
+            return
+        on_path = self._get_filter_nodes()
+        if self._filter_hidden is None:
+            self._filter_hidden = set()
+        for vid in self.vertices.ids():
+            node = nodes[vid]
+            if node >= 0:
+                self._set_filtered(vid, node in on_path)
+
 
+    def save_to_file(self, filepath, binary=True):
+        """Save the graph model to a file.
 
-    def save_to_file(self, filepath):
-        """Save the graph model to a file in a simple text format.
+        By default binary format is written, see ggdfile.py, vertex and
+        edge tables are saved as they are kept in memory.
+        With binary=False a simple text format is written.
 
         global settings are saved as:
         GB repo_dir init_commit
@@ -400,6 +959,14 @@ class GraphModel:
         where 'oriented' is 1 for True and 0 for False, and 'label' can be 'None'.
         Exceptions raised are propagated to the caller.
         """
+        if binary:
+            header = {'repo_dir': self.repo_dir, 'init_commit': self.init_commit, 'filter': self._filter}
+            columns = {}
+            for prefix, table in (('vertices.', self.vertices), ('edges.', self.edges)):
+                for name, column in table.to_columns().items():
+                    columns[prefix + name] = column
+            ggdfile.write(filepath, header, columns)
+            return
         with open(filepath, 'w', encoding='utf-8') as f:
             # global
             f.write(f"GB {self.repo_dir if self.repo_dir else 'None'} {self.init_commit if self.init_commit else 'None'}\n")
@@ -417,11 +984,22 @@ class GraphModel:
                 f.write(line)
         
     def load_from_file(self, filepath):
-        """Load the graph model from a file in the simple text format.
+        """Load the graph model from a file in binary or simple text format.
 
         Clears existing vertices and edges before loading.
         Exceptions raised are propagated to the caller.
         """
+        if ggdfile.is_ggd_file(filepath):
+            header, columns = ggdfile.read(filepath)
+            self.clean_model()
+            for prefix, table in (('vertices.', self.vertices), ('edges.', self.edges)):
+                table.from_columns({name[len(prefix):]: column for name, column in columns.items()
+                                    if name.startswith(prefix)})
+            self.repo_dir = header.get('repo_dir')
+            self.init_commit = header.get('init_commit')
+            self._filter = list(header.get('filter') or [])
+            self._filter_hidden = None
+            return
         with open(filepath, 'r', encoding='utf-8') as f:
             self.clean_model()
             for line in f:
@@ -430,24 +1008,21 @@ class GraphModel:
                     parts = line.split()
                     if len(parts) == 6:
                         _, label, x, y, vtype, visible = parts
-                        self.vertices[label] = {
-                            'x': int(x),
-                            'y': int(y),
-                            'type': vtype,
-                            'visible': bool(int(visible))
-                        }
+                        self.vertices.add(label, int(x), int(y), vtype, bool(int(visible)))
                 elif line.startswith('EG'):
                     parts = line.split()
                     if len(parts) == 5:
                         _, src, dst, oriented, elabel = parts
                         oriented_bool = bool(int(oriented))
                         elabel_val = elabel if elabel != 'None' else None
-                        self.edges.append({
+                        # skip edges to vertices missing in file
+                        if src not in self.vertices or dst not in self.vertices:
+                            continue
+                        self.edges.add({
                             'src': src,
                             'dst': dst,
                             'oriented': oriented_bool,
-                            'label': elabel_val,
-                            'path': None
+                            'label': elabel_val
                         })
                 elif line.startswith('GB'):
                     parts = line.split()
@@ -462,11 +1037,8 @@ class GraphModel:
                     parts = line.split()
                     if len(parts) > 1:
                         fl = " ".join(parts[1:])
-                        self._filter = eval(fl)
-        # calculate path for each edge
-        for e in self.edges:
-            path = self.get_path(e['dst'])
-            e['path'] = '/' + '/'.join(path[1:]) if len(path) > 0 else None
+                        self._filter = ast.literal_eval(fl)
+                        self._filter_hidden = None
 
     def create_symbols_sample(self):
         self.clean_model()
@@ -0,0 +1,150 @@
+"""Persistent cache of parsed git objects.
+
+Contains class ObjectCache: SQLite database of records (see
+gitreader.parse_object) keyed by full object id. Git objects never change,
+so records stay valid across sessions and repositories. Size of the cache
+is bounded, least recently used records are evicted.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+import atexit
+
+SCHEMA_VERSION = 1
+# limit for sqlite host parameters in one statement
+CHUNK = 500
+
+class ObjectCache:
+    """Records keyed by full 40 character object id, shared by threads.
+
+    Errors of the database are not raised, the cache then behaves as empty.
+    """
+
+    def __init__(self, path, max_bytes=128 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = None
+        self._size = 0
+        # records used in this session are stamped once
+        self._stamp = int(time.time())
+        self._touched = set()
+        try:
+            self._open()
+        except sqlite3.Error:
+            self.close()
+
+    def _open(self):
+        db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        self._db = db
+        if db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            db.execute('DROP TABLE IF EXISTS objects')
+            db.execute('PRAGMA user_version = %d' % SCHEMA_VERSION)
+        db.execute('CREATE TABLE IF NOT EXISTS objects '
+                   '(oid TEXT PRIMARY KEY, data TEXT NOT NULL, used INTEGER NOT NULL)')
+        db.execute('CREATE INDEX IF NOT EXISTS objects_used ON objects(used)')
+        db.commit()
+        self._size = db.execute('SELECT COALESCE(SUM(LENGTH(data)), 0) FROM objects').fetchone()[0]
+
+    def get_many(self, oids):
+        """Return dict oid -> record for oids found in cache."""
+        result = {}
+        oids = list({o for o in oids if len(o) == 40})
+        with self._lock:
+            if self._db is None or not oids:
+                return result
+            try:
+                for i in range(0, len(oids), CHUNK):
+                    chunk = oids[i:i + CHUNK]
+                    rows = self._db.execute('SELECT oid, data FROM objects WHERE oid IN (%s)'
+                                            % ','.join('?' * len(chunk)), chunk)
+                    for oid, data in rows:
+                        record = json.loads(data)
+                        record['oid'] = oid
+                        result[oid] = record
+                # move records used first time in this session to the end of LRU
+                touch = [o for o in result if o not in self._touched]
+                if touch:
+                    self._touched.update(touch)
+                    self._db.executemany('UPDATE objects SET used = ? WHERE oid = ?',
+                                         [(self._stamp, o) for o in touch])
+                    self._db.commit()
+            except (sqlite3.Error, ValueError):
+                return {}
+        return result
+
+    def put_many(self, records):
+        """Store records, existing ones are kept."""
+        rows = []
+        for r in records:
+            if r is None or len(r['oid']) != 40:
+                continue
+            data = json.dumps({k: v for k, v in r.items() if k != 'oid'}, separators=(',', ':'))
+            rows.append((r['oid'], data, self._stamp))
+        with self._lock:
+            if self._db is None or not rows:
+                return
+            try:
+                for row in rows:
+                    cur = self._db.execute('INSERT OR IGNORE INTO objects (oid, data, used) VALUES (?, ?, ?)', row)
+                    if cur.rowcount > 0:
+                        self._size += len(row[1])
+                self._touched.update(r[0] for r in rows)
+                if self._size > self.max_bytes:
+                    self._evict()
+                self._db.commit()
+            except sqlite3.Error:
+                try:
+                    self._db.rollback()
+                except sqlite3.Error:
+                    pass
+
+    def _evict(self):
+        """Delete least recently used records until cache is 3/4 of its limit."""
+        target = self.max_bytes * 3 // 4
+        rows = self._db.execute('SELECT oid, LENGTH(data) FROM objects ORDER BY used')
+        victims = []
+        size = self._size
+        for oid, length in rows:
+            if size <= target:
+                break
+            victims.append((oid,))
+            size -= length
+        self._db.executemany('DELETE FROM objects WHERE oid = ?', victims)
+        self._size = size
+
+    def close(self):
+        with self._lock:
+            db, self._db = self._db, None
+            if db is not None:
+                try:
+                    db.close()
+                except sqlite3.Error:
+                    pass
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def open_cache(path):
+    """Return cache shared by all models using database file `path` or None."""
+    key = os.path.normcase(os.path.abspath(path))
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = ObjectCache(path)
+            if cache._db is None:
+                return None
+            _caches[key] = cache
+        return cache
+
+def close_caches():
+    with _caches_lock:
+        caches = list(_caches.values())
+        _caches.clear()
+    for c in caches:
+        c.close()
+
+atexit.register(close_caches)
@@ -0,0 +1,108 @@
+"""Background prefetch of git objects.
+
+Contains class Prefetcher: worker thread with bounded request queue which
+reads objects likely to be expanded next (commits, their parents and root
+trees) and keeps parsed records ready for the model.
+"""
+import queue
+import threading
+from collections import OrderedDict
+
+class Prefetcher:
+    """Read objects in background and keep recently read records.
+
+    `read_many` is a function name list -> {name: record}, see
+    gitreader.GitObjectReader.read_many. Records are kept by 8 character
+    short hash, the same key model uses for vertex labels.
+    """
+
+    def __init__(self, read_many, max_queue=512, max_records=20000):
+        self._read_many = read_many
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._queued = set()
+        self._records = OrderedDict()
+        self._max_records = max_records
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._worker = threading.Thread(target=self._work, daemon=True)
+        self._worker.start()
+
+    def get(self, name):
+        """Return prefetched record for full or abbreviated `name` or None."""
+        with self._lock:
+            record = self._records.get(name[:8])
+            if record is None or not record['oid'].startswith(name):
+                return None
+            self._records.move_to_end(name[:8])
+            return record
+
+    def put(self, record):
+        """Keep record read elsewhere, e.g. by a user action."""
+        if record is None:
+            return
+        with self._lock:
+            self._records[record['oid'][:8]] = record
+            self._records.move_to_end(record['oid'][:8])
+            while len(self._records) > self._max_records:
+                self._records.popitem(last=False)
+
+    def request(self, names):
+        """Queue names for background reading, never blocks.
+
+        Names already read or queued are skipped, requests which don't fit
+        into the queue are dropped and can be requested again later.
+        """
+        for name in names:
+            key = name[:8]
+            with self._lock:
+                if self._stopped or key in self._records or key in self._queued:
+                    continue
+                self._queued.add(key)
+            try:
+                self._queue.put_nowait(name)
+            except queue.Full:
+                with self._lock:
+                    self._queued.discard(key)
+                break
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def _take_batch(self):
+        """Wait for one request and take all other waiting requests."""
+        names = [self._queue.get()]
+        while True:
+            try:
+                names.append(self._queue.get_nowait())
+            except queue.Empty:
+                return names
+
+    def _work(self):
+        while True:
+            names = self._take_batch()
+            if None in names or self._stopped:
+                return
+            try:
+                records = self._read_many(names)
+                # commits and tags are expanded next: read parents and root trees too
+                related = []
+                for r in records.values():
+                    if r is None:
+                        continue
+                    related.extend(r.get('parents', []))
+                    related.extend(h for h in (r.get('tree'), r.get('object')) if h)
+                related = [h for h in related if self.get(h) is None]
+                if related:
+                    records.update(self._read_many(related))
+            except Exception:
+                records = {}
+            for r in records.values():
+                self.put(r)
+            with self._lock:
+                for name in names:
+                    self._queued.discard(name[:8])
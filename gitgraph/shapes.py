@@ -0,0 +1,293 @@
+"""Vertex shapes and edge geometry shared by GraphView and export.
+
+Shapes are polygon points as used by Tk canvas. Points of smoothed shapes
+are control points of a closed quadratic B-spline, repeated points give
+straight segments. All coordinates are canvas (or image) coordinates.
+
+edge_geometry() computes lines and label positions of many edges at once,
+with NumPy when it is installed, otherwise one edge after another.
+"""
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# fewer edges are computed in plain Python, converting them to arrays costs more
+NUMPY_MIN_EDGES = 32
+
+# render parameters per vertex type: fill color,  outline color and outline width
+RENDER_PARAMS = {
+    'branch': {'fill': "#2EF82E",
+               'color': '',
+               'width': 0
+               },
+    'tag': {'fill': "#4622FA",
+            'color': '',
+            'width': 0
+            },
+    'commit': {'fill': "#EB55FF",
+               'color': 'black',
+               'width': 2
+               },
+    'tree': {'fill': "#FFC90E",
+             'color': 'black',
+             'width': 1
+             },
+    'blob': {'fill': "lightgray",
+             'color': 'black',
+             'width': 1
+             },
+    'tagobject': {'fill': "lightgray",
+                  'color': 'black',
+                  'width': 1
+                  }
+}
+
+INIT_COMMIT_COLOR = 'pink'
+
+# curved and handled shapes are drawn higher than their rectangle
+EXTRA_HEIGHT = {'blob': 3, 'tree': 6}
+
+
+def shape_size(text_width, text_height, vtype):
+    """Return half-width and half-height of shape rectangle for label size."""
+    paddingx = 10
+    paddingy = 10 if vtype in ['branch', 'tag'] else 16
+    r=24 # minimal half-width
+    rx = max(r, int(text_width / 2) + paddingx)
+    ry = text_height // 2 + paddingy/2
+    return rx, ry
+
+
+def rounded_shape(x1, y1, x2, y2):
+    """Return (points, smooth, text position) of rectangle with rounded corners."""
+    # some points are repeated to draw direct line instead of curve
+    # curves are drawn due to smooth=True
+    r = 18
+    points = (x1+r, y1, x2-r, y1, x2-r, y1,
+              x2, y1, x2, y1+r, x2, y1+r, x2, y2-r,
+              x2, y2-r, x2, y2, x2-r, y2, x2-r, y2,
+              x1+r, y2, x1+r, y2, x1, y2, x1, y2-r,
+              x1, y2-r, x1, y1+r, x1, y1+r, x1, y1)
+    return points, True, ((x1 + x2)/2, (y1 + y2)/2)
+
+
+def arrowed_shape(x1, y1, x2, y2):
+    """Return (points, smooth, text position) of arrow pointing right."""
+    # constants for arrow rendering
+    xd = 6
+    yr = (y2 - y1)/2
+    points = (x1, y1, x2 - xd, y1,
+              x2, y1 + yr, x2 - xd, y2,
+              x1, y2, x1 + xd, y1 + yr , x1, y1)
+    return points, False, ((x1 + x2)/2, (y1 + y2)/2)
+
+
+def rect_shape(x1, y1, x2, y2):
+    """Return (points, smooth, text position) of rectangle."""
+    return (x1, y1, x2, y1, x2, y2, x1, y2), False, ((x1 + x2)/2, (y1 + y2)/2)
+
+
+def curved_shape(x1, y1, x2, y2):
+    """Return (points, smooth, text position) of document shape with curved bottom."""
+    # 1/4 of width for curve rendering
+    dx = (x2-x1)/4
+    # curve constant
+    cy = 6
+    # make shape higher than standard due to curve
+    dy = EXTRA_HEIGHT['blob']
+    y2a = y2 + dy
+    y1a = y1 - dy
+
+    points = ( x1, y1a,
+        x2, y1a, x2, y1a,
+        x2, y2a - cy, x2, y2a - cy,
+        x2 - dx, y2a - 2*cy,
+        x1 + 2*dx, y2a - cy,
+        x1 + dx, y2a,
+        x1, y2a - cy, x1, y2a - cy, x1, y1a,  x1, y1a )
+    return points, True, ((x1 + x2)/2, (y1 + y2)/2 - dy)
+
+
+def handled_shape(x1, y1, x2, y2):
+    """Return (points, smooth, text position) of folder shape with handle."""
+    # 1/4 of width for curve rendering
+    dx = (x2-x1)/3
+    # handle constant
+    cy = 6
+    # make shape higher than standard due to handle
+    dy = EXTRA_HEIGHT['tree']
+    y2a = y2 + dy
+    y1a = y1 - dy
+
+    points = ( x1 + 2, y1a + cy,
+        x2, y1a + cy, x2, y1a + cy,
+        x2, y2a, x2, y2a,
+        x1, y2a, x1, y2a,
+        x1, y1a, x1, y1a,
+        x1 + dx - 6 , y1a, x1 + dx - 6 , y1a,
+        x1 + dx, y1a,
+        x1 + dx, y1a + cy, x1 + dx, y1a + cy, x1 + 2, y1a + cy,x1 + 2, y1a + cy )
+    return points, True, ((x1 + x2)/2, (y2a + y1a + cy)/2)
+
+
+# vertex type -> shape function
+SHAPES = {
+    'branch': rect_shape,
+    'tag': arrowed_shape,
+    'commit': rounded_shape,
+    'tree': handled_shape,
+    'blob': curved_shape,
+    'tagobject': rounded_shape
+}
+
+
+def vertex_shape(vtype, x1, y1, x2, y2):
+    """Return (points, smooth, text position) of vertex type in rectangle."""
+    return SHAPES.get(vtype, rect_shape)(x1, y1, x2, y2)
+
+
+def _pairs(points):
+    pts = list(zip(points[0::2], points[1::2]))
+    # polygon is closed by Tk, closing point is not needed
+    if len(pts) > 1 and pts[0] == pts[-1]:
+        pts.pop()
+    return pts
+
+
+def smooth_segments(points):
+    """Yield (start, control, end) quadratic curves of smoothed closed polygon.
+
+    Like Tk, curves run between midpoints of polygon sides with the
+    polygon point as control point.
+    """
+    pts = _pairs(points)
+    n = len(pts)
+    for i in range(n):
+        (ax, ay), (bx, by), (cx, cy) = pts[i - 1], pts[i], pts[(i + 1) % n]
+        yield ((ax + bx) / 2, (ay + by) / 2), (bx, by), ((bx + cx) / 2, (by + cy) / 2)
+
+
+def flatten(points, smooth, steps=6):
+    """Return list of (x, y) of polygon, smoothed shape approximated by lines."""
+    if not smooth:
+        return _pairs(points)
+    result = []
+    for (ax, ay), (bx, by), (cx, cy) in smooth_segments(points):
+        if (ax, ay) == (bx, by) or (bx, by) == (cx, cy):
+            # straight side
+            result.append((ax, ay))
+            continue
+        for k in range(steps):
+            t = k / steps
+            u = 1 - t
+            result.append((u * u * ax + 2 * u * t * bx + t * t * cx,
+                           u * u * ay + 2 * u * t * by + t * t * cy))
+    return result
+
+
+def rect_line_endpoints_many(segments):
+    """Compute line endpoints where lines between centers meet rectangle borders.
+
+    segments: list of (x1, y1, rx1, ry1, x2, y2, rx2, ry2), rectangles are
+    axis-aligned with half-width rx and half-height ry.
+    Returns list of (x1, y1, x2, y2).
+    """
+    result = []
+    inf = float('inf')
+    for x1, y1, rx1, ry1, x2, y2, rx2, ry2 in segments:
+        dx = x2 - x1
+        dy = y2 - y1
+        if dx == 0 and dy == 0:
+            result.append((x1, y1, x2, y2))
+            continue
+        # line leaves rectangle at the nearer of side (rx/|dx|) and top/bottom (ry/|dy|)
+        adx, ady = abs(dx), abs(dy)
+        t1 = min(rx1 / adx if adx else inf, ry1 / ady if ady else inf)
+        t2 = min(rx2 / adx if adx else inf, ry2 / ady if ady else inf)
+        if t1 <= 0:
+            t1 = 0
+        if t2 <= 0:
+            t2 = 0
+        result.append((x1 + dx * t1, y1 + dy * t1, x2 - dx * t2, y2 - dy * t2))
+    return result
+
+
+def label_position(x1, y1, x2, y2, offset=15):
+    """Return position of edge label, offset perpendicular to edge line from its middle."""
+    mid_x = (x1 + x2) / 2
+    mid_y = (y1 + y2) / 2
+
+    dx = x2 - x1
+    dy = y2 - y1
+    dist = math.hypot(dx, dy)
+
+    if dist < 1e-6:  # points are too close
+        return mid_x, mid_y
+
+    # perpendicular vector (rotated 90 degrees counterclockwise)
+    perp_x = -dy / dist
+    perp_y = dx / dist
+
+    # offset label position
+    return mid_x + perp_x * offset, mid_y + perp_y * offset
+
+
+def edge_geometry(segments, scale=1.0, x0=0.0, y0=0.0, offset=15):
+    """Return list of (x1, y1, x2, y2, label x, label y) of edges.
+
+    segments: list of (x1, y1, rx1, ry1, x2, y2, rx2, ry2) like for
+    rect_line_endpoints_many, in model coordinates. Endpoints are returned
+    as (x - x0) * scale, labels are `offset` away from the scaled line.
+    """
+    if np is not None and segments and len(segments) >= NUMPY_MIN_EDGES:
+        return _edge_geometry_np(segments, scale, x0, y0, offset)
+    result = []
+    for x1, y1, x2, y2 in rect_line_endpoints_many(segments):
+        x1, y1, x2, y2 = (x1 - x0) * scale, (y1 - y0) * scale, (x2 - x0) * scale, (y2 - y0) * scale
+        result.append((x1, y1, x2, y2) + label_position(x1, y1, x2, y2, offset))
+    return result
+
+
+def _edge_geometry_np(segments, scale, x0, y0, offset):
+    """NumPy version of edge_geometry, same arithmetic for all edges at once."""
+    x1, y1, rx1, ry1, x2, y2, rx2, ry2 = np.array(segments, dtype=float).T
+    dx = x2 - x1
+    dy = y2 - y1
+    adx, ady = np.abs(dx), np.abs(dy)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t1 = np.minimum(np.where(adx > 0, rx1 / adx, np.inf), np.where(ady > 0, ry1 / ady, np.inf))
+        t2 = np.minimum(np.where(adx > 0, rx2 / adx, np.inf), np.where(ady > 0, ry2 / ady, np.inf))
+    # zero length edges (both infinite) stay as they are
+    t1 = np.where(np.isinf(t1), 0.0, np.maximum(t1, 0.0))
+    t2 = np.where(np.isinf(t2), 0.0, np.maximum(t2, 0.0))
+    ex1 = (x1 + dx * t1 - x0) * scale
+    ey1 = (y1 + dy * t1 - y0) * scale
+    ex2 = (x2 - dx * t2 - x0) * scale
+    ey2 = (y2 - dy * t2 - y0) * scale
+    # labels, see label_position
+    ldx = ex2 - ex1
+    ldy = ey2 - ey1
+    dist = np.hypot(ldx, ldy)
+    far = dist >= 1e-6
+    dist = np.where(far, dist, 1.0)
+    lx = (ex1 + ex2) / 2 + np.where(far, -ldy / dist * offset, 0.0)
+    ly = (ey1 + ey2) / 2 + np.where(far, ldx / dist * offset, 0.0)
+    return np.column_stack((ex1, ey1, ex2, ey2, lx, ly)).tolist()
+
+
+def arrow_points(x1, y1, x2, y2, shape=(8, 10, 3), width=1):
+    """Return polygon points of arrowhead at (x2, y2) like Tk arrow=LAST."""
+    d1, d2, d3 = shape
+    dist = math.hypot(x2 - x1, y2 - y1)
+    if dist < 1e-6:
+        return ()
+    ux, uy = (x2 - x1) / dist, (y2 - y1) / dist
+    px, py = -uy, ux
+    half = d3 + width / 2
+    return (x2, y2,
+            x2 - ux * d2 + px * half, y2 - uy * d2 + py * half,
+            x2 - ux * d1, y2 - uy * d1,
+            x2 - ux * d2 - px * half, y2 - uy * d2 - py * half)
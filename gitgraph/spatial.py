@@ -0,0 +1,239 @@
+"""Uniform grid spatial index.
+
+Contains class GridIndex: keys with bounding boxes or line segments kept in
+square cells, used to find vertices and edges within a rectangle or at a
+point without testing all of them.
+Contains class CellTable: compact grid of integer ids built at once, used
+by vertex and edge storage.
+"""
+from array import array
+
+
+def segment_intersects_rect(x1, y1, x2, y2, rx1, ry1, rx2, ry2):
+    """True if line segment touches rectangle (Liang-Barsky clipping)."""
+    dx, dy = x2 - x1, y2 - y1
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, x1 - rx1), (dx, rx2 - x1), (-dy, y1 - ry1), (dy, ry2 - y1)):
+        if p == 0:
+            # parallel to this border, outside of it
+            if q < 0:
+                return False
+            continue
+        t = q / p
+        if p < 0:
+            if t > t1:
+                return False
+            if t > t0:
+                t0 = t
+        else:
+            if t < t0:
+                return False
+            if t < t1:
+                t1 = t
+    return True
+
+
+def segment_cells(x1, y1, x2, y2, cell, max_cells):
+    """Return tuple of (cx, cy) grid cells line segment passes through.
+
+    None if these are more than max_cells.
+    """
+    if x1 > x2:
+        x1, y1, x2, y2 = x2, y2, x1, y1
+    c = cell
+    cx1, cx2 = int(x1 // c), int(x2 // c)
+    cy1, cy2 = int(y1 // c), int(y2 // c)
+    if cy1 > cy2:
+        cy1, cy2 = cy2, cy1
+    if cx1 == cx2 or cy1 == cy2:
+        # within one column or row of cells
+        if cx1 == cx2 and cy1 == cy2:
+            return ((cx1, cy1),)
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > max_cells:
+            return None
+        return tuple((cx, cy) for cx in range(cx1, cx2 + 1) for cy in range(cy1, cy2 + 1))
+    if cx2 - cx1 + 1 > max_cells:
+        return None
+    cells = []
+    slope = (y2 - y1) / (x2 - x1)
+    for cx in range(cx1, cx2 + 1):
+        # segment part within column of cells
+        ya = y1 + (max(x1, cx * c) - x1) * slope
+        yb = y1 + (min(x2, (cx + 1) * c) - x1) * slope
+        if ya > yb:
+            ya, yb = yb, ya
+        cells.extend((cx, cy) for cy in range(int(ya // c), int(yb // c) + 1))
+        if len(cells) > max_cells:
+            return None
+    return tuple(cells)
+
+
+def _cell_range(x1, y1, x2, y2, cell, limit=1e12):
+    # coordinates are clamped, queries may use infinite rectangles
+    return (int(max(x1, -limit) // cell), int(max(y1, -limit) // cell),
+            int(min(x2, limit) // cell), int(min(y2, limit) // cell))
+
+
+def _cells_in_range(cells, cx1, cy1, cx2, cy2):
+    """Yield values of dict cells whose (cx, cy) key is within range."""
+    if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(cells):
+        # range larger than occupied part of the grid
+        for (cx, cy), value in cells.items():
+            if cx1 <= cx <= cx2 and cy1 <= cy <= cy2:
+                yield value
+    else:
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                value = cells.get((cx, cy))
+                if value is not None:
+                    yield value
+
+
+class CellTable:
+    """Integer ids grouped by grid cell, built at once.
+
+    Ids are kept in one array ordered by cell and a dict gives the range of
+    every non-empty cell, there is no Python object per id. The table is
+    not updated: callers keep ids changed since the build aside and check
+    the current position of ids found.
+    """
+
+    def __init__(self, cell, cells, ids):
+        """cells: list of (cx, cy), ids: list of id in that cell, an id may
+        be in several cells."""
+        self.cell = float(cell)
+        codes = [(cx << 32) + cy for cx, cy in cells]
+        order = sorted(range(len(codes)), key=codes.__getitem__)
+        self._ids = array('i', [ids[i] for i in order])
+        # (cx, cy) -> (start, end) in _ids
+        self._ranges = {}
+        start, prev = 0, None
+        for pos, i in enumerate(order):
+            if codes[i] != prev:
+                if prev is not None:
+                    self._ranges[cells[order[start]]] = (start, pos)
+                start, prev = pos, codes[i]
+        if prev is not None:
+            self._ranges[cells[order[start]]] = (start, len(order))
+
+    def query(self, x1, y1, x2, y2):
+        """Return set of ids in cells intersecting rectangle."""
+        ids = self._ids
+        found = set()
+        for start, end in _cells_in_range(self._ranges, *_cell_range(x1, y1, x2, y2, self.cell)):
+            found.update(ids[start:end])
+        return found
+
+
+class GridIndex:
+    """Keys with boxes in a uniform grid of square cells.
+
+    A key is registered in every cell its box (or segment) touches. Items
+    touching more than `max_cells` cells, like very long edges, are kept
+    aside and tested by every query. A query costs the number of cells of
+    its rectangle (at most the number of non-empty cells) plus the number
+    of items found there.
+    """
+
+    def __init__(self, cell=256, max_cells=256):
+        self.cell = float(cell)
+        self.max_cells = max_cells
+        self.clear()
+
+    def clear(self):
+        # (cx, cy) -> set of keys
+        self._cells = {}
+        # key -> (x1, y1, x2, y2, cells, segment), cells is None for
+        # large items, segment is None for boxes
+        self._items = {}
+        self._large = set()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def box(self, key):
+        """Return (x1, y1, x2, y2) of key."""
+        return self._items[key][:4]
+
+    def insert(self, key, x1, y1, x2, y2):
+        """Add key with box or move it to new box."""
+        if x1 > x2:
+            x1, x2 = x2, x1
+        if y1 > y2:
+            y1, y2 = y2, y1
+        c = self.cell
+        cx1, cy1, cx2, cy2 = int(x1 // c), int(y1 // c), int(x2 // c), int(y2 // c)
+        if cx1 == cx2 and cy1 == cy2:
+            cells = ((cx1, cy1),)
+        elif (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > self.max_cells:
+            cells = None
+        else:
+            cells = tuple((cx, cy) for cx in range(cx1, cx2 + 1) for cy in range(cy1, cy2 + 1))
+        self._put(key, (x1, y1, x2, y2, cells, None))
+
+    def insert_segment(self, key, x1, y1, x2, y2):
+        """Add key with line segment or move it to new segment.
+
+        Only cells the segment passes through are used, queries find the
+        key if the segment itself touches their rectangle.
+        """
+        cells = segment_cells(x1, y1, x2, y2, self.cell, self.max_cells)
+        self._put(key, (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2), cells, (x1, y1, x2, y2)))
+
+    def _put(self, key, item):
+        cells = item[4]
+        items = self._items
+        old = items.get(key)
+        items[key] = item
+        if old is not None:
+            if old[4] == cells:
+                return
+            self._unregister(key, old[4])
+        if cells is None:
+            self._large.add(key)
+            return
+        grid = self._cells
+        for cell in cells:
+            keys = grid.get(cell)
+            if keys is None:
+                grid[cell] = {key}
+            else:
+                keys.add(key)
+
+    def _unregister(self, key, cells):
+        if cells is None:
+            self._large.discard(key)
+            return
+        grid = self._cells
+        for cell in cells:
+            keys = grid[cell]
+            keys.discard(key)
+            if not keys:
+                del grid[cell]
+
+    def remove(self, key):
+        """Remove key, missing keys are ignored."""
+        old = self._items.pop(key, None)
+        if old is not None:
+            self._unregister(key, old[4])
+
+    def query(self, x1, y1, x2, y2):
+        """Return list of keys whose box or segment intersects rectangle."""
+        found = set(self._large)
+        for keys in _cells_in_range(self._cells, *_cell_range(x1, y1, x2, y2, self.cell)):
+            found.update(keys)
+        items = self._items
+        result = []
+        for key in found:
+            b = items[key]
+            if b[0] <= x2 and b[2] >= x1 and b[1] <= y2 and b[3] >= y1:
+                if b[5] is None or segment_intersects_rect(*b[5], x1, y1, x2, y2):
+                    result.append(key)
+        return result
+
+    def at(self, x, y):
+        """Return list of keys whose box contains point."""
+        return self.query(x, y, x, y)
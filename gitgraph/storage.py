@@ -0,0 +1,960 @@
+"""Compact vertex and edge storage for graph model.
+
+Contains class VertexTable: vertices keyed by label, attributes are kept in
+typed arrays indexed by interned integer vertex id.
+Contains class EdgeList: edges kept in array columns with adjacency lists
+of source and destination vertices.
+
+Both return small views which behave like the dicts used before,
+e.g. vertices[label]['x'] or edge['path'], so callers don't need to know
+about the arrays. Views are valid until their vertex/edge is deleted.
+
+Tables can be exported to and restored from a dict of arrays (columns),
+used by binary diagram files, see ggdfile.py.
+
+Rectangle queries use spatial.CellTable grids built on first use, vertices
+and edges moved since are checked besides the grid until it is built again.
+"""
+from array import array
+from zlib import crc32
+
+import spatial
+
+class StringTable:
+    """Interned strings, each distinct string is stored once."""
+
+    def __init__(self):
+        self._ids = {}
+        self._strings = []
+
+    def intern(self, s):
+        """Return id of string `s`, -1 for None."""
+        if s is None:
+            return -1
+        i = self._ids.get(s)
+        if i is None:
+            i = len(self._strings)
+            self._ids[s] = i
+            self._strings.append(s)
+        return i
+
+    def get(self, i):
+        return self._strings[i] if i >= 0 else None
+
+    def clear(self):
+        self._ids.clear()
+        self._strings.clear()
+
+    def to_bytes(self):
+        """Return all strings utf-8 encoded, each terminated by NUL."""
+        return ''.join(s + '\0' for s in self._strings).encode('utf-8')
+
+    def from_bytes(self, data):
+        self._strings = bytes(data).decode('utf-8').split('\0')[:-1]
+        self._ids = dict(zip(self._strings, range(len(self._strings))))
+
+
+class PathTrie:
+    """Interned tree paths.
+
+    Each node is a path given by its parent node and the name id of its
+    last entry. Node 0 is the root path '/' shared by all root trees.
+    """
+    ROOT = 0
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._parent = array('i', [-1])
+        self._name = array('i', [-1])
+        self._children = {}     # (parent node, name id) -> node, None until needed
+
+    def set_nodes(self, parent, name):
+        """Restore nodes from arrays of parent node and name id."""
+        self._parent = parent
+        self._name = name
+        self._children = None
+
+    def child(self, node, name):
+        """Return node of entry `name` (string id) below `node`, added if needed."""
+        if self._children is None:
+            self._children = {(p, n): i for i, (p, n) in enumerate(zip(self._parent, self._name)) if i}
+        key = (node, name)
+        child = self._children.get(key)
+        if child is None:
+            child = len(self._parent)
+            self._parent.append(node)
+            self._name.append(name)
+            self._children[key] = child
+        return child
+
+    def ancestors(self, node):
+        """Return set of node and all its parent nodes."""
+        nodes = set()
+        while node >= 0:
+            nodes.add(node)
+            node = self._parent[node]
+        return nodes
+
+    def names(self, node):
+        """Return name ids of path entries from root to node."""
+        names = []
+        while node > self.ROOT:
+            names.append(self._name[node])
+            node = self._parent[node]
+        names.reverse()
+        return names
+
+
+class VertexView:
+    """Dict-like access to one vertex of VertexTable."""
+    __slots__ = ('_table', 'vid')
+    KEYS = ('x', 'y', 'type', 'visible')
+
+    def __init__(self, table, vid):
+        self._table = table
+        self.vid = vid
+
+    def __getitem__(self, key):
+        t = self._table
+        if key == 'x':
+            return t._x[self.vid]
+        if key == 'y':
+            return t._y[self.vid]
+        if key == 'type':
+            return t._type_names[t._type[self.vid]]
+        if key == 'visible':
+            return bool(t._visible[self.vid])
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        t = self._table
+        if key == 'x':
+            t._x[self.vid] = value
+            t._moved_vertex(self.vid)
+        elif key == 'y':
+            t._y[self.vid] = value
+            t._moved_vertex(self.vid)
+        elif key == 'type':
+            t._type[self.vid] = t.type_code(value)
+            t.type_changes += 1
+        elif key == 'visible':
+            t._visible[self.vid] = 1 if value else 0
+        else:
+            raise KeyError(key)
+        if t._changed is not None:
+            t._changed.add(self.vid)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self.KEYS
+
+    def items(self):
+        return [(k, self[k]) for k in self.KEYS]
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class VertexTable:
+    """Vertices keyed by label, stored in parallel typed arrays.
+
+    Mapping interface: label -> VertexView with keys 'x', 'y', 'type', 'visible'.
+    Each label gets integer id, ids of deleted vertices are reused.
+    Labels are kept utf-8 encoded in one bytearray and found through an
+    open addressing hash table of vertex ids, no Python object per vertex.
+    Labels are hashed with crc32, so the table stays valid when saved.
+    """
+    COLUMNS = ('_x', '_y', '_type', '_visible', '_alive', '_start', '_size', '_hash', '_blob', '_slots')
+    EMPTY = -1
+    DELETED = -2
+    GRID_CELL = 256
+
+    def __init__(self):
+        self._type_names = ['commit', 'branch', 'tree', 'blob', 'tag', 'tagobject']
+        self._type_codes = {n: i for i, n in enumerate(self._type_names)}
+        self.clear()
+
+    def clear(self):
+        # per vertex id columns
+        self._x = array('d')
+        self._y = array('d')
+        self._type = bytearray()
+        self._visible = bytearray()
+        self._alive = bytearray()
+        self._start = array('q')    # label offset in _blob
+        self._size = array('i')     # label length in _blob
+        self._hash = array('q')
+        self._free = []
+        self._count = 0
+        # label bytes of deleted vertices still in _blob
+        self._dead_bytes = 0
+        # counts type changes of existing vertices, these change edge paths
+        self.type_changes = 0
+        # ids of vertices added or changed and labels of removed vertices
+        # since take_changes(), None if all vertices may have changed
+        self._changed = None
+        self._removed = set()
+        self._blob = bytearray()
+        # grid of vertex positions, None until first rectangle query, and
+        # vertices added or moved since it was built, kept in a small
+        # dynamic grid so that queries don't test all of them
+        self._grid = None
+        self._stale = spatial.GridIndex(self.GRID_CELL)
+        # ids of vertices moved since edge grid update, None if no edge grid
+        self._moved = None
+        # hash table of vertex ids, size is power of 2
+        self._slots = array('i', [self.EMPTY]) * 8
+        self._used_slots = 0
+
+    def type_code(self, vtype):
+        code = self._type_codes.get(vtype)
+        if code is None:
+            code = len(self._type_names)
+            self._type_names.append(vtype)
+            self._type_codes[vtype] = code
+        return code
+
+    def _key(self, vid):
+        start = self._start[vid]
+        return self._blob[start:start + self._size[vid]]
+
+    def _lookup(self, label):
+        """Return (vid or -1, slot where label is or can be inserted)."""
+        key = label.encode('utf-8')
+        h = crc32(key)
+        slots = self._slots
+        mask = len(slots) - 1
+        i = h & mask
+        insert_at = -1
+        while True:
+            vid = slots[i]
+            if vid == self.EMPTY:
+                return -1, (insert_at if insert_at >= 0 else i)
+            if vid == self.DELETED:
+                if insert_at < 0:
+                    insert_at = i
+            elif self._hash[vid] == h and self._key(vid) == key:
+                return vid, i
+            i = (i + 1) & mask
+
+    def _compact_labels(self):
+        """Copy labels of existing vertices to a new _blob without deleted ones."""
+        blob, start, size = self._blob, self._start, self._size
+        compact = bytearray()
+        for vid in self.ids():
+            s = start[vid]
+            start[vid] = len(compact)
+            compact += blob[s:s + size[vid]]
+        self._blob = compact
+        self._dead_bytes = 0
+
+    def _resize(self):
+        if self._dead_bytes:
+            self._compact_labels()
+        size = len(self._slots)
+        while self._count * 3 >= size:
+            size *= 2
+        slots = array('i', [self.EMPTY]) * size
+        mask = size - 1
+        for vid in self.ids():
+            i = self._hash[vid] & mask
+            while slots[i] != self.EMPTY:
+                i = (i + 1) & mask
+            slots[i] = vid
+        self._slots = slots
+        self._used_slots = self._count
+
+    def add(self, label, x, y, vtype, visible=True):
+        """Add or overwrite vertex, returns its id."""
+        vid, slot = self._lookup(label)
+        existed = vid >= 0
+        if not existed:
+            key = label.encode('utf-8')
+            if self._free:
+                vid = self._free.pop()
+            else:
+                vid = len(self._alive)
+                self._x.append(0)
+                self._y.append(0)
+                self._type.append(0)
+                self._visible.append(0)
+                self._alive.append(0)
+                self._start.append(0)
+                self._size.append(0)
+                self._hash.append(0)
+            self._alive[vid] = 1
+            self._start[vid] = len(self._blob)
+            self._size[vid] = len(key)
+            self._hash[vid] = crc32(key)
+            self._blob += key
+            if self._slots[slot] == self.EMPTY:
+                self._used_slots += 1
+            self._slots[slot] = vid
+            self._count += 1
+            # keep table at most 2/3 full, tombstones included
+            if self._used_slots * 3 >= len(self._slots) * 2:
+                self._resize()
+        self._x[vid] = x
+        self._y[vid] = y
+        self._moved_vertex(vid)
+        code = self.type_code(vtype)
+        if existed and self._type[vid] != code:
+            self.type_changes += 1
+        self._type[vid] = code
+        self._visible[vid] = 1 if visible else 0
+        if self._changed is not None:
+            self._changed.add(vid)
+        return vid
+
+    def _moved_vertex(self, vid):
+        if self._grid is not None:
+            x, y = self._x[vid], self._y[vid]
+            self._stale.insert(vid, x, y, x, y)
+        if self._moved is not None:
+            self._moved.add(vid)
+
+    def _index(self):
+        """Return grid of vertex positions, built on first use and again
+        when many vertices moved since."""
+        if self._grid is None or len(self._stale) > max(1000, self._count // 8):
+            xs, ys, c = self._x, self._y, float(self.GRID_CELL)
+            ids = list(self.ids())
+            self._grid = spatial.CellTable(c, [(int(xs[vid] // c), int(ys[vid] // c)) for vid in ids], ids)
+            self._stale.clear()
+        return self._grid
+
+    def take_changes(self):
+        """Return (changed labels, removed labels) since last call.
+
+        Both are None if the whole table was replaced.
+        """
+        changed, removed = self._changed, self._removed
+        self._changed, self._removed = set(), set()
+        if changed is None:
+            return None, None
+        alive = self._alive
+        return [self.label_of(vid) for vid in changed if alive[vid]], list(removed)
+
+    def id_of(self, label):
+        """Return integer id of vertex `label` or None."""
+        vid = self._lookup(label)[0]
+        return vid if vid >= 0 else None
+
+    def label_of(self, vid):
+        return self._key(vid).decode('utf-8')
+
+    def by_id(self, vid):
+        """Return VertexView of vertex id."""
+        return VertexView(self, vid)
+
+    def ids_in_rect(self, x1, y1, x2, y2):
+        """Return ids of vertices with position inside rectangle."""
+        found = self._index().query(x1, y1, x2, y2)
+        found.update(self._stale.query(x1, y1, x2, y2))
+        xs, ys, alive = self._x, self._y, self._alive
+        return sorted(vid for vid in found
+                      if alive[vid] and x1 <= xs[vid] <= x2 and y1 <= ys[vid] <= y2)
+
+    def bounds(self):
+        """Return (min x, min y, max x, max y) of vertex positions or None."""
+        if self._count == 0:
+            return None
+        if not self._free:
+            return min(self._x), min(self._y), max(self._x), max(self._y)
+        ids = list(self.ids())
+        xs = [self._x[vid] for vid in ids]
+        ys = [self._y[vid] for vid in ids]
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def type_of(self, vid):
+        return self._type_names[self._type[vid]]
+
+    def capacity(self):
+        """Upper bound of vertex ids."""
+        return len(self._alive)
+
+    def ids(self):
+        """Iterate ids of all vertices."""
+        alive = self._alive
+        return (vid for vid in range(len(alive)) if alive[vid])
+
+    def to_columns(self):
+        """Return dict column name -> array with complete table state."""
+        if self._dead_bytes:
+            self._compact_labels()
+        columns = {name: getattr(self, name) for name in self.COLUMNS}
+        columns['_type_names'] = ''.join(n + '\0' for n in self._type_names).encode('utf-8')
+        return columns
+
+    def from_columns(self, columns):
+        """Restore state saved by to_columns(), columns are used as they are."""
+        for name in self.COLUMNS:
+            setattr(self, name, columns[name])
+        self._type_names = bytes(columns['_type_names']).decode('utf-8').split('\0')[:-1]
+        self._type_codes = {n: i for i, n in enumerate(self._type_names)}
+        alive = self._alive
+        self._free = [vid for vid in range(len(alive)) if not alive[vid]]
+        self._count = len(alive) - len(self._free)
+        self._used_slots = len(self._slots) - self._slots.count(self.EMPTY)
+        # files written before labels were compacted may keep deleted ones
+        for vid in self._free:
+            self._size[vid] = 0
+        self._dead_bytes = len(self._blob) - sum(self._size)
+        self._changed = None
+        self._grid = None
+        self._stale.clear()
+        self._moved = None
+
+    def __setitem__(self, label, attrs):
+        self.add(label, attrs['x'], attrs['y'], attrs['type'], attrs.get('visible', True))
+
+    def __getitem__(self, label):
+        vid = self._lookup(label)[0]
+        if vid < 0:
+            raise KeyError(label)
+        return VertexView(self, vid)
+
+    def get(self, label, default=None):
+        vid = self._lookup(label)[0]
+        return VertexView(self, vid) if vid >= 0 else default
+
+    def __delitem__(self, label):
+        vid, slot = self._lookup(label)
+        if vid < 0:
+            raise KeyError(label)
+        if self._changed is not None:
+            self._changed.discard(vid)
+            self._removed.add(label)
+        self._slots[slot] = self.DELETED
+        self._alive[vid] = 0
+        self._free.append(vid)
+        self._count -= 1
+        self._dead_bytes += self._size[vid]
+        self._size[vid] = 0
+        # labels churn with refreshed refs, don't let _blob grow with them
+        if self._dead_bytes > max(65536, len(self._blob) // 2):
+            self._compact_labels()
+
+    def __contains__(self, label):
+        return self._lookup(label)[0] >= 0
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return self._count
+
+    def keys(self):
+        return [self.label_of(vid) for vid in self.ids()]
+
+    def values(self):
+        return [VertexView(self, vid) for vid in self.ids()]
+
+    def items(self):
+        return [(self.label_of(vid), VertexView(self, vid)) for vid in self.ids()]
+
+
+class EdgeView:
+    """Dict-like access to one edge of EdgeList.
+
+    'path' is derived from the tree structure, see EdgeList.path_of.
+    """
+    __slots__ = ('_edges', 'eid')
+    KEYS = ('src', 'dst', 'oriented', 'label', 'path')
+
+    def __init__(self, edges, eid):
+        self._edges = edges
+        self.eid = eid
+
+    def __getitem__(self, key):
+        e = self._edges
+        if key == 'src':
+            return e._vertices.label_of(e._src[self.eid])
+        if key == 'dst':
+            return e._vertices.label_of(e._dst[self.eid])
+        if key == 'oriented':
+            return bool(e._oriented[self.eid])
+        if key == 'label':
+            return e._strings.get(e._label[self.eid])
+        if key == 'path':
+            return e.path_of(self.eid)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        e = self._edges
+        if key == 'oriented':
+            e._oriented[self.eid] = 1 if value else 0
+        elif key == 'label':
+            e._label[self.eid] = e._strings.intern(value)
+            e._vertex_path = None
+        else:
+            raise KeyError(key)
+        e._mark(self.eid)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self.KEYS
+
+    def items(self):
+        return [(k, self[k]) for k in self.KEYS]
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class EdgeList:
+    """Edges between vertices of a VertexTable, kept in array columns.
+
+    Iterates edges like a list of dicts. Each (src, dst) pair is stored
+    once and found through an open addressing hash table of edge ids.
+    Out-edges and in-edges of every vertex form linked lists in arrays,
+    in insertion order.
+    Paths of tree/blob vertices are kept as nodes of a PathTrie, computed
+    on demand and cached per vertex id until an edge removal invalidates them.
+    """
+    EMPTY = -1
+    DELETED = -2
+    GRID_CELL = 1024
+    GRID_MAX_CELLS = 64
+    COLUMNS = ('_src', '_dst', '_oriented', '_label', '_alive', '_next_out', '_next_in',
+               '_out_head', '_out_tail', '_in_head', '_in_tail', '_slots')
+
+    def __init__(self, vertices):
+        self._vertices = vertices
+        self._strings = StringTable()
+        self._paths = PathTrie()
+        self.clear()
+
+    def clear(self):
+        self._src = array('i')
+        self._dst = array('i')
+        self._oriented = bytearray()
+        self._label = array('i')
+        self._alive = bytearray()
+        self._next_out = array('i')
+        self._next_in = array('i')
+        self._free = []
+        self._count = 0
+        # per vertex id: first/last out-edge and in-edge
+        self._out_head = array('i')
+        self._out_tail = array('i')
+        self._in_head = array('i')
+        self._in_tail = array('i')
+        # hash table of edge ids keyed by (src, dst), size is power of 2
+        self._slots = array('i', [self.EMPTY]) * 8
+        self._used_slots = 0
+        self._strings.clear()
+        self._paths.clear()
+        # per vertex id: path node, -1 no path, -2 not computed; None if stale
+        self._vertex_path = None
+        self._type_changes = self._vertices.type_changes
+        # (src, dst) labels of edges added, changed or removed since
+        # take_changes(), None if all edges may have changed
+        self._changed = None
+        # grid of edge segments, None until first rectangle query, ids of
+        # edges in too many cells and of edges added or moved since the build
+        self._grid = None
+        self._large = set()
+        self._stale = set()
+
+    def _mark(self, eid):
+        if self._changed is not None:
+            label_of = self._vertices.label_of
+            self._changed.add((label_of(self._src[eid]), label_of(self._dst[eid])))
+
+    def take_changes(self):
+        """Return list of (src, dst) changed since last call, None if all may have changed."""
+        changed, self._changed = self._changed, set()
+        return list(changed) if changed is not None else None
+
+    def to_columns(self):
+        """Return dict column name -> array with complete edge list state.
+
+        Path nodes of all vertices are included, paths are not computed
+        again after loading.
+        """
+        columns = {name: getattr(self, name) for name in self.COLUMNS}
+        columns['_vertex_path'] = self.path_nodes()
+        columns['_path_parent'] = self._paths._parent
+        columns['_path_name'] = self._paths._name
+        columns['_strings'] = self._strings.to_bytes()
+        return columns
+
+    def from_columns(self, columns):
+        """Restore state saved by to_columns(), vertices must be restored first."""
+        for name in self.COLUMNS:
+            setattr(self, name, columns[name])
+        self._strings.from_bytes(columns['_strings'])
+        alive = self._alive
+        self._free = [eid for eid in range(len(alive)) if not alive[eid]]
+        self._count = len(alive) - len(self._free)
+        self._used_slots = len(self._slots) - self._slots.count(self.EMPTY)
+        if len(self._out_head) < self._vertices.capacity():
+            self._grow_vertices()
+        self._paths.clear()
+        self._vertex_path = None
+        self._type_changes = self._vertices.type_changes
+        if '_vertex_path' in columns:
+            self._paths.set_nodes(columns['_path_parent'], columns['_path_name'])
+            self._vertex_path = columns['_vertex_path']
+        self._changed = None
+        self._grid = None
+
+    def _grow_vertices(self):
+        # grow in steps, vertex table grows one vertex at a time
+        n = max(self._vertices.capacity(), 2 * len(self._out_head)) - len(self._out_head)
+        if n > 0:
+            fill = array('i', [-1]) * n
+            self._out_head.extend(fill)
+            self._out_tail.extend(fill)
+            self._in_head.extend(fill)
+            self._in_tail.extend(fill)
+
+    def _vid(self, label):
+        vid = self._vertices.id_of(label)
+        if vid is not None and vid >= len(self._out_head):
+            self._grow_vertices()
+        return vid
+
+    @staticmethod
+    def _pair_hash(s, d):
+        return (s * 0x9E3779B1) ^ (d * 0x85EBCA77) ^ (d >> 7)
+
+    def _lookup(self, s, d):
+        """Return (eid or -1, slot where pair is or can be inserted)."""
+        slots = self._slots
+        mask = len(slots) - 1
+        i = self._pair_hash(s, d) & mask
+        insert_at = -1
+        while True:
+            eid = slots[i]
+            if eid == self.EMPTY:
+                return -1, (insert_at if insert_at >= 0 else i)
+            if eid == self.DELETED:
+                if insert_at < 0:
+                    insert_at = i
+            elif self._src[eid] == s and self._dst[eid] == d:
+                return eid, i
+            i = (i + 1) & mask
+
+    def _find(self, s, d):
+        return self._lookup(s, d)[0]
+
+    def _resize(self):
+        size = len(self._slots)
+        while self._count * 3 >= size:
+            size *= 2
+        slots = array('i', [self.EMPTY]) * size
+        mask = size - 1
+        alive = self._alive
+        for eid in range(len(alive)):
+            if alive[eid]:
+                i = self._pair_hash(self._src[eid], self._dst[eid]) & mask
+                while slots[i] != self.EMPTY:
+                    i = (i + 1) & mask
+                slots[i] = eid
+        self._slots = slots
+        self._used_slots = self._count
+
+    def __iter__(self):
+        alive = self._alive
+        return (EdgeView(self, eid) for eid in range(len(alive)) if alive[eid])
+
+    def by_id(self, eid):
+        """Return EdgeView of edge id."""
+        return EdgeView(self, eid)
+
+    def _index(self):
+        """Return grid of edge segments, built on first use.
+
+        Edges of vertices moved since are kept aside, the grid is built
+        again after a vertex table reload or when many edges moved.
+        """
+        vertices = self._vertices
+        moved = vertices._moved
+        if self._grid is not None and moved is not None:
+            heads = len(self._out_head)
+            for v in moved:
+                if v < heads:
+                    self._stale.update(self._out_ids(v))
+                    self._stale.update(self._in_ids(v))
+        if self._grid is None or moved is None or len(self._stale) > max(1000, self._count // 8):
+            xs, ys, c = vertices._x, vertices._y, float(self.GRID_CELL)
+            src, dst, alive = self._src, self._dst, self._alive
+            cells, ids = [], []
+            self._large = set()
+            for eid in range(len(alive)):
+                if not alive[eid]:
+                    continue
+                s, d = src[eid], dst[eid]
+                x1, y1, x2, y2 = xs[s], ys[s], xs[d], ys[d]
+                cell = (int(x1 // c), int(y1 // c))
+                if cell == (int(x2 // c), int(y2 // c)):
+                    # short edge
+                    cells.append(cell)
+                    ids.append(eid)
+                    continue
+                segment = spatial.segment_cells(x1, y1, x2, y2, c, self.GRID_MAX_CELLS)
+                if segment is None:
+                    self._large.add(eid)
+                    continue
+                cells.extend(segment)
+                ids.extend([eid] * len(segment))
+            self._grid = spatial.CellTable(c, cells, ids)
+            self._stale = set()
+        vertices._moved = set()
+        return self._grid
+
+    def ids_in_rect(self, x1, y1, x2, y2):
+        """Return ids of edges whose line between endpoint positions touches rectangle."""
+        found = self._index().query(x1, y1, x2, y2)
+        found.update(self._large)
+        found.update(self._stale)
+        xs, ys = self._vertices._x, self._vertices._y
+        src, dst, alive = self._src, self._dst, self._alive
+        result = []
+        for eid in sorted(found):
+            if alive[eid]:
+                s, d = src[eid], dst[eid]
+                if spatial.segment_intersects_rect(xs[s], ys[s], xs[d], ys[d], x1, y1, x2, y2):
+                    result.append(eid)
+        return result
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, key):
+        return self.get(*key) is not None
+
+    def get(self, src, dst):
+        """Return edge for (src, dst) or None."""
+        s, d = self._vid(src), self._vid(dst)
+        if s is None or d is None:
+            return None
+        eid = self._find(s, d)
+        return EdgeView(self, eid) if eid >= 0 else None
+
+    def add(self, edge):
+        """Add edge given as dict, existing edge with same endpoints is kept.
+
+        Both endpoints must be vertices of the table. Returns EdgeView.
+        """
+        s, d = self._vid(edge['src']), self._vid(edge['dst'])
+        if s is None or d is None:
+            raise KeyError((edge['src'], edge['dst']))
+        eid, slot = self._lookup(s, d)
+        if eid >= 0:
+            return EdgeView(self, eid)
+        # first in-edge defines path of destination and of its subtree
+        if self._in_head[d] < 0 and self._vertex_path is not None:
+            if self._out_head[d] >= 0:
+                self._vertex_path = None
+            elif d < len(self._vertex_path):
+                self._vertex_path[d] = -2
+        oriented = 1 if edge.get('oriented', True) else 0
+        label = self._strings.intern(edge.get('label'))
+        if self._free:
+            eid = self._free.pop()
+            self._src[eid] = s
+            self._dst[eid] = d
+            self._oriented[eid] = oriented
+            self._label[eid] = label
+            self._alive[eid] = 1
+            self._next_out[eid] = -1
+            self._next_in[eid] = -1
+        else:
+            eid = len(self._src)
+            self._src.append(s)
+            self._dst.append(d)
+            self._oriented.append(oriented)
+            self._label.append(label)
+            self._alive.append(1)
+            self._next_out.append(-1)
+            self._next_in.append(-1)
+        # append to adjacency lists
+        if self._out_tail[s] >= 0:
+            self._next_out[self._out_tail[s]] = eid
+        else:
+            self._out_head[s] = eid
+        self._out_tail[s] = eid
+        if self._in_tail[d] >= 0:
+            self._next_in[self._in_tail[d]] = eid
+        else:
+            self._in_head[d] = eid
+        self._in_tail[d] = eid
+        if self._slots[slot] == self.EMPTY:
+            self._used_slots += 1
+        self._slots[slot] = eid
+        self._count += 1
+        # keep table at most 2/3 full, tombstones included
+        if self._used_slots * 3 >= len(self._slots) * 2:
+            self._resize()
+        if self._changed is not None:
+            self._changed.add((edge['src'], edge['dst']))
+        if self._grid is not None:
+            self._stale.add(eid)
+        return EdgeView(self, eid)
+
+    def _out_ids(self, s):
+        eid = self._out_head[s]
+        while eid >= 0:
+            yield eid
+            eid = self._next_out[eid]
+
+    def _in_ids(self, d):
+        eid = self._in_head[d]
+        while eid >= 0:
+            yield eid
+            eid = self._next_in[eid]
+
+    def _unlink(self, eid, head, tail, nxt, v):
+        """Remove eid from linked list of vertex v."""
+        prev = -1
+        cur = head[v]
+        while cur >= 0 and cur != eid:
+            prev = cur
+            cur = nxt[cur]
+        if cur < 0:
+            return
+        if prev >= 0:
+            nxt[prev] = nxt[eid]
+        else:
+            head[v] = nxt[eid]
+        if tail[v] == eid:
+            tail[v] = prev
+
+    def _release(self, eid):
+        self._mark(eid)
+        slot = self._lookup(self._src[eid], self._dst[eid])[1]
+        self._slots[slot] = self.DELETED
+        self._alive[eid] = 0
+        self._free.append(eid)
+        self._count -= 1
+
+    def remove(self, src, dst):
+        s, d = self._vid(src), self._vid(dst)
+        if s is None or d is None:
+            return None
+        eid = self._find(s, d)
+        if eid < 0:
+            return None
+        if self._in_head[d] == eid:
+            self._vertex_path = None
+        self._unlink(eid, self._out_head, self._out_tail, self._next_out, s)
+        self._unlink(eid, self._in_head, self._in_tail, self._next_in, d)
+        self._release(eid)
+        return True
+
+    def path_of(self, eid):
+        """Return path of edge destination within its root tree.
+
+        Path is '/' followed by names of tree entries from the root tree,
+        following first in-edge of each tree/blob vertex. None if the
+        destination is not a tree or blob.
+        """
+        node = self._path_node(self._dst[eid])
+        if node < 0:
+            return None
+        return '/' + '/'.join(self._strings.get(n) for n in self._paths.names(node))
+
+    def path_nodes(self):
+        """Return array vertex id -> path node (-1 no path) for all vertices."""
+        if len(self._in_head) < self._vertices.capacity():
+            self._grow_vertices()
+        for v in range(self._vertices.capacity()):
+            self._path_node(v)
+        return self._vertex_path if self._vertex_path is not None else array('i')
+
+    def path_node(self, label):
+        """Return path node of vertex `label`, -1 if it has no path."""
+        v = self._vid(label)
+        return self._path_node(v) if v is not None else -1
+
+    def find_path(self, names):
+        """Return path node of names from root (first name is the root entry)."""
+        node = PathTrie.ROOT
+        for name in names[1:]:
+            node = self._paths.child(node, self._strings.intern(name))
+        return node
+
+    def path_ancestors(self, node):
+        return self._paths.ancestors(node)
+
+    def _path_node(self, v):
+        cache = self._vertex_path
+        capacity = self._vertices.capacity()
+        if self._type_changes != self._vertices.type_changes:
+            self._type_changes = self._vertices.type_changes
+            cache = None
+        if cache is None:
+            cache = self._vertex_path = array('i', [-2]) * capacity
+        elif len(cache) < capacity:
+            cache.extend(array('i', [-2]) * (capacity - len(cache)))
+        if cache[v] != -2:
+            return cache[v]
+        vertices = self._vertices
+        container = (vertices.type_code('tree'), vertices.type_code('blob'))
+        # walk first in-edges up to a vertex with known path
+        chain = []
+        while cache[v] == -2:
+            e = self._in_head[v] if vertices._type[v] in container and vertices._alive[v] else -1
+            if e < 0 or len(chain) > capacity:
+                cache[v] = -1
+                break
+            chain.append((v, e))
+            v = self._src[e]
+        # source without path makes root path, its edge label is not part of path
+        node = cache[v]
+        for v, e in reversed(chain):
+            node = self._paths.child(node, self._label[e]) if node >= 0 else PathTrie.ROOT
+            cache[v] = node
+        return node
+
+    def out_edges(self, label):
+        """Return list of edges leaving vertex `label`, in insertion order."""
+        s = self._vid(label)
+        return [EdgeView(self, eid) for eid in self._out_ids(s)] if s is not None else []
+
+    def in_edges(self, label):
+        """Return list of edges entering vertex `label`, in insertion order."""
+        d = self._vid(label)
+        return [EdgeView(self, eid) for eid in self._in_ids(d)] if d is not None else []
+
+    def first_in_edge(self, label):
+        d = self._vid(label)
+        if d is None or self._in_head[d] < 0:
+            return None
+        return EdgeView(self, self._in_head[d])
+
+    def remove_vertex(self, label):
+        """Remove all edges referencing vertex `label`."""
+        v = self._vid(label)
+        if v is None:
+            return
+        self._vertex_path = None
+        for eid in list(self._out_ids(v)):
+            self._unlink(eid, self._in_head, self._in_tail, self._next_in, self._dst[eid])
+            self._release(eid)
+        self._out_head[v] = self._out_tail[v] = -1
+        for eid in list(self._in_ids(v)):
+            self._unlink(eid, self._out_head, self._out_tail, self._next_out, self._src[eid])
+            self._release(eid)
+        self._in_head[v] = self._in_tail[v] = -1
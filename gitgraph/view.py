@@ -1,40 +1,18 @@
-import tkinter as tk, math
+import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 import tkinter.font as tkfont
 from graph import GraphApp
 from model import GraphModel
+import lod
+import shapes
+import spatial
 
 class GraphView():
     def __init__(self, pController = None , pModel=None):
         # render parameters per vertex type: fill color,  outline color and outline width
-        self.vertex_render_params = {
-            'branch': {'fill': "#2EF82E",
-                       'color': '',
-                       'width': 0
-                       },
-            'tag': {'fill': "#4622FA",
-                       'color': '',
-                       'width': 0
-                       },
-            'commit': {'fill': "#EB55FF",
-                       'color': 'black',
-                       'width': 2
-                       },
-            'tree': {'fill': "#FFC90E",
-                       'color': 'black',
-                       'width': 1
-                       },
-            'blob': {'fill': "lightgray",
-                       'color': 'black',
-                       'width': 1
-                       },
-            'tagobject': {'fill': "lightgray",
-                       'color': 'black',
-                       'width': 1
-                       }
-        }
+        self.vertex_render_params = shapes.RENDER_PARAMS
         
-        self._init_commit_color = 'pink'
+        self._init_commit_color = shapes.INIT_COMMIT_COLOR
 
         # Widget tags
         # Vertex rectangle: VID (from model), TYPE (from model), VERTEX ( constant)
@@ -47,15 +25,21 @@ class GraphView():
         self.VERTEXLABEL = 'vtext'
         self.EDGE = 'edge'
         self.EDGELABEL = 'etext'
+        # Group of collapsed vertices: key (from lod.Overview), group type, GROUP (constant)
+        self.GROUP = 'group'
+        # temporary tag of items moved together while dragging
+        self.DRAG = 'dragged'
+        # rectangle of rubber-band selection
+        self.BAND = 'band'
 
         # Map vertex types to drawing shape functions
         self.vertex_render = {
             'branch': self._render_rect_shape,
-            'tag': self._render_arrowed_shape,
-            'commit': self._render_rounded_shape,
-            'tree': self._render_handled_shape,
-            'blob': self._render_curved_shape,
-            'tagobject': self._render_rounded_shape  
+            'tag': self._render_polygon_shape,
+            'commit': self._render_polygon_shape,
+            'tree': self._render_polygon_shape,
+            'blob': self._render_polygon_shape,
+            'tagobject': self._render_polygon_shape
         }
 
         self.controller = pController if pController  else GraphApp()
@@ -68,6 +52,44 @@ class GraphView():
 
         # GUI mappings       
         self._drag_data = {'vertex': None, 'x': 0, 'y': 0}
+        # motion events are applied once per frame (ms)
+        self.DRAG_FRAME_MS = 16
+        self._drag_pending = None
+        # labels of selected vertices, dragged together
+        self._selected = set()
+        # rubber-band selection in progress: {'item', 'x', 'y'}
+        self._band = None
+        # canvas boxes of rendered vertices: label -> (x1, y1, x2, y2)
+        self._vertex_index = spatial.GridIndex(256)
+
+        # Viewport virtualization: only vertices/edges within the viewport plus
+        # margin (in viewport sizes) have canvas items
+        self.VIEWPORT_MARGIN = 1.0
+        self._rendered_region = None
+        self._viewport_pending = False
+        # model bounds used for scroll region
+        self._model_bounds = None
+        # show_trees used for rendered items
+        self._shown_trees = True
+
+        # Zoom: canvas coordinates are model coordinates * zoom
+        # below DETAIL_ZOOM vertices are plain shapes without text, edges without labels
+        # below OVERVIEW_ZOOM commit chains and tree/blob clusters are collapsed to groups
+        self.ZOOM_LEVELS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0)
+        self.DETAIL_ZOOM = 0.75
+        self.OVERVIEW_ZOOM = 0.3
+        self._zoom = 1.0
+        self._overview = None
+        # canvas item ids: label -> (shape, text), (src, dst) -> (line, text or None)
+        # and keys of rendered edges per vertex label
+        self._vertex_items = {}
+        self._edge_items = {}
+        self._vertex_edges = {}
+
+        # font resolved once, text metrics cache: label -> (width, height)
+        self._font = None
+        self._line_height = None
+        self._text_metrics = {}
 
         # ---- Container for scrollable region ----
         scrollableFrame = ttk.Frame(self.controller)
@@ -81,8 +103,8 @@ class GraphView():
         self.canvas.grid(row=0, column=0, sticky="nsew")
         
         # Scrollbars
-        v_scroll = ttk.Scrollbar(scrollableFrame, orient="vertical", command=self.canvas.yview)
-        h_scroll = ttk.Scrollbar(scrollableFrame, orient="horizontal", command=self.canvas.xview)
+        v_scroll = ttk.Scrollbar(scrollableFrame, orient="vertical", command=self._on_yview)
+        h_scroll = ttk.Scrollbar(scrollableFrame, orient="horizontal", command=self._on_xview)
         self.canvas.configure(yscrollcommand=v_scroll.set, xscrollcommand=h_scroll.set)
 
         v_scroll.grid(row=0, column=1, sticky="ns")
@@ -94,84 +116,87 @@ class GraphView():
         self.commit_ctx_menu, self.tree_ctx_menu, self.blob_ctx_menu = self._build_menus()
 
     def _get_vertex_rect(self, label):
-        ids = self.canvas.find_withtag( label + ' && ' + self.VERTEX )
-        return ids[0] if ids != () else None
+        items = self._vertex_items.get(label)
+        return items[0] if items is not None else None
 
     def _get_edge_line(self, srclabel, dstlabel):
-        ids = self.canvas.find_withtag( srclabel + ' && ' + dstlabel + ' && ' + self.EDGE )
-        return ids[0] if ids != () else None  
+        items = self._edge_items.get((srclabel, dstlabel))
+        return items[0] if items is not None else None
+
+    def _get_vertex_dimensions(self, label, vtype=None):
+        """Return half-width and half-height of vertex shape.
+
+        Computed from the label like in create_vertex, so it is known also
+        for vertices without canvas items.
+        """
+        if vtype is None:
+            vtype = self.model.vertices[label]['type']
+        rx, ry = self._get_shape_size(label, vtype)
+        # curved and handled shapes are drawn higher than their rectangle
+        return rx, ry + shapes.EXTRA_HEIGHT.get(vtype, 0)
 
-    def _get_vertex_dimensions(self, label):
-        d = self.canvas.bbox(self._get_vertex_rect(label))
-        if d == ():
-            return d
-        return ((d[2]-d[0])/2) - 1, ((d[3]-d[1])/2) - 1  
+    def _get_shape_size(self, label, vtype):
+        text_width, text_height = self._measure_label(label)
+        return shapes.shape_size(text_width, text_height, vtype)
 
     def _get_vertex_text(self, label):
-        ids = self.canvas.find_withtag( label + ' && ' + self.VERTEXLABEL )
-        return ids[0] if ids != () else None 
+        items = self._vertex_items.get(label)
+        return items[1] if items is not None else None
 
     def _get_edge_text(self, srclabel, dstlabel):
-        ids = self.canvas.find_withtag( srclabel + ' && ' + dstlabel + ' && ' + self.EDGELABEL )
-        return ids[0] if ids != () else None 
+        items = self._edge_items.get((srclabel, dstlabel))
+        return items[1] if items is not None else None
+
+    def _get_font(self):
+        if self._font is None:
+            try:
+                self._font = tkfont.nametofont("TkDefaultFont")
+            except Exception:
+                self._font = tkfont.Font()
+        return self._font
+
+    def _get_line_height(self, width=0):
+        if self._line_height is None:
+            font = self._get_font()
+            # approximate height in pixels (linespace = ascent+descent)
+            try:
+                self._line_height = font.metrics('linespace') 
+            except Exception:
+                # fallback estimate
+                return font.metrics('ascent') + font.metrics('descent') if hasattr(font, 'metrics') else int(width * 0.2)
+        return self._line_height
 
     def _measure_label(self, label):
+        metrics = self._text_metrics.get(label)
+        if metrics is None:
+            # width in pixels
+            w = self._get_font().measure(label)
+            metrics = self._text_metrics[label] = (w, self._get_line_height(w))
+        return metrics
+
+    def _measure_labels(self, labels):
+        """Measure labels not in metrics cache with one Tcl call."""
+        labels = [l for l in labels if l not in self._text_metrics]
+        if not labels:
+            return
+        font = self._get_font()
         try:
-            font = tkfont.nametofont("TkDefaultFont")
-        except Exception:
-            font = tkfont.Font()
-        # width in pixels
-        w = font.measure(label)
-        # approximate height in pixels (linespace = ascent+descent)
-        try:
-            h = font.metrics('linespace') 
+            widths = self.canvas.tk.splitlist(self.canvas.tk.call(
+                'lmap', 's', tuple(labels), 'font measure {%s} $s' % font))
+            h = self._get_line_height()
+            for label, w in zip(labels, widths):
+                self._text_metrics[label] = (int(w), h)
         except Exception:
-            # fallback estimate
-            h = font.metrics('ascent') + font.metrics('descent') if hasattr(font, 'metrics') else int(w * 0.2)
-        return w, h
+            # no lmap (Tcl < 8.6), measure one by one
+            for label in labels:
+                self._measure_label(label)
 
     def _rect_line_endpoints(self, x1, y1, rx1, ry1, x2, y2, rx2, ry2):
         """Compute line endpoints where the line between centers meets the rectangle borders.
 
         Rectangles are axis-aligned with half-width rx and half-height ry.
         """
-        dx = x2 - x1
-        dy = y2 - y1
-        if dx == 0 and dy == 0:
-            return x1, y1, x2, y2
-        # parametric line: p(t) = (x1,y1) + t*(dx,dy), t in [0,1]
-        def intersect_rect(cx, cy, rx, ry, ox, oy):
-            # ox, oy are direction components (dx,dy)
-            ts = []
-            if ox != 0:
-                # left/right sides
-                t1 = (-rx) / ox
-                t2 = (rx) / ox
-                ts.extend([t1, t2])
-            if oy != 0:
-                # top/bottom sides
-                t3 = (-ry) / oy
-                t4 = (ry) / oy
-                ts.extend([t3, t4])
-            # convert to absolute t along ray from center to target: we need positive t
-            cand = None
-            for t in sorted(ts):
-                if t <= 0:
-                    continue
-                px = cx + ox * t
-                py = cy + oy * t
-                # check if (px,py) lies on rectangle boundary within the other coordinate
-                if abs(px - cx) <= rx + 1e-6 and abs(py - cy) <= ry + 1e-6:
-                    cand = (px, py)
-                    break
-            if cand is None:
-                return cx, cy
-            return cand
-
-        # direction from src to dst
-        sx, sy = intersect_rect(x1, y1, rx1, ry1, dx, dy)
-        ex, ey = intersect_rect(x2, y2, rx2, ry2, -dx, -dy)
-        return sx, sy, ex, ey
+        return shapes.rect_line_endpoints_many([(x1, y1, rx1, ry1, x2, y2, rx2, ry2)])[0]
 
     def _calculate_label_position(self, x1, y1, x2, y2, offset=15):
         """Calculate label position perpendicular to edge line.
@@ -184,56 +209,48 @@ class GraphView():
         Returns:
             (label_x, label_y): position for label text
         """
-        mid_x = (x1 + x2) / 2
-        mid_y = (y1 + y2) / 2
-        
-        dx = x2 - x1
-        dy = y2 - y1
-        dist = math.hypot(dx, dy)
-        
-        if dist < 1e-6:  # points are too close
-            return mid_x, mid_y
-        
-        # perpendicular vector (rotated 90 degrees counterclockwise)
-        perp_x = -dy / dist
-        perp_y = dx / dist
-        
-        # offset label position
-        label_x = mid_x + perp_x * offset
-        label_y = mid_y + perp_y * offset
-        
-        return label_x, label_y
-
-    def _render_rounded_shape(self, label:str, vtype:str, x1:int, y1:int, x2:int, y2:int):
-        # some points are repeated to draw direct line instead of curve
-        # curves are drawn due to smooth=True
-        r = 18
-        points = (x1+r, y1, x2-r, y1, x2-r, y1, 
-                  x2, y1, x2, y1+r, x2, y1+r, x2, y2-r, 
-                  x2, y2-r, x2, y2, x2-r, y2, x2-r, y2, 
-                  x1+r, y2, x1+r, y2, x1, y2, x1, y2-r, 
-                  x1, y2-r, x1, y1+r, x1, y1+r, x1, y1)
+        return shapes.label_position(x1, y1, x2, y2, offset)
+
+    def _edge_geometry(self, keys):
+        """Return canvas (x1, y1, x2, y2, label x, label y) of edges between vertices or groups.
+
+        Computed for all edges in one step, see shapes.edge_geometry.
+        """
+        # geometry of each vertex once, even if it has many edges
+        geometry = {}
+        segments = []
+        for s, d in keys:
+            g_s = geometry.get(s)
+            if g_s is None:
+                g_s = geometry[s] = self._get_node_geometry(s)
+            g_d = geometry.get(d)
+            if g_d is None:
+                g_d = geometry[d] = self._get_node_geometry(d)
+            segments.append(g_s + g_d)
+        return shapes.edge_geometry(segments, self._zoom)
+
+    def _update_edge_items(self, keys):
+        """Set coordinates of rendered edges, all endpoints are computed in one step."""
+        keys = [k for k in keys if k in self._edge_items]
+        coords = self.canvas.coords
+        for key, (x1, y1, x2, y2, label_x, label_y) in zip(keys, self._edge_geometry(keys)):
+            line_id, label_id = self._edge_items[key]
+            coords(line_id, x1, y1, x2, y2)
+            # update label position if it exists
+            if label_id:
+                coords(label_id, label_x, label_y)
+
+    def _render_polygon_shape(self, label:str, vtype:str, x1:int, y1:int, x2:int, y2:int):
+        # shape points come from shapes.py, shared with export
+        points, smooth, (tx, ty) = shapes.vertex_shape(vtype, x1, y1, x2, y2)
         rect = self.canvas.create_polygon(points, fill=self._init_commit_color if (vtype == 'commit' and label == self._init_commit) else self.vertex_render_params[vtype]['fill'], 
                             outline=self.vertex_render_params[vtype]['color'], 
                             width=self.vertex_render_params[vtype]['width'], 
-                            tags = [label, vtype, self.VERTEX], smooth=True)
-        text = self.canvas.create_text((x1 + x2)/2, (y1 + y2)/2, text=label, 
-                                       justify = tk.CENTER, tags= [label, vtype, self.VERTEXLABEL])
-        
-    def _render_arrowed_shape(self, label:str, vtype:str, x1:int, y1:int, x2:int, y2:int):
-        # constants for arrow rendering
-        xd = 6
-        yr = (y2 - y1)/2
-        points = (x1, y1, x2 - xd, y1, 
-                  x2, y1 + yr, x2 - xd, y2,
-                  x1, y2, x1 + xd, y1 + yr , x1, y1)
-        rect = self.canvas.create_polygon(points, fill=self.vertex_render_params[vtype]['fill'], 
-                            outline=self.vertex_render_params[vtype]['color'], 
-                            width=self.vertex_render_params[vtype]['width'], 
-                            tags = [label, vtype, self.VERTEX])
-        text = self.canvas.create_text((x1 + x2)/2, (y1 + y2)/2, text=label, 
+                            tags = [label, vtype, self.VERTEX], smooth=smooth)
+        text = self.canvas.create_text(tx, ty, text=label, 
                                        justify = tk.CENTER, tags= [label, vtype, self.VERTEXLABEL])
-        
+        return rect, text
+
     def _render_rect_shape(self, label:str, vtype:str, x1:int, y1:int, x2:int, y2:int):
         rect = self.canvas.create_rectangle(x1, y1, x2, y2,
                                           fill=self.vertex_render_params[vtype]['fill'],
@@ -241,56 +258,41 @@ class GraphView():
                                           width=self.vertex_render_params[vtype]['width'],
                                           tags = [label, vtype , self.VERTEX])
         text = self.canvas.create_text((x1 + x2)/2, (y1 + y2)/2, text=label, justify = tk.CENTER, 
-                                       tags= [label, vtype, self.VERTEXLABEL])        
-
-    def _render_curved_shape(self, label:str, vtype:str, x1:int, y1:int, x2:int, y2:int):
-        # 1/4 of width for curve rendering
-        dx = (x2-x1)/4
-        # curve constant
-        cy = 6
-        # make shape higher than standard due to curve
-        dy = 3
-        y2a = y2 + dy
-        y1a = y1 - dy
-
-        points = ( x1, y1a,
-            x2, y1a, x2, y1a,
-            x2, y2a - cy, x2, y2a - cy,
-            x2 - dx, y2a - 2*cy,
-            x1 + 2*dx, y2a - cy,
-            x1 + dx, y2a,
-            x1, y2a - cy, x1, y2a - cy, x1, y1a,  x1, y1a )
-        rect = self.canvas.create_polygon(points, fill=self.vertex_render_params[vtype]['fill'], 
-                            outline=self.vertex_render_params[vtype]['color'], 
-                            width=self.vertex_render_params[vtype]['width'], 
-                            tags = [label, vtype, self.VERTEX], smooth=True)
-        text = self.canvas.create_text((x1 + x2)/2, (y1 + y2)/2 - dy, text=label, 
-                                       justify = tk.CENTER, tags= [label, vtype, self.VERTEXLABEL])
+                                       tags= [label, vtype, self.VERTEXLABEL])
+        return rect, text
 
-    def _render_handled_shape(self, label:str, vtype:str, x1:int, y1:int, x2:int, y2:int):
-        # 1/4 of width for curve rendering
-        dx = (x2-x1)/3
-        # handle constant
-        cy = 6
-        # make shape higher than standard due to handle
-        dy = 6
-        y2a = y2 + dy
-        y1a = y1 - dy
-
-        points = ( x1 + 2, y1a + cy,
-            x2, y1a + cy, x2, y1a + cy,
-            x2, y2a, x2, y2a,
-            x1, y2a, x1, y2a,
-            x1, y1a, x1, y1a,
-            x1 + dx - 6 , y1a, x1 + dx - 6 , y1a,
-            x1 + dx, y1a,
-            x1 + dx, y1a + cy, x1 + dx, y1a + cy, x1 + 2, y1a + cy,x1 + 2, y1a + cy )
-        rect = self.canvas.create_polygon(points, fill=self.vertex_render_params[vtype]['fill'], 
-                            outline=self.vertex_render_params[vtype]['color'], 
-                            width=self.vertex_render_params[vtype]['width'], 
-                            tags = [label, vtype, self.VERTEX], smooth=True)
-        text = self.canvas.create_text((x1 + x2)/2, (y2a + y1a + cy)/2 , text=label, 
-                                       justify = tk.CENTER, tags = [label, vtype, self.VERTEXLABEL])                                       
+    def _render_simple_shape(self, label:str, vtype:str, x1:int, y1:int, x2:int, y2:int):
+        # shape without text used below detail zoom
+        rect = self.canvas.create_rectangle(x1, y1, x2, y2,
+                                          fill=self._init_commit_color if (vtype == 'commit' and label == self._init_commit) else self.vertex_render_params[vtype]['fill'],
+                                          outline=self.vertex_render_params[vtype]['color'],
+                                          width=self.vertex_render_params[vtype]['width'],
+                                          tags = [label, vtype, self.VERTEX])
+        return rect, None
+
+    def _render_group(self, key, node):
+        """Draw collapsed commit chain or tree/blob cluster with count of its vertices."""
+        z = self._zoom
+        x, y, rx, ry = node['x'] * z, node['y'] * z, node['rx'] * z, node['ry'] * z
+        params = self.vertex_render_params['commit' if node['type'] == 'chain' else 'tree']
+        rect = self.canvas.create_rectangle(x - rx, y - ry, x + rx, y + ry, fill=params['fill'],
+                                            outline=params['color'], width=1, dash=(3, 2),
+                                            tags=[key, node['type'], self.GROUP])
+        text = self.canvas.create_text(x, y, text=str(node['count']), justify=tk.CENTER,
+                                       tags=[key, node['type'], self.GROUP])
+        return rect, text
+
+    def _is_group(self, key):
+        return self._overview is not None and key in self._overview.nodes and key not in self.model.vertices
+
+    def _get_node_geometry(self, key):
+        """Return (x, y, half-width, half-height) of vertex or group in model coordinates."""
+        if self._is_group(key):
+            n = self._overview.nodes[key]
+            return n['x'], n['y'], n['rx'], n['ry']
+        v = self.model.vertices[key]
+        rx, ry = self._get_vertex_dimensions(key, v['type'])
+        return v['x'], v['y'], rx, ry
 
     def _build_menus(self):
         #context menus
@@ -317,7 +319,7 @@ class GraphView():
         except Exception:
             lbl = None
         # create vertex (create_vertex handles None/empty label)
-        self.create_vertex(x, y, label=lbl)
+        self.create_vertex(x / self._zoom, y / self._zoom, label=lbl)
         self._context_click = None
 
     def _context_load_commit_connected(self):        
@@ -367,25 +369,28 @@ class GraphView():
         self._context_click = None
 
     def find_vertex_at(self, x, y):
-        items = self.canvas.find_overlapping(x, y, x, y)
-        for item in reversed(items):
-            tags = self.canvas.gettags(item)
-            # look for VERTEX tag to identify vertex rectangle
-            if self.VERTEX in tags:
-                return tags[0]  # first tag is the vertex label
-        return None
+        labels = self._vertex_index.at(x, y)
+        if not labels:
+            return None
+        # shapes created later are drawn on top
+        return max(labels, key=self._get_vertex_rect)
+
+    def find_vertices_in(self, x1, y1, x2, y2):
+        """Return labels of rendered vertices whose shape intersects canvas rectangle."""
+        return self._vertex_index.query(x1, y1, x2, y2)
+
+    def _index_vertex(self, label, x, y, rx, ry, vtype):
+        # canvas box of vertex shape with its outline, used for hit-testing and selection
+        ry += shapes.EXTRA_HEIGHT.get(vtype, 0) * self._zoom
+        outline = self.vertex_render_params.get(vtype, {}).get('width', 0) / 2
+        self._vertex_index.insert(label, x - rx - outline, y - ry - outline, x + rx + outline, y + ry + outline)
 
     def create_vertex(self, x, y, label=None, vtype=None):
         lbl = label or f"v{self.model._next_vid}"
-        text_width, text_height = self._measure_label(lbl)
-        paddingx = 10
-        paddingy = 10 if vtype in ['branch', 'tag'] else 16
-        r=24 # minimal half-width
-        rx = max(r, int(text_width / 2) + paddingx)
-        ry = text_height // 2 + paddingy/2
-
         # pass vertex type to model; default in model is 'commit'
         used_type = vtype if vtype is not None else 'commit'
+        rx, ry = self._get_shape_size(lbl, used_type)
+
         labelid = self.model.add_vertex(x, y, lbl, vtype=used_type)
         if not labelid:
             # failed to add (empty or duplicate label)
@@ -395,32 +400,38 @@ class GraphView():
                 pass
             return None
         # draw a rectangle vertex (rx, ry are half-width/half-height) using dispatch dictionary
-        self.vertex_render[used_type](labelid, used_type, x - rx, y - ry, x + rx, y + ry)
+        # x, y are model coordinates, shape is scaled by zoom
+        z = self._zoom
+        render = self.vertex_render[used_type] if z >= self.DETAIL_ZOOM else self._render_simple_shape
+        x, y, rx, ry = x * z, y * z, rx * z, ry * z
+        self._vertex_items[labelid] = render(labelid, used_type, x - rx, y - ry, x + rx, y + ry)
+        self._index_vertex(labelid, x, y, rx, ry, used_type)
+        if labelid in self._selected:
+            self._highlight(labelid)
         return labelid
 
     def _create_edge_line(self, srclabel, dstlabel, edge_type=True, label=None):
-        s = self.model.vertices[srclabel]
-        d = self.model.vertices[dstlabel]
-        srx, sry = self._get_vertex_dimensions(srclabel)
-        drx, dry = self._get_vertex_dimensions(dstlabel)
-
-        x1o, y1o, x2o, y2o = self._rect_line_endpoints(
-            s['x'], s['y'], srx, sry, d['x'], d['y'], drx, dry)
-        arrow_style = tk.LAST if edge_type else tk.NONE
-        line = self.canvas.create_line(x1o, y1o, x2o, y2o, arrow=arrow_style, width=1, fill='black', 
-                                       tags=[srclabel, dstlabel, self.EDGE])
-        label_id = None
-        
-        # render label with perpendicular offset if present
-        if label:
-            try:
-                font = tkfont.nametofont("TkDefaultFont")
-            except Exception:
-                font = tkfont.Font()
-            label_x, label_y = self._calculate_label_position(x1o, y1o, x2o, y2o)
-            label_id = self.canvas.create_text(label_x, label_y, text=label, font=font, fill='black',
-                                               tags=[srclabel, dstlabel, self.EDGELABEL])
-            self.canvas.tag_raise(label_id, line)  # put text in front of line for visibility
+        self._create_edge_lines([(srclabel, dstlabel, edge_type, label)])
+
+    def _create_edge_lines(self, edges):
+        """Create items of edges given as (src, dst, edge_type, label), geometry is computed at once."""
+        geometry = self._edge_geometry([(s, d) for s, d, _, _ in edges])
+        for (srclabel, dstlabel, edge_type, label), (x1o, y1o, x2o, y2o, label_x, label_y) in zip(edges, geometry):
+            arrow_style = tk.LAST if edge_type else tk.NONE
+            line = self.canvas.create_line(x1o, y1o, x2o, y2o, arrow=arrow_style, width=1, fill='black',
+                                           tags=[srclabel, dstlabel, self.EDGE])
+            label_id = None
+
+            # render label with perpendicular offset if present, not shown below detail zoom
+            if label and self._zoom >= self.DETAIL_ZOOM:
+                font = self._get_font()
+                label_id = self.canvas.create_text(label_x, label_y, text=label, font=font, fill='black',
+                                                   tags=[srclabel, dstlabel, self.EDGELABEL])
+                self.canvas.tag_raise(label_id, line)  # put text in front of line for visibility
+            key = (srclabel, dstlabel)
+            self._edge_items[key] = (line, label_id)
+            self._vertex_edges.setdefault(srclabel, set()).add(key)
+            self._vertex_edges.setdefault(dstlabel, set()).add(key)
 
     def create_edge(self, srclabel, dstlabel, edge_type=True, label=None):
         if not self.model.add_edge(srclabel, dstlabel, edge_type=edge_type, label=label):
@@ -429,154 +440,429 @@ class GraphView():
 
     def update_edges_for_vertex(self, label):
         """Update all edges connected to the given vertex ID."""
-        # find edges via canvas tags and update them
-        for line_id in self.canvas.find_withtag(self.EDGE + " && " + label):
-            s,  d,  _ = self.canvas.gettags(line_id)
-            s_v = self.model.vertices[s]
-            d_v = self.model.vertices[d]
-            srx, sry = self._get_vertex_dimensions(s)
-            drx, dry = self._get_vertex_dimensions(d)
-            x1o, y1o, x2o, y2o = self._rect_line_endpoints(
-                    s_v['x'], s_v['y'], srx, sry, d_v['x'], d_v['y'], drx, dry)                
-            self.canvas.coords(line_id, x1o, y1o, x2o, y2o)
-            # update label position if it exists
-            label_id = self._get_edge_text(s, d)
-            if label_id:
-                label_x, label_y = self._calculate_label_position(x1o, y1o, x2o, y2o)
-                self.canvas.coords(label_id, label_x, label_y)
+        self._update_edge_items(self._vertex_edges.get(label, ()))
 
     def delete_vertex(self, label, remove_from_model=True):
         # remove canvas items
-        try:
-            self.canvas.delete(self._get_vertex_rect(label))
-        except Exception:
-            pass
-        try:
-            self.canvas.delete(self._get_vertex_text(label))
-        except Exception:
-            pass
-
-        # find edges via canvas tags and delete them
-        for line_id in self.canvas.find_withtag(self.EDGE + " && " + label):
-            s,  d,  _ = self.canvas.gettags(line_id)
-            self.canvas.delete(line_id)
-            # also delete label if exists
-            label_id = self._get_edge_text(s, d)
-            if label_id:
-                self.canvas.delete(label_id)
+        items = self._vertex_items.pop(label, None)
+        if items is not None:
+            self.canvas.delete(*[i for i in items if i])
+        self._vertex_index.remove(label)
+        # delete edges rendered to/from vertex
+        for s, d in list(self._vertex_edges.get(label, ())):
+            self._delete_edge_line(s, d)
         # update model
         if remove_from_model:
+            self._selected.discard(label)
             self.model.delete_vertex(label)
 
-    def render_model(self):
-        # check if vertex exists in GUI, if not, create it
-        for labelid in self.model.vertices:
-            rect = self._get_vertex_rect(labelid)           
-            if rect is None:
-                # skip tree/blob vertices if configured so
-                if not self.show_trees and self.model.vertices[labelid].get('type') in ['tree', 'blob']:
-                    continue
-                v = self.model.vertices[labelid]
-                self.create_vertex(v['x'], v['y'], label=labelid, vtype=v.get('type', 'commit'))
-        # create edges if not present in GUI
-        for edge in self.model.edges:
-            s_v = edge['src']
-            d_v = edge['dst']
-            edge_type = edge.get('oriented', True)
-            edge_label = edge.get('label', None)
-            # check if edge already exists in GUI
-            line_id = self._get_edge_line(s_v, d_v)
-            if line_id is None:
-                # skip edges connected to tree/blob vertices if configured so
-                if not self.show_trees and (self.model.vertices[s_v].get('type') in ['tree', 'blob'] or
-                                             self.model.vertices[d_v].get('type') in ['tree', 'blob']):
-                    continue
-                self._create_edge_line(s_v, d_v, edge_type, edge_label)
-        # delete tree/blob vertices and edges if configured so, but do not modify model
-        if not self.show_trees:
-            for widgedid in list(self.canvas.find_withtag('tree || blob')):
-                tags = self.canvas.gettags(widgedid)
-                if tags != ():
-                    self.delete_vertex(tags[0], False)
-        # hide vertices marked as not visible in the model
-        for labelid in self.model.vertices:
-            if not self.model.vertices[labelid].get('visible', True):
-                self.delete_vertex(labelid, False)
+    def _delete_edge_line(self, srclabel, dstlabel):
+        key = (srclabel, dstlabel)
+        items = self._edge_items.pop(key, None)
+        if items is None:
+            return
+        # also delete label if exists
+        self.canvas.delete(*[i for i in items if i])
+        for v in key:
+            keys = self._vertex_edges.get(v)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._vertex_edges[v]
+
+    def _is_displayed(self, v):
+        """True if model vertex should have canvas items (wherever it is)."""
+        # skip tree/blob vertices if configured so
+        return v['visible'] and (self.show_trees or v['type'] not in ['tree', 'blob'])
+
+    def _get_viewport(self):
+        """Return visible canvas area in canvas coordinates."""
+        x1, y1 = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        width = max(self.canvas.winfo_width(), self.canvas.winfo_reqwidth())
+        height = max(self.canvas.winfo_height(), self.canvas.winfo_reqheight())
+        return x1, y1, x1 + width, y1 + height
+
+    def _get_render_region(self):
+        """Return viewport extended by margin on each side."""
+        x1, y1, x2, y2 = self._get_viewport()
+        mx = (x2 - x1) * self.VIEWPORT_MARGIN
+        my = (y2 - y1) * self.VIEWPORT_MARGIN
+        return x1 - mx, y1 - my, x2 + mx, y2 + my
+
+    def _update_scrollregion(self):
+        """Set scroll region from model bounds, canvas holds only part of the diagram."""
+        bounds = self.model.vertices.bounds()
+        self._model_bounds = bounds
+        if bounds is None:
+            self.canvas.configure(scrollregion=(0, 0, 0, 0))
+            return
+        pad = 100
+        z = self._zoom
+        self.canvas.configure(scrollregion=(bounds[0] * z - pad, bounds[1] * z - pad,
+                                            bounds[2] * z + pad, bounds[3] * z + pad))
+
+    def render_model(self, viewport_only=False):
+        """Synchronize canvas items with the model for the render region.
+
+        Vertices and edges are created when they are within the viewport plus
+        margin, items of vertices/edges outside of it, hidden or filtered out
+        are deleted. Scrolling renders again once viewport leaves the region.
+        Below overview zoom, groups of lod.Overview are rendered instead of
+        their vertices; it is built again unless only the viewport changed.
+        Otherwise only changes reported by the model are applied, unless
+        the viewport changed or the model was replaced; a full sync draws
+        changed vertices and edges again.
+        """
+        model = self.model
+        changes = model.take_changes()
         #if init commit updated in model, render it properly
-        if self._init_commit != self.model.init_commit:
-            self.canvas.itemconfig(self._get_vertex_rect(self.model.init_commit), fill=self._init_commit_color)
-            self._init_commit = self.model.init_commit
-        # Update scroll region if drawing expands bounds
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        if self._init_commit != model.init_commit:
+            self._init_commit = model.init_commit
+            rect = self._get_vertex_rect(model.init_commit) if model.init_commit else None
+            if rect is not None:
+                self.canvas.itemconfig(rect, fill=self._init_commit_color)
+        if changes is None or any(changes):
+            self._overview = None
+        if (not viewport_only and changes is not None and self._rendered_region is not None
+                and self._zoom >= self.OVERVIEW_ZOOM and self._shown_trees == self.show_trees
+                and self._apply_changes(changes)):
+            return
+        self._shown_trees = self.show_trees
+        # items drawn from an older state of the model are drawn again
+        if changes is None:
+            self._clear_items()
+        else:
+            changed, _, edge_keys = changes
+            for s_v, d_v in edge_keys:
+                self._delete_edge_line(s_v, d_v)
+            for label in changed:
+                self.delete_vertex(label, False)
+        if self._zoom < self.OVERVIEW_ZOOM and self._overview is None:
+            self._overview = lod.Overview(model, self._is_displayed, self._get_vertex_dimensions)
+            # groups of previous overview may have grown or moved
+            for key in [k for k in self._vertex_items if k not in model.vertices]:
+                self.delete_vertex(key, False)
+        region = self._get_render_region()
+        self._rendered_region = region
+        # region in model coordinates
+        x1, y1, x2, y2 = [c / self._zoom for c in region]
+        # vertices with center up to one vertex size outside the region may overlap it
+        pad = 100
+        wanted = set()
+        # (src, dst) -> (oriented, label)
+        wanted_edges = {}
+        if self._zoom < self.OVERVIEW_ZOOM:
+            wanted.update(self._overview.keys_in_rect(x1, y1, x2, y2))
+            for key in self._overview.edges_in_rect(x1 - pad, y1 - pad, x2 + pad, y2 + pad):
+                wanted_edges[key] = (self._overview.edges[key], None)
+        else:
+            for vid in model.vertices.ids_in_rect(x1 - pad, y1 - pad, x2 + pad, y2 + pad):
+                if self._is_displayed(model.vertices.by_id(vid)):
+                    wanted.add(model.vertices.label_of(vid))
+            for eid in model.edges.ids_in_rect(x1 - pad, y1 - pad, x2 + pad, y2 + pad):
+                edge = model.edges.by_id(eid)
+                s_v, d_v = edge['src'], edge['dst']
+                if self._is_displayed(model.vertices[s_v]) and self._is_displayed(model.vertices[d_v]):
+                    wanted_edges[(s_v, d_v)] = (edge['oriented'], edge['label'])
+        # delete items out of region or not displayed any more
+        for s_v, d_v in self._edge_items.keys() - wanted_edges.keys():
+            self._delete_edge_line(s_v, d_v)
+        for labelid in self._vertex_items.keys() - wanted:
+            self.delete_vertex(labelid, False)
+        # create missing items
+        missing = wanted - self._vertex_items.keys()
+        missing_edges = wanted_edges.keys() - self._edge_items.keys()
+        # shapes and edge endpoints need label sizes, measure them at once
+        self._measure_labels(l for l in missing.union(*missing_edges) if not self._is_group(l))
+        for labelid in missing:
+            if self._is_group(labelid):
+                self._vertex_items[labelid] = self._render_group(labelid, self._overview.nodes[labelid])
+                continue
+            v = model.vertices[labelid]
+            self.create_vertex(v['x'], v['y'], label=labelid, vtype=v.get('type', 'commit'))
+        self._create_edge_lines([key + wanted_edges[key] for key in missing_edges])
+        self._update_scrollregion()
+        # read objects of rendered vertices likely expanded next in background
+        self.model.prefetch(self.model.unexpanded(self._vertex_items))
+
+    def _apply_changes(self, changes):
+        """Update items of changed vertices and edges within rendered region.
+
+        Returns False if there are too many changes, then the whole region
+        is better synchronized at once.
+        """
+        model = self.model
+        changed, removed, edge_keys = changes
+        if len(changed) + len(removed) + len(edge_keys) > max(100, len(model.vertices) // 4):
+            return False
+        x1, y1, x2, y2 = [c / self._zoom for c in self._rendered_region]
+        pad = 100
+        x1, y1, x2, y2 = x1 - pad, y1 - pad, x2 + pad, y2 + pad
+        for label in removed:
+            self._selected.discard(label)
+            self.delete_vertex(label, False)
+        edge_keys = set(edge_keys)
+        missing = []
+        grown = False
+        bounds = self._model_bounds
+        for label in changed:
+            # edges follow position and visibility of their vertices
+            for e in model.edges.out_edges(label) + model.edges.in_edges(label):
+                edge_keys.add((e['src'], e['dst']))
+            self.delete_vertex(label, False)
+            v = model.vertices[label]
+            if bounds is None or not (bounds[0] <= v['x'] <= bounds[2] and bounds[1] <= v['y'] <= bounds[3]):
+                grown = True
+            if self._is_displayed(v) and x1 <= v['x'] <= x2 and y1 <= v['y'] <= y2:
+                missing.append(label)
+        wanted_edges = []
+        for key in edge_keys:
+            self._delete_edge_line(*key)
+            edge = model.edges.get(*key)
+            if edge is None:
+                continue
+            s_v, d_v = model.vertices[key[0]], model.vertices[key[1]]
+            if not (self._is_displayed(s_v) and self._is_displayed(d_v)):
+                continue
+            if not spatial.segment_intersects_rect(s_v['x'], s_v['y'], d_v['x'], d_v['y'], x1, y1, x2, y2):
+                continue
+            wanted_edges.append((key, edge['oriented'], edge['label']))
+        self._measure_labels(missing + [l for key, _, _ in wanted_edges for l in key])
+        for labelid in missing:
+            v = model.vertices[labelid]
+            self.create_vertex(v['x'], v['y'], label=labelid, vtype=v['type'])
+        self._create_edge_lines([key + (oriented, label) for key, oriented, label in wanted_edges])
+        # scroll region only grows, it shrinks with next full synchronization
+        if grown:
+            self._update_scrollregion()
+        if missing:
+            self.model.prefetch(self.model.unexpanded(missing))
+        return True
 
     def on_delete_key(self, event):
-        # delete currently highlighted vertex (red outline)
-        to_delete = None
-        for vlabel in self.model.vertices:
-            try:
-                cfg = self.canvas.itemcget(self._get_vertex_rect(vlabel), 'outline')
-            except Exception:
-                cfg = None
-            if cfg == 'red':
-                to_delete = vlabel
-                break
-        if to_delete:
-            self.delete_vertex(to_delete)
+        # delete selected vertices (red outline)
+        for vlabel in list(self._selected):
+            self.delete_vertex(vlabel)
+
+    def _highlight(self, label, on=True):
+        rect = self._get_vertex_rect(label)
+        if rect is None:
+            return
+        try:
+            color = 'red' if on else self.vertex_render_params[self.model.vertices[label]['type']]['color']
+            self.canvas.itemconfig(rect, outline=color)
+        except Exception:
+            pass
+
+    def select(self, label, on=True):
+        """Add vertex to selection or remove it, selected vertices have red outline."""
+        if on:
+            self._selected.add(label)
+        else:
+            self._selected.discard(label)
+        self._highlight(label, on)
+
+    def clear_selection(self):
+        for label in self._selected:
+            self._highlight(label, False)
+        self._selected.clear()
 
     def on_left_button_down(self, event):
         x, y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
         labelid = self.find_vertex_at(x, y)
         if labelid is None:
-            # do not create a new vertex on left-click empty area
+            # do not create a new vertex on left-click empty area, select by rectangle
+            self.clear_selection()
+            self._start_band(x, y)
             return
+        # click on unselected vertex selects only it, selected ones are dragged together
+        if labelid not in self._selected:
+            self.clear_selection()
+            self.select(labelid)
+        self._start_drag(labelid, x, y)
+
+    def on_ctrl_left_button_down(self, event):
+        """Add vertex to selection or remove it from selection."""
+        x, y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
+        labelid = self.find_vertex_at(x, y)
+        if labelid is not None:
+            self.select(labelid, labelid not in self._selected)
         else:
-            # start dragging vertex
-            self._drag_data['vertex'] = labelid
-            self._drag_data['x'] = x
-            self._drag_data['y'] = y
-            # highlight
-            try:
-                self.canvas.itemconfig(self._get_vertex_rect(labelid), outline='red')
-            except Exception:
-                pass
+            # rectangle adds to selection
+            self._start_band(x, y)
+
+    def _start_band(self, x, y):
+        item = self.canvas.create_rectangle(x, y, x, y, outline='gray', dash=(4, 2), tags=[self.BAND])
+        self._band = {'item': item, 'x': x, 'y': y}
+
+    def _finish_band(self, x, y):
+        """Select vertices touched by rubber-band rectangle."""
+        band = self._band
+        self._band = None
+        self.canvas.delete(band['item'])
+        x1, x2 = sorted((band['x'], x))
+        y1, y2 = sorted((band['y'], y))
+        for label in self.find_vertices_in(x1, y1, x2, y2):
+            self.select(label)
+
+    def _start_drag(self, labelid, x, y):
+        self._drag_data['vertex'] = labelid
+        self._drag_data['x'] = x
+        self._drag_data['y'] = y
+        # items of dragged vertices and edges between them move with one call,
+        # other edges of dragged vertices get new endpoints
+        dragged = self._selected
+        keys = set()
+        for label in dragged:
+            for item in self._vertex_items.get(label, ()):
+                if item:
+                    self.canvas.addtag_withtag(self.DRAG, item)
+            keys.update(self._vertex_edges.get(label, ()))
+        edges = []
+        for key in keys:
+            if key[0] in dragged and key[1] in dragged:
+                for item in self._edge_items[key]:
+                    if item:
+                        self.canvas.addtag_withtag(self.DRAG, item)
+            else:
+                edges.append(key)
+        self._drag_data['edges'] = edges
 
     def on_left_button_drag(self, event):
-        vlabel = self._drag_data.get('vertex')
-        x, y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
-        if not vlabel:
+        if self._band is not None:
+            x, y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
+            self.canvas.coords(self._band['item'], self._band['x'], self._band['y'], x, y)
+            return
+        if not self._drag_data.get('vertex'):
+            return
+        # keep last pointer position, move once per frame
+        self._drag_data['to'] = (self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        if self._drag_pending is None:
+            self._drag_pending = self.canvas.after(self.DRAG_FRAME_MS, self._apply_drag)
+
+    def _apply_drag(self):
+        self._drag_pending = None
+        if not self._drag_data.get('vertex') or 'to' not in self._drag_data:
             return
+        x, y = self._drag_data.pop('to')
         dx = x - self._drag_data['x']
         dy = y - self._drag_data['y']
-
-        # move shapes (rect + text)
-        try:
-            self.canvas.move(self._get_vertex_rect(vlabel), dx, dy)
-        except Exception:
-            pass
-        try:
-            self.canvas.move(self._get_vertex_text(vlabel), dx, dy)
-        except Exception:
-            pass
-        # update model position
-        m = self.model.vertices[vlabel]
-        m['x'] += dx
-        m['y'] += dy
+        if dx == 0 and dy == 0:
+            return
+        # move shapes (rect + text) of all dragged vertices
+        self.canvas.move(self.DRAG, dx, dy)
+        # update model positions
+        index = self._vertex_index
+        for label in self._selected:
+            m = self.model.vertices[label]
+            m['x'] += dx / self._zoom
+            m['y'] += dy / self._zoom
+            if label in index:
+                bx1, by1, bx2, by2 = index.box(label)
+                index.insert(label, bx1 + dx, by1 + dy, bx2 + dx, by2 + dy)
         self._drag_data['x'] = x
         self._drag_data['y'] = y
-        self.update_edges_for_vertex(vlabel)
+        self._update_edge_items(self._drag_data['edges'])
 
     def on_left_button_up(self, event):
+        if self._band is not None:
+            self._finish_band(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+            return
         vlabel = self._drag_data.get('vertex')
         if vlabel:
-            # unhighlight
-            try:                    
-                self.canvas.itemconfig(self._get_vertex_rect(vlabel), 
-                                       outline=self.vertex_render_params[self.model.vertices[vlabel].get('type')]['color'])
-            except Exception:
-                pass
+            # apply last motion not rendered yet
+            if self._drag_pending is not None:
+                self.canvas.after_cancel(self._drag_pending)
+                self._apply_drag()
+            self.canvas.dtag(self.DRAG, self.DRAG)
         self._drag_data['vertex'] = None
-        # Update scroll region if drawing expands bounds
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        self._drag_data.pop('to', None)
+        # moved vertex may bring edges into region, update scroll region too
+        if vlabel:
+            self.render_model()
+
+    def _on_xview(self, *args):
+        self.canvas.xview(*args)
+        self._schedule_viewport_update()
+
+    def _on_yview(self, *args):
+        self.canvas.yview(*args)
+        self._schedule_viewport_update()
+
+    def on_canvas_configure(self, event):
+        self._schedule_viewport_update()
+
+    def _schedule_viewport_update(self):
+        # scroll events come in bursts, update once when Tk is idle
+        if not self._viewport_pending:
+            self._viewport_pending = True
+            self.canvas.after_idle(self._update_viewport)
+
+    def _update_viewport(self):
+        """Render again when viewport got close to the border of the rendered region."""
+        self._viewport_pending = False
+        if self._rendered_region is None:
+            return
+        x1, y1, x2, y2 = self._get_viewport()
+        rx1, ry1, rx2, ry2 = self._rendered_region
+        # keep half of the margin as reserve
+        mx = (x2 - x1) * self.VIEWPORT_MARGIN / 2
+        my = (y2 - y1) * self.VIEWPORT_MARGIN / 2
+        if x1 - mx < rx1 or y1 - my < ry1 or x2 + mx > rx2 or y2 + my > ry2:
+            self.render_model(viewport_only=True)
+
+    def set_zoom(self, zoom, x=None, y=None):
+        """Set zoom factor, model point at widget position (x, y) stays in place.
+
+        Default position is the center of the canvas.
+        """
+        zoom = min(max(zoom, self.ZOOM_LEVELS[0]), self.ZOOM_LEVELS[-1])
+        if zoom == self._zoom:
+            return
+        if x is None:
+            vx1, vy1, vx2, vy2 = self._get_viewport()
+            x, y = (vx2 - vx1) / 2, (vy2 - vy1) / 2
+        mx = self.canvas.canvasx(x) / self._zoom
+        my = self.canvas.canvasy(y) / self._zoom
+        self._zoom = zoom
+        # all items are drawn again for new zoom, overview of model is kept
+        self._clear_items()
+        self._update_scrollregion()
+        self._scroll_canvas_to(mx * zoom - x, my * zoom - y)
+        self.render_model(viewport_only=True)
+
+    def zoom_in(self, x=None, y=None):
+        larger = [z for z in self.ZOOM_LEVELS if z > self._zoom]
+        if larger:
+            self.set_zoom(larger[0], x, y)
+
+    def zoom_out(self, x=None, y=None):
+        smaller = [z for z in self.ZOOM_LEVELS if z < self._zoom]
+        if smaller:
+            self.set_zoom(smaller[-1], x, y)
+
+    def reset_zoom(self):
+        self.set_zoom(1.0)
+
+    def _scroll_canvas_to(self, cx, cy):
+        """Scroll so canvas point (cx, cy) is at top left corner of the widget."""
+        region = self.canvas.cget('scrollregion')
+        if isinstance(region, str):
+            region = [float(c) for c in region.split()]
+        if not region or len(region) != 4:
+            return
+        sx1, sy1, sx2, sy2 = region
+        if sx2 > sx1:
+            self.canvas.xview_moveto((cx - sx1) / (sx2 - sx1))
+        if sy2 > sy1:
+            self.canvas.yview_moveto((cy - sy1) / (sy2 - sy1))
+
+    def on_zoom_wheel(self, event):
+        # Windows/macOS report delta, X11 reports buttons 4 (up) and 5 (down)
+        if getattr(event, 'delta', 0) > 0 or getattr(event, 'num', 0) == 4:
+            self.zoom_in(event.x, event.y)
+        else:
+            self.zoom_out(event.x, event.y)
 
     def on_right_button_down(self, event):
         x, y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
@@ -600,21 +886,36 @@ class GraphView():
                 except Exception:
                     pass
 
+    def _clear_items(self):
+        self.canvas.delete("all")
+        self._vertex_items.clear()
+        self._edge_items.clear()
+        self._vertex_edges.clear()
+        self._vertex_index.clear()
+
     def on_update_model(self):
         # clear existing GUI
-        self.canvas.delete("all")
+        self._clear_items()
+        self._rendered_region = None
         # if init commit is available in model, it will be rendered
         self._init_commit = self.model.init_commit
         self.render_model()
 
     def on_new_model(self, pModel):
         self.model = pModel
+        self._text_metrics.clear()
+        self._selected.clear()
         self.on_update_model()
 
     def build_bindings(self):
         # self.bind('<Delete>', self.on_delete_key) disabled delete
         self.canvas.bind('<Button-1>', self.on_left_button_down)
+        self.canvas.bind('<Control-Button-1>', self.on_ctrl_left_button_down)
         self.canvas.bind('<B1-Motion>', self.on_left_button_drag)
         self.canvas.bind('<ButtonRelease-1>', self.on_left_button_up)
         self.canvas.bind('<Button-3>', self.on_right_button_down)
+        self.canvas.bind('<Configure>', self.on_canvas_configure)
+        self.canvas.bind('<Control-MouseWheel>', self.on_zoom_wheel)
+        self.canvas.bind('<Control-Button-4>', self.on_zoom_wheel)
+        self.canvas.bind('<Control-Button-5>', self.on_zoom_wheel)
 
@@ -0,0 +1,242 @@
+"""Watching of git refs for automatic refresh.
+
+Contains class RefWatcher: worker thread which watches HEAD, packed-refs
+and the refs directory of a git directory and calls back once after a
+burst of changes settled. On Linux inotify is used (through ctypes),
+elsewhere modification times are polled.
+"""
+import os
+import sys
+import select
+import struct
+import threading
+import time
+import ctypes
+import ctypes.util
+
+# inotify event masks, see inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+EVENT_HEADER = struct.Struct('iIII')
+
+# files directly in git directory whose changes are reported
+WATCHED_FILES = ('HEAD', 'packed-refs')
+
+
+def _open_inotify():
+    """Return libc with inotify functions or None if not available."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class RefWatcher:
+    """Call `callback` when refs of git directory changed.
+
+    Changes arriving within `debounce` seconds of each other are reported
+    by one call, at the latest `max_delay` seconds after the first one.
+    The callback runs in the watcher thread. Without inotify, HEAD,
+    packed-refs and directories under refs are checked every `interval`
+    seconds; git writes refs by renaming lock files, which changes the
+    modification time of their directory.
+    """
+
+    def __init__(self, gitdir, callback, debounce=0.3, max_delay=2.0, interval=1.0):
+        self.gitdir = gitdir
+        self._callback = callback
+        self._debounce = debounce
+        self._max_delay = max_delay
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._libc = _open_inotify()
+        self._fd = -1
+        # watch descriptor -> directory
+        self._watches = {}
+        # pipe interrupting select() on stop, closed by the worker
+        self._lock = threading.Lock()
+        self._wake_r = self._wake_w = -1
+        if self._libc is not None and self._init_inotify():
+            self._wake_r, self._wake_w = os.pipe()
+        else:
+            self._libc = None
+        target = self._watch_inotify if self._libc is not None else self._watch_polling
+        self._worker = threading.Thread(target=target, daemon=True)
+        self._worker.start()
+
+    @property
+    def uses_inotify(self):
+        return self._libc is not None
+
+    def stop(self):
+        """Stop watching, no callback is made afterwards."""
+        self._stopped.set()
+        with self._lock:
+            if self._wake_w >= 0:
+                os.write(self._wake_w, b'x')
+
+    # -- inotify --
+
+    def _init_inotify(self):
+        fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return False
+        self._fd = fd
+        if not self._add_watch(self.gitdir):
+            os.close(fd)
+            self._fd = -1
+            return False
+        self._add_tree(os.path.join(self.gitdir, 'refs'))
+        return True
+
+    def _add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            return False
+        self._watches[wd] = path
+        return True
+
+    def _add_tree(self, path):
+        """Watch directory and its subdirectories."""
+        self._add_watch(path)
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    self._add_tree(entry.path)
+            except OSError:
+                continue
+
+    def _read_events(self):
+        """Read waiting events, return True if any of them concerns refs."""
+        changed = False
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                return changed
+            except OSError:
+                return changed
+            pos = 0
+            while pos + EVENT_HEADER.size <= len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, pos)
+                name = data[pos + EVENT_HEADER.size:pos + EVENT_HEADER.size + length].rstrip(b'\0')
+                pos += EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    changed = True
+                    continue
+                path = self._watches.get(wd)
+                if mask & IN_IGNORED:
+                    self._watches.pop(wd, None)
+                if path is None:
+                    continue
+                name = os.fsdecode(name)
+                if path == self.gitdir:
+                    # git directory itself is watched only for its ref files
+                    if name in WATCHED_FILES or name == 'refs':
+                        changed = True
+                        if name == 'refs' and mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                            self._add_tree(os.path.join(path, name))
+                    continue
+                # ref lock files are followed by the rename reporting the ref
+                if name.endswith('.lock'):
+                    continue
+                changed = True
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_tree(os.path.join(path, name))
+
+    def _watch_inotify(self):
+        try:
+            while not self._stopped.is_set():
+                # sleep until something happens
+                select.select([self._fd, self._wake_r], [], [])
+                if self._stopped.is_set():
+                    break
+                if not self._read_events():
+                    continue
+                # wait for burst of changes to settle
+                first = time.monotonic()
+                while not self._stopped.is_set():
+                    left = min(self._debounce, first + self._max_delay - time.monotonic())
+                    if left <= 0:
+                        break
+                    ready, _, _ = select.select([self._fd, self._wake_r], [], [], left)
+                    if not ready:
+                        break
+                    self._read_events()
+                if not self._stopped.is_set():
+                    self._notify()
+        finally:
+            with self._lock:
+                for fd in (self._fd, self._wake_r, self._wake_w):
+                    os.close(fd)
+                self._fd = self._wake_r = self._wake_w = -1
+
+    # -- polling --
+
+    def _snapshot(self):
+        """Return dict path -> (mtime, size) of ref files and ref directories."""
+        stats = {}
+        for name in WATCHED_FILES:
+            path = os.path.join(self.gitdir, name)
+            try:
+                st = os.stat(path)
+                stats[path] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                pass
+        def walk(path):
+            try:
+                st = os.stat(path)
+                entries = list(os.scandir(path))
+            except OSError:
+                return
+            stats[path] = (st.st_mtime_ns, st.st_size)
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        walk(entry.path)
+                except OSError:
+                    continue
+        walk(os.path.join(self.gitdir, 'refs'))
+        return stats
+
+    def _watch_polling(self):
+        last = self._snapshot()
+        while not self._stopped.wait(self._interval):
+            current = self._snapshot()
+            if current == last:
+                continue
+            # wait for burst of changes to settle
+            first = time.monotonic()
+            while not self._stopped.wait(self._debounce):
+                last, current = current, self._snapshot()
+                if current == last or time.monotonic() - first > self._max_delay:
+                    break
+            last = current
+            if not self._stopped.is_set():
+                self._notify()
+
+    def _notify(self):
+        try:
+            self._callback()
+        except Exception:
+            pass
@@ -5,7 +5,7 @@ import time
 import queue
 '''
 Example of using long running task within Tkinner. Task is processed in separate thread and end of processing
-is reported back to main thread via queue
+is reported back to main thread via queue. Thread wakes main thread up by virtual event, queue is not polled.
 '''
 class App(tk.Tk):
     def __init__(self):
@@ -14,8 +14,9 @@ class App(tk.Tk):
         self.title("Background Task Example")
         self.geometry("400x200")
 
-        # Queue for thread communication
+        # Queue for thread communication, posted messages are processed on <<QueueMessage>>
         self.queue = queue.Queue()
+        self.bind('<<QueueMessage>>', self.process_queue)
 
         # UI Elements
         self.start_button = ttk.Button(
@@ -38,8 +39,6 @@ class App(tk.Tk):
         self.status_var.set("Task started...")
         self.start_button.config(state=tk.DISABLED)
         print(f'before: {self.info}')
-        # Poll queue periodically
-        self.after(100, self.process_queue)
         worker = threading.Thread(target=self.long_running_task, args=('Passed value',), daemon=True)
         worker.start()
 
@@ -47,16 +46,28 @@ class App(tk.Tk):
         """Simulate a long-running operation."""
         time.sleep(5)  # Simulate work
         self.info = val
-        self.queue.put("Task completed")
+        self.post("Task completed")
 
-    def process_queue(self):
-        """Process messages from the background thread."""
+    def post(self, message):
+        """Send message from background thread to main thread."""
+        self.queue.put(message)
         try:
-            message = self.queue.get_nowait()
-        except queue.Empty:
-            # Continue polling
-            self.after(100, self.process_queue)
-        else:
+            # tkinter passes calls from other threads to the main thread (threaded Tcl)
+            self.event_generate('<<QueueMessage>>', when='tail')
+        except Exception:
+            # event can't be generated, drain queue later
+            try:
+                self.after(100, self.process_queue)
+            except Exception:
+                pass
+
+    def process_queue(self, event=None):
+        """Process all messages from the background thread."""
+        while True:
+            try:
+                message = self.queue.get_nowait()
+            except queue.Empty:
+                break
             self.status_var.set(message)
             self.start_button.config(state=tk.NORMAL)
             print(f'after: {self.info}')